@@ -0,0 +1,74 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.utils.destinations import (
+    get_destinations_artifact_dir, get_destinations_data_dir,
+    read_source_tables, save_artifact, validate_tables,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compile Cities.csv, Flags.csv et workation.csv en artefact binaire '
+        '(colonnes .npy mappées en mémoire par les workers, sans pandas)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=None,
+            help="Dossier de l'artefact (défaut : settings.DESTINATIONS_ARTIFACT_DIR)",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Valider les données sans écrire l'artefact",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        output_dir = options['output'] or get_destinations_artifact_dir()
+        started = time.perf_counter()
+
+        self.stdout.write(self.style.SUCCESS(f'\n🗺️ Compilation du catalogue de destinations - {get_destinations_data_dir()}'))
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️ MODE DRY-RUN : Aucun fichier ne sera écrit\n'))
+
+        # ============================================
+        # 1. LECTURE ET VALIDATION DES CSV
+        # ============================================
+
+        try:
+            tables = read_source_tables()
+        except (OSError, KeyError, ValueError) as e:
+            raise CommandError(f'Lecture des CSV impossible : {e}')
+
+        errors = validate_tables(tables)
+        if errors:
+            for error in errors:
+                self.stdout.write(self.style.ERROR(f'   ❌ {error}'))
+            raise CommandError(f'{len(errors)} erreur(s) de validation : artefact non écrit')
+        self.stdout.write(self.style.SUCCESS('\n✅ Données valides'))
+
+        # ============================================
+        # 2. ÉCRITURE DE L'ARTEFACT
+        # ============================================
+
+        size = 0
+        if not dry_run:
+            size = save_artifact(tables, output_dir)
+            self.stdout.write(self.style.SUCCESS(f'\n💾 Artefact écrit : {output_dir}'))
+
+        # ============================================
+        # STATISTIQUES
+        # ============================================
+
+        self.stdout.write(self.style.SUCCESS('\n📊 STATISTIQUES:'))
+        for name, columns in tables.items():
+            rows = len(next(iter(columns.values())))
+            self.stdout.write(f'   - {name}: {rows} ligne(s), {len(columns)} colonne(s)')
+        if not dry_run:
+            files = len(os.listdir(output_dir))
+            self.stdout.write(f'   - Taille de l\'artefact: {size / 1024:.1f} Ko ({files} fichier(s))')
+        self.stdout.write(f'   - Durée: {time.perf_counter() - started:.2f} s\n')
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.utils.image_manifest import build_manifest, get_manifest_path, write_manifest
+
+
+class Command(BaseCommand):
+    help = 'Construit le manifeste des images de continents et de workation (à lancer avec collectstatic)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Surveiller les dossiers et réécrire le manifeste à chaque changement',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Intervalle (secondes) entre deux vérifications en mode --watch (défaut : 5)',
+        )
+
+    def handle(self, *args, **options):
+        manifest = self._write(build_manifest())
+
+        if not options['watch']:
+            return
+
+        self.stdout.write(self.style.WARNING('\n👀 Surveillance des dossiers d\'images (Ctrl+C pour arrêter)'))
+        try:
+            while True:
+                time.sleep(options['interval'])
+                current = build_manifest()
+                if current != manifest:
+                    manifest = self._write(current)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('\n✅ Surveillance arrêtée\n'))
+
+    def _write(self, manifest):
+        path = write_manifest(manifest, get_manifest_path())
+        continents = manifest['continents']
+
+        self.stdout.write(self.style.SUCCESS(f'\n🖼️ Manifeste d\'images écrit : {path}'))
+        for folder, images in continents.items():
+            self.stdout.write(f'   - Continent/{folder}: {len(images)} image(s)')
+        self.stdout.write(f'   - work: {len(manifest["work"])} image(s)')
+        return manifest
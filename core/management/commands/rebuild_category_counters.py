@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from core.utils.category_counters import compute_counters, drifted_keys, rebuild_counters, stored_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs de catégories d\'images (badges du feed et des albums) depuis la table Post'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Afficher les écarts sans réécrire les compteurs',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        self.stdout.write(self.style.SUCCESS('\n🔍 Réconciliation des compteurs de catégories'))
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️ MODE DRY-RUN : Aucune modification ne sera appliquée\n'))
+
+        # ============================================
+        # 1. RECALCULER DEPUIS LA TABLE POST ET CORRIGER
+        # ============================================
+
+        if dry_run:
+            expected = compute_counters()
+            current = stored_counters()
+            drifted = drifted_keys(expected, current)
+        else:
+            # Recalcul et correction dans une même transaction, compteurs verrouillés
+            expected, current, drifted = rebuild_counters()
+
+        # ============================================
+        # 2. ÉCARTS AVEC LES COMPTEURS STOCKÉS
+        # ============================================
+
+        if drifted:
+            self.stdout.write(f'\n📉 {len(drifted)} compteur(s) désynchronisé(s):')
+            for scope, user_id, category in sorted(drifted, key=str)[:50]:
+                key = (scope, user_id, category)
+                self.stdout.write(
+                    f'   - {scope}/{user_id or "*"}/{category or "all"}: '
+                    f'{current.get(key, 0)} → {expected.get(key, 0)}'
+                )
+        else:
+            self.stdout.write(self.style.SUCCESS('\n✅ Tous les compteurs sont à jour'))
+
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS(f'\n✅ {len(drifted)} compteur(s) corrigé(s) sur {len(expected)}\n'))
+        else:
+            self.stdout.write(self.style.WARNING(f'\n⚠️ DRY-RUN terminé - {len(expected)} compteur(s) calculé(s)\n'))
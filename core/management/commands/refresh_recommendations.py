@@ -0,0 +1,94 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.mongo import get_db
+from core.utils.recommendations import (
+    find_stale_users, get_failed_refreshes, get_last_refresh, refresh_user_recommendations, set_last_refresh,
+)
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les recommandations de personnes (user_recommendations) des profils modifiés et de leurs voisins'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Lister les utilisateurs à recalculer sans rien écrire',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recalculer tous les utilisateurs (par défaut au premier passage)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Profils lus par requête MongoDB (défaut : 500)',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        db = get_db()
+        started = time.perf_counter()
+        # Les profils modifiés pendant le passage seront repris au suivant
+        started_at = timezone.now()
+
+        self.stdout.write(self.style.SUCCESS(f'\n🔄 Rafraîchissement des recommandations - {started_at.strftime("%d/%m/%Y %H:%M")}'))
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️ MODE DRY-RUN : Aucune modification ne sera appliquée\n'))
+
+        # ============================================
+        # 1. UTILISATEURS À RECALCULER
+        # ============================================
+
+        since = None if options['full'] else get_last_refresh(db)
+        if since is None:
+            user_ids = [profile['user_id'] for profile in db.profiles.find({}, {'user_id': 1})]
+            changed_count, neighbour_count = len(user_ids), 0
+            self.stdout.write(f'\n📥 Passage complet : {len(user_ids)} utilisateur(s)')
+        else:
+            changed_ids, neighbour_ids = find_stale_users(db, since)
+            # Échecs du passage précédent : repris même sans nouvelle modification
+            retry_ids = get_failed_refreshes(db) - changed_ids - neighbour_ids
+            user_ids = sorted(changed_ids | neighbour_ids | retry_ids)
+            changed_count, neighbour_count = len(changed_ids), len(neighbour_ids)
+            self.stdout.write(
+                f'\n📥 Depuis le {since.strftime("%d/%m/%Y %H:%M")} (UTC) : '
+                f'{changed_count} profil(s) modifié(s), {neighbour_count} voisin(s), '
+                f'{len(retry_ids)} échec(s) à reprendre'
+            )
+
+        # ============================================
+        # 2. RECALCUL
+        # ============================================
+
+        refreshed = 0
+        failed_ids = []
+        if not dry_run:
+            batch_size = max(1, options['batch_size'])
+            for start in range(0, len(user_ids), batch_size):
+                batch = user_ids[start:start + batch_size]
+                for profile in db.profiles.find({'user_id': {'$in': batch}}):
+                    try:
+                        refresh_user_recommendations(db, profile, started_at)
+                        refreshed += 1
+                    except Exception as e:
+                        failed_ids.append(profile['user_id'])
+                        self.stdout.write(self.style.ERROR(f'   ❌ Utilisateur {profile["user_id"]} : {e}'))
+            # Les échecs sont enregistrés avec le passage pour être repris au suivant
+            set_last_refresh(db, started_at, failed_ids)
+            self.stdout.write(self.style.SUCCESS(f'\n✅ {refreshed} utilisateur(s) recalculé(s)'))
+
+        # ============================================
+        # STATISTIQUES
+        # ============================================
+
+        self.stdout.write(self.style.SUCCESS('\n📊 STATISTIQUES:'))
+        self.stdout.write(f'   - Profils modifiés: {changed_count}')
+        self.stdout.write(f'   - Voisins: {neighbour_count}')
+        self.stdout.write(f'   - Recalculés: {refreshed}')
+        self.stdout.write(f'   - Erreurs: {len(failed_ids)}')
+        self.stdout.write(f'   - Durée: {time.perf_counter() - started:.2f} s\n')
@@ -0,0 +1,166 @@
+import json
+import time
+from datetime import timedelta
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from core.models import Story, StoryView
+from core.signals import decrement_story_views_count
+from core.utils.stories import delete_media_files, expired_stories, story_media_files
+
+
+class Command(BaseCommand):
+    help = 'Supprime (ou archive) les stories expirées, leurs vues et leurs fichiers média, par lots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Afficher ce qui serait supprimé sans appliquer les changements',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre de stories traitées par lot (défaut : 500)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Pause (secondes) entre deux lots pour limiter la charge (défaut : 0)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Nombre maximum de lots par exécution (défaut : illimité)',
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=0,
+            help='Délai supplémentaire après expiration avant suppression (défaut : 0)',
+        )
+        parser.add_argument(
+            '--archive',
+            metavar='FICHIER',
+            help='Ajouter les stories supprimées à ce fichier JSON Lines (après validation de chaque lot)',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = max(1, options['batch_size'])
+        now = timezone.now()
+
+        self.stdout.write(self.style.SUCCESS(f'\n🧹 Nettoyage des stories expirées - {now.strftime("%d/%m/%Y %H:%M")}'))
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️ MODE DRY-RUN : Aucune modification ne sera appliquée\n'))
+
+        queryset = expired_stories(now, grace=timedelta(hours=options['grace_hours']))
+        totals = {'stories': 0, 'views': 0, 'files': 0, 'bytes': 0}
+        batches = 0
+        last_id = 0
+
+        # Les stories disparaissent avec leurs vues : inutile de décrémenter leur
+        # views_count vue par vue. Sans receveur post_delete, Django supprime les
+        # vues d'un lot en un seul DELETE.
+        post_delete.disconnect(decrement_story_views_count, sender=StoryView)
+        try:
+            while options['max_batches'] is None or batches < options['max_batches']:
+                # ============================================
+                # 1. CHARGER UN LOT (parcours par id croissant)
+                # ============================================
+
+                batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                batches += 1
+                last_id = batch[-1].id
+                ids = [story.id for story in batch]
+                files = [field for story in batch for field in story_media_files(story)]
+
+                if dry_run:
+                    totals['stories'] += len(batch)
+                    totals['views'] += StoryView.objects.filter(story_id__in=ids).count()
+                    totals['files'] += len(files)
+                    totals['bytes'] += sum(self._size(field) for field in files)
+                    continue
+
+                # ============================================
+                # 2. SUPPRIMER LES LIGNES (archivées après validation)
+                # ============================================
+
+                with transaction.atomic():
+                    views_deleted, _ = StoryView.objects.filter(story_id__in=ids).delete()
+                    stories_deleted, _ = Story.objects.filter(id__in=ids).delete()
+                    if options['archive']:
+                        transaction.on_commit(partial(self._archive, options['archive'], batch))
+
+                # ============================================
+                # 3. SUPPRIMER LES FICHIERS (après validation en base)
+                # ============================================
+
+                files_deleted, reclaimed = delete_media_files(files)
+                totals['stories'] += stories_deleted
+                totals['views'] += views_deleted
+                totals['files'] += files_deleted
+                totals['bytes'] += reclaimed
+
+                self.stdout.write(
+                    f'   - Lot {batches}: {stories_deleted} story(s), {views_deleted} vue(s), '
+                    f'{files_deleted} fichier(s) ({self._format_bytes(reclaimed)})'
+                )
+
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+        finally:
+            post_delete.connect(decrement_story_views_count, sender=StoryView)
+
+        # ============================================
+        # 4. STATISTIQUES FINALES
+        # ============================================
+
+        self.stdout.write('\n📊 STATISTIQUES:')
+        self.stdout.write(f'   Lots traités: {batches}')
+        self.stdout.write(f'   Stories: {totals["stories"]}')
+        self.stdout.write(f'   Vues: {totals["views"]}')
+        self.stdout.write(f'   Fichiers média: {totals["files"]}')
+        self.stdout.write(f'   Espace récupéré: {self._format_bytes(totals["bytes"])}')
+
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS('\n✅ Nettoyage terminé avec succès\n'))
+        else:
+            self.stdout.write(self.style.WARNING('\n⚠️ DRY-RUN terminé - Aucune modification appliquée\n'))
+
+    @staticmethod
+    def _archive(path, batch):
+        """Ajoute les stories d'un lot supprimé au fichier d'archive (JSON Lines)."""
+        with open(path, 'a', encoding='utf-8') as archive:
+            for story in batch:
+                archive.write(json.dumps({
+                    'id': story.id,
+                    'user_id': story.user_id,
+                    'content_text': story.content_text,
+                    'image': story.image.name or None,
+                    'video': story.video.name or None,
+                    'created_at': story.created_at.isoformat(),
+                    'views_count': story.views_count,
+                }) + '\n')
+
+    @staticmethod
+    def _size(field):
+        try:
+            return field.storage.size(field.name) if field.storage.exists(field.name) else 0
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _format_bytes(size):
+        for unit in ('o', 'Ko', 'Mo', 'Go'):
+            if size < 1024 or unit == 'Go':
+                return f'{size:.0f} {unit}' if unit == 'o' else f'{size:.1f} {unit}'
+            size /= 1024
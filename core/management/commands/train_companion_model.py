@@ -0,0 +1,132 @@
+import random
+import time
+from datetime import datetime
+
+import numpy as np
+import sklearn
+from django.core.management.base import BaseCommand, CommandError
+from sklearn.ensemble import RandomForestRegressor
+from core.mongo import get_db
+from core.utils.companions import (
+    COMPANION_FEATURES, COMPANION_MODEL_VERSION, COMPANION_PROFILE_FIELDS,
+    companion_features, get_companion_model_path, save_companion_model, weighted_scores,
+)
+
+
+class Command(BaseCommand):
+    help = 'Entraîne le modèle des compagnons de voyage (feed) à partir des profils MongoDB'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Entraîner et évaluer sans sauvegarder le modèle',
+        )
+        parser.add_argument(
+            '--max-users',
+            type=int,
+            default=1000,
+            help='Nombre maximum de profils utilisés comme "utilisateur" (défaut : 1000)',
+        )
+        parser.add_argument(
+            '--pairs-per-user',
+            type=int,
+            default=50,
+            help='Nombre de candidats tirés par utilisateur (défaut : 50)',
+        )
+        parser.add_argument(
+            '--n-estimators',
+            type=int,
+            default=100,
+            help="Nombre d'arbres de la forêt (défaut : 100)",
+        )
+        parser.add_argument(
+            '--max-depth',
+            type=int,
+            default=5,
+            help='Profondeur maximale des arbres (défaut : 5)',
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Chemin du modèle (défaut : settings.COMPANION_MODEL_PATH)',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        started = time.perf_counter()
+        rng = random.Random(42)
+
+        self.stdout.write(self.style.SUCCESS(f'\n🤝 Entraînement du modèle compagnons - {datetime.now().strftime("%d/%m/%Y %H:%M")}'))
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️ MODE DRY-RUN : Le modèle ne sera pas sauvegardé\n'))
+
+        # ============================================
+        # 1. ÉCHANTILLONS (utilisateur, candidat)
+        # ============================================
+
+        profiles = list(get_db().profiles.find({}, COMPANION_PROFILE_FIELDS))
+        if len(profiles) < 2:
+            raise CommandError('Pas assez de profils pour entraîner le modèle')
+
+        users = rng.sample(profiles, min(options['max_users'], len(profiles)))
+        features = []
+        for user_profile in users:
+            others = [profile for profile in profiles if profile['user_id'] != user_profile['user_id']]
+            for profile in rng.sample(others, min(options['pairs_per_user'], len(others))):
+                features.append(companion_features(user_profile, profile))
+
+        X = np.asarray(features, dtype=float)
+        y = weighted_scores(X)
+        self.stdout.write(f'\n📥 {len(profiles)} profil(s), {len(X)} paire(s) échantillonnée(s)')
+
+        # ============================================
+        # 2. ENTRAÎNEMENT ET ÉVALUATION
+        # ============================================
+
+        order = np.random.RandomState(42).permutation(len(X))
+        split = max(1, int(len(X) * 0.8))
+        train, test = order[:split], order[split:]
+
+        params = {
+            'n_estimators': options['n_estimators'],
+            'max_depth': options['max_depth'],
+            'random_state': 42,
+        }
+        model = RandomForestRegressor(**params)
+        model.fit(X[train], y[train])
+        r2 = float(model.score(X[test], y[test])) if len(test) > 1 else None
+        if r2 is not None:
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Modèle entraîné (R² test : {r2:.3f})'))
+
+        # Modèle final sur toutes les paires
+        model.fit(X, y)
+
+        # ============================================
+        # 3. SAUVEGARDE
+        # ============================================
+
+        metadata = {
+            'version': COMPANION_MODEL_VERSION,
+            'features': COMPANION_FEATURES,
+            'model': 'RandomForestRegressor',
+            'params': params,
+            'n_profiles': len(profiles),
+            'n_samples': len(X),
+            'r2_test': r2,
+            'sklearn_version': sklearn.__version__,
+            'trained_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        if not dry_run:
+            path = save_companion_model(model, metadata, options['output'] or get_companion_model_path())
+            self.stdout.write(self.style.SUCCESS(f'\n💾 Modèle sauvegardé : {path}'))
+
+        # ============================================
+        # STATISTIQUES
+        # ============================================
+
+        self.stdout.write(self.style.SUCCESS('\n📊 STATISTIQUES:'))
+        self.stdout.write(f'   - Profils: {len(profiles)}')
+        self.stdout.write(f'   - Paires d\'entraînement: {len(X)}')
+        self.stdout.write(f'   - Version des caractéristiques: {COMPANION_MODEL_VERSION}')
+        self.stdout.write(f'   - Durée: {time.perf_counter() - started:.2f} s\n')
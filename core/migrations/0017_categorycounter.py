@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_post_feed_keyset_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('public', 'Posts publics (global)'), ('private', "Posts non publics d'un utilisateur"), ('album', "Posts avec image d'un utilisateur")], max_length=10)),
+                ('category', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='category_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Compteur de catégorie',
+                'verbose_name_plural': 'Compteurs de catégories',
+                'constraints': [models.UniqueConstraint(fields=('scope', 'user', 'category'), name='unique_category_counter'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('scope', 'category'), name='unique_global_category_counter')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_views_count(apps, schema_editor):
+    Story = apps.get_model('core', 'Story')
+    for story in Story.objects.annotate(n=Count('views')).filter(n__gt=0):
+        Story.objects.filter(pk=story.pk).update(views_count=story.n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_categorycounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['-created_at'], name='story_active_idx'),
+        ),
+        migrations.RunPython(backfill_views_count, migrations.RunPython.noop),
+    ]
@@ -354,10 +354,41 @@ class Post(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Publication'
         verbose_name_plural = 'Publications'
+        indexes = [
+            # Pagination du feed par curseur (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='post_feed_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"Post de {self.user.username} - {self.created_at.strftime('%d/%m/%Y %H:%M')}"
 
+    # Champs dont dépendent les compteurs de catégories (core/utils/category_counters.py)
+    COUNTER_FIELDS = ('user_id', 'visibility', 'image_category', 'image')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Mémorise au chargement l'état des champs suivis par les compteurs de
+        catégories (différence appliquée à la sauvegarde, voir core/signals.py).
+        Les posts construits en mémoire n'en paient pas le coût.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._counter_state = instance.counter_state()
+        return instance
+
+    def counter_state(self):
+        """
+        Valeurs brutes des champs suivis, lues sans passer par les descripteurs.
+
+        Returns:
+            tuple: (user_id, visibility, image_category, has_image), ou None si
+            un champ suivi est différé (.only()/.defer())
+        """
+        values = self.__dict__
+        if any(field not in values for field in self.COUNTER_FIELDS):
+            return None
+        return (values['user_id'], values['visibility'], values['image_category'], bool(values['image']))
+
 
 class Comment(models.Model):
     """
@@ -551,6 +582,40 @@ class AnalyticsEvent(models.Model):
         return f"AnalyticsEvent[{self.event_type}] user={getattr(self.user, 'id', None)} post={getattr(self.post, 'id', None)}"
 
 
+class CategoryCounter(models.Model):
+    """
+    Compteurs de posts par catégorie d'image, maintenus à chaque écriture
+    (voir core/utils/category_counters.py) pour afficher les badges du feed
+    et des albums sans agrégat sur toute la table Post.
+
+    category = '' correspond au total toutes catégories confondues.
+    """
+    SCOPE_CHOICES = [
+        ('public', 'Posts publics (global)'),
+        ('private', 'Posts non publics d\'un utilisateur'),
+        ('album', 'Posts avec image d\'un utilisateur'),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='category_counters')
+    category = models.CharField(max_length=50, blank=True, default='')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'user', 'category'], name='unique_category_counter'),
+            models.UniqueConstraint(
+                fields=['scope', 'category'], condition=models.Q(user__isnull=True),
+                name='unique_global_category_counter',
+            ),
+        ]
+        verbose_name = 'Compteur de catégorie'
+        verbose_name_plural = 'Compteurs de catégories'
+
+    def __str__(self):
+        return f"{self.scope}/{self.user_id or '*'}/{self.category or 'all'} = {self.count}"
+
+
 # ============================================
 # STORIES (24h)
 # ============================================
@@ -563,9 +628,13 @@ class Story(models.Model):
     image = models.ImageField(upload_to='stories/images/', blank=True, null=True)
     video = models.FileField(upload_to='stories/videos/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    views_count = models.PositiveIntegerField(default=0)  # Dénormalisé (StoryView)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='story_active_idx'),
+        ]
 
     def __str__(self):
         return f"Story #{self.id} by {self.user.username}"
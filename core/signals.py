@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Subscription, UsageQuota, PaymentHistory
+from django.db.models import F
+from .models import Subscription, UsageQuota, PaymentHistory, Post, Story, StoryView, UserProfile
+from .utils import category_counters, stories, user_directory
 from django.utils import timezone
 
 
@@ -130,4 +132,90 @@ def log_subscription_changes(sender, instance, created, **kwargs):
     else:
         print(f"📝 [LOG] Abonnement mis à jour: {instance.user.username} - {instance.plan}")
         if instance.end_date:
-            print(f"   Expire le: {instance.end_date.strftime('%d/%m/%Y %H:%M')}")
\ No newline at end of file
+            print(f"   Expire le: {instance.end_date.strftime('%d/%m/%Y %H:%M')}")
+
+
+# ============================================
+# COMPTEURS DE CATÉGORIES (badges feed / albums)
+# ============================================
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def load_post_counter_state(sender, instance, **kwargs):
+    """
+    État des compteurs avant l'écriture : celui mémorisé au chargement
+    (Post.from_db), relu en base si le post a été chargé avec des champs
+    différés ou construit en mémoire avec un id
+    """
+    state = getattr(instance, '_counter_state', None)
+    if state is None and instance.pk:
+        instance._counter_keys = category_counters.stored_snapshot(instance.pk)
+    else:
+        instance._counter_keys = category_counters.state_keys(state)
+
+
+@receiver(post_save, sender=Post)
+def update_category_counters_on_save(sender, instance, created, **kwargs):
+    """
+    Met à jour les compteurs (création, reclassification, changement de visibilité)
+    """
+    old_keys = set() if created else instance._counter_keys
+    new_keys = category_counters.snapshot(instance)
+    if new_keys is None:
+        new_keys = category_counters.stored_snapshot(instance.pk)
+    category_counters.apply_changes(old_keys, new_keys)
+    instance._counter_state = category_counters.tracked_state(instance)
+    instance._counter_keys = new_keys
+
+
+@receiver(post_delete, sender=Post)
+def update_category_counters_on_delete(sender, instance, **kwargs):
+    """
+    Retire le post supprimé des compteurs
+    """
+    category_counters.apply_changes(getattr(instance, '_counter_keys', None), set())
+
+
+# ============================================
+# STORIES (index des stories actives, compteurs de vues)
+# ============================================
+
+@receiver(post_save, sender=Story)
+@receiver(post_delete, sender=Story)
+def invalidate_active_stories_index(sender, instance, **kwargs):
+    """
+    Reconstruit l'index des stories actives après une création ou suppression
+    """
+    stories.invalidate_active_stories()
+
+
+@receiver(post_delete, sender=StoryView)
+def decrement_story_views_count(sender, instance, **kwargs):
+    """
+    Retire la vue supprimée du compteur dénormalisé de la story
+    """
+    Story.objects.filter(pk=instance.story_id, views_count__gt=0).update(
+        views_count=F('views_count') - 1
+    )
+
+
+# ============================================
+# ANNUAIRE DES UTILISATEURS (slugs, noms, avatars en cache)
+# ============================================
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_directory_on_user_change(sender, instance, **kwargs):
+    """
+    Retire l'utilisateur modifié du cache de l'annuaire
+    """
+    user_directory.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_directory_on_profile_change(sender, instance, **kwargs):
+    """
+    Retire l'utilisateur dont le profil (slug, avatar) a changé du cache de l'annuaire
+    """
+    user_directory.invalidate_user(instance.user_id)
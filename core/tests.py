@@ -1,3 +1,859 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_delete, post_init
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import numpy as np
+from pymongo import UpdateOne
+
+from .models import CategoryCounter, Comment, Post, Reaction, Story, StoryView, UserProfile
+from .utils import panels, recommendations
+from .utils.destinations import (
+    DestinationCatalog, DestinationCatalogLoader, DestinationRecord, load_artifact, save_artifact,
+)
+from .utils.destination_search import DestinationSearchIndex
+from .utils.image_manifest import DEFAULT_CONTINENT_IMAGE, ImageManifest, write_manifest
+from .utils.companions import (
+    COMPANION_FEATURES, COMPANION_MODEL_VERSION, CompanionScorer, save_companion_model, weighted_scores,
+)
+from .utils.category_counters import (
+    compute_counters, get_album_category_counts, get_feed_category_counts, rebuild_counters,
+)
+from .utils.feed import attach_viewer_state, get_feed_page, get_ranked_feed_page
+from .utils.profile_similarity import SIMILARITY_WEIGHTS, ProfileSimilarityIndex, profile_tokens
+from .utils.post_cards import post_card_key, render_post_cards
+from .utils.stories import get_story_ring, record_story_view
+from .utils.timeline import get_timeline_max_size, update_post_visibility
+from .utils.user_directory import UserDirectory
+
+
+class ViewerStateHydrationTests(TestCase):
+    """Le coût de l'enrichissement d'une page ne dépend pas de sa taille."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user('viewer', password='x')
+        cls.author = User.objects.create_user('author', password='x')
+        for i in range(12):
+            post = Post.objects.create(user=cls.author, content=f'Post {i}')
+            comment = Comment.objects.create(post=post, user=cls.author, content='Top')
+            Comment.objects.create(post=post, user=cls.viewer, content='Reply', parent=comment)
+            Reaction.objects.create(post=post, user=cls.viewer, reaction_type='love')
+            Reaction.objects.create(post=post, user=cls.author, reaction_type='like')
+            Reaction.objects.create(comment=comment, user=cls.viewer, reaction_type='haha')
+
+    def _count_queries(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            posts, _ = get_feed_page(self.viewer, page_size=page_size)
+            attach_viewer_state(posts, self.viewer)
+        return len(ctx.captured_queries), posts
+
+    def test_query_count_is_constant(self):
+        small, _ = self._count_queries(2)
+        large, posts = self._count_queries(10)
+        self.assertEqual(len(posts), 10)
+        self.assertEqual(small, large)
+
+    def test_viewer_state_values(self):
+        _, posts = self._count_queries(3)
+        for post in posts:
+            self.assertEqual(post.user_reaction.reaction_type, 'love')
+            self.assertEqual(post.total_reactions, 2)
+            self.assertEqual(post.total_comments, 1)
+            for comment in post.comments.all():
+                if comment.parent_id is None:
+                    self.assertEqual(comment.user_reaction.reaction_type, 'haha')
+                else:
+                    self.assertIsNone(comment.user_reaction)
+
+
+@mock.patch('core.utils.ranking._following_ids', return_value=[])
+class RankedFeedCursorTests(TestCase):
+    """Le défilement du mode "ranked" reste dans le classement de la première page."""
+
+    def setUp(self):
+        cache.clear()
+        self.viewer = User.objects.create_user('ranker', password='x')
+        for i in range(7):
+            Post.objects.create(user=self.viewer, content=f'Post {i}', likes_count=i % 3)
+
+    def test_pages_cover_ranking_once(self, _following_ids):
+        seen, cursor = [], None
+        while True:
+            posts, cursor = get_ranked_feed_page(self.viewer, cursor=cursor, page_size=3)
+            seen.extend(post.id for post in posts)
+            if cursor is None:
+                break
+        self.assertEqual(sorted(seen), sorted(Post.objects.values_list('id', flat=True)))
+
+    def test_expired_ranking_asks_for_restart(self, _following_ids):
+        _, cursor = get_ranked_feed_page(self.viewer, page_size=3)
+        cache.clear()
+        self.assertEqual(get_ranked_feed_page(self.viewer, cursor=cursor, page_size=3), (None, None))
+
+
+class CategoryCounterTests(TestCase):
+    """Les compteurs maintenus à l'écriture restent égaux à un recalcul complet."""
+
+    def test_counters_follow_post_lifecycle(self):
+        user = User.objects.create_user('owner', password='x')
+        photo = Post.objects.create(user=user, image='a.jpg', image_category='sea')
+        draft = Post.objects.create(user=user, content='Brouillon', visibility='private')
+
+        # Reclassification sur une instance chargée avec des champs différés
+        photo = Post.objects.only('id').get(pk=photo.pk)
+        photo.image_category = 'forest'
+        photo.save()
+        draft.visibility = 'public'
+        draft.save()
+
+        self.assertEqual(get_feed_category_counts(user)['all'], 2)
+        self.assertEqual(get_feed_category_counts(user)['forest'], 1)
+        self.assertEqual(get_album_category_counts(user).get('sea'), 0)
+
+        stored = {
+            (c.scope, c.user_id, c.category): c.count
+            for c in CategoryCounter.objects.exclude(count=0)
+        }
+        self.assertEqual(stored, dict(compute_counters()))
+
+        photo.delete()
+        draft.delete()
+        self.assertFalse(CategoryCounter.objects.exclude(count=0).exists())
+
+    def test_deleting_owner_removes_posts_from_counters(self):
+        user = User.objects.create_user('leaving', password='x')
+        other = User.objects.create_user('staying', password='x')
+        Post.objects.create(user=user, image='a.jpg', image_category='sea')
+        Post.objects.create(user=user, content='Privé', visibility='private')
+        Post.objects.create(user=other, image='b.jpg', image_category='sea')
+
+        user_id = user.pk
+        user.delete()
+
+        self.assertFalse(CategoryCounter.objects.filter(user_id=user_id).exists())
+        self.assertEqual(get_feed_category_counts(other)['sea'], 1)
+        stored = {
+            (c.scope, c.user_id, c.category): c.count
+            for c in CategoryCounter.objects.exclude(count=0)
+        }
+        self.assertEqual(stored, dict(compute_counters()))
+
+    def test_rebuild_corrects_drifted_counters(self):
+        user = User.objects.create_user('drifter', password='x')
+        Post.objects.create(user=user, image='a.jpg', image_category='sea')
+        CategoryCounter.objects.filter(scope='public', category='sea').update(count=5)
+        CategoryCounter.objects.filter(scope='album', user=user, category='').delete()
+        CategoryCounter.objects.create(scope='album', user=user, category='glacier', count=2)
+
+        expected, current, drifted = rebuild_counters()
+        self.assertEqual(len(drifted), 3)
+        self.assertEqual(current[('public', None, 'sea')], 5)
+        stored = {
+            (c.scope, c.user_id, c.category): c.count
+            for c in CategoryCounter.objects.exclude(count=0)
+        }
+        self.assertEqual(stored, dict(expected))
+        self.assertEqual(rebuild_counters()[2], [])
+
+    def test_state_is_tracked_on_load_only(self):
+        # Pas de hook post_init : les posts construits en mémoire ne paient rien
+        self.assertFalse(post_init.has_listeners(Post))
+        user = User.objects.create_user('loader', password='x')
+        post = Post.objects.create(user=user, image='a.jpg', image_category='sea', visibility='friends')
+        self.assertEqual(Post.objects.get(pk=post.pk)._counter_state, (user.pk, 'friends', 'sea', True))
+        self.assertIsNone(Post.objects.only('id').get(pk=post.pk)._counter_state)
+        self.assertFalse(hasattr(Post(user=user), '_counter_state'))
+
+
+class TimelineVisibilityTests(TestCase):
+    """Un post qui change de visibilité entre ou sort des timelines des followers."""
+
+    def setUp(self):
+        self.author = User.objects.create_user('editor', password='x')
+        self.db = mock.MagicMock()
+        self.db.profiles.find_one.return_value = {'followers': [7, 8, self.author.pk], 'follower_count': 3}
+        self.post = Post.objects.create(user=self.author, content='Brouillon', visibility='private')
+
+    def _push(self, user_id):
+        return UpdateOne(
+            {'user_id': user_id},
+            {'$push': {'post_ids': {'$each': [self.post.pk], '$position': 0, '$slice': get_timeline_max_size()}}},
+            upsert=True,
+        )
+
+    def test_post_made_public_is_pushed_to_followers(self):
+        self.post.visibility = 'public'
+        self.assertEqual(update_post_visibility(self.post, 'private', db=self.db), 2)
+        operations = self.db.timelines.bulk_write.call_args[0][0]
+        self.assertEqual(operations, [self._push(7), self._push(8)])
+
+    def test_post_made_private_is_pulled_from_followers(self):
+        self.post.visibility = 'friends'
+        self.db.timelines.update_many.return_value.modified_count = 2
+        self.assertEqual(update_post_visibility(self.post, 'public', db=self.db), 2)
+        self.db.timelines.update_many.assert_called_once_with(
+            {'user_id': {'$in': [7, 8]}}, {'$pull': {'post_ids': self.post.pk}}
+        )
+
+        # Entre deux visibilités non publiques : rien à faire
+        self.assertEqual(update_post_visibility(self.post, 'private', db=self.db), 0)
+        self.db.timelines.bulk_write.assert_not_called()
+
+    def test_edit_view_updates_timelines_after_commit(self):
+        self.client.force_login(self.author)
+        url = reverse('edit_post', args=[self.post.pk])
+        self.assertEqual(self.client.post(url, {'content': 'Publié', 'visibility': 'secret'}).status_code, 400)
+
+        with mock.patch('core.utils.timeline.get_db', return_value=self.db):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, {'content': 'Publié', 'visibility': 'public'})
+        self.assertEqual(response.json()['post']['visibility'], 'public')
+        self.assertEqual(self.db.timelines.bulk_write.call_args[0][0], [self._push(7), self._push(8)])
+
+        # Contenu seul : visibilité inchangée, pas d'écriture Mongo
+        with mock.patch('core.utils.timeline.get_db', return_value=self.db):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                self.client.post(url, {'content': 'Corrigé'})
+        self.assertEqual(callbacks, [])
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.content, self.post.visibility), ('Corrigé', 'public'))
+
+
+class PostCardCacheTests(TestCase):
+    """Le fragment en cache suit les commentaires sans invalidation explicite."""
+
+    def _render(self, viewer):
+        request = RequestFactory().get('/feed/')
+        request.user = viewer
+        posts = attach_viewer_state(Post.objects.filter(user=self.author), viewer)
+        return render_post_cards(posts, request)[0]
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('cardauthor', password='x')
+        UserProfile.objects.update_or_create(user=self.author, defaults={'slug': 'card-author'})
+        self.post = Post.objects.create(user=self.author, content='Carte')
+        self.comment = Comment.objects.create(post=self.post, user=self.author, content='Premier')
+
+    def test_comment_edit_changes_cached_card(self):
+        self.assertIn('Premier', self._render(self.author))
+
+        # Modification faite par un autre worker : pas d'invalidation dans ce cache
+        self.comment.content = 'Corrigé'
+        self.comment.save()
+        html = self._render(self.author)
+        self.assertIn('Corrigé', html)
+        self.assertNotIn('Premier', html)
+
+    def test_author_rename_changes_cached_card(self):
+        self.author.first_name = 'Amira'
+        self.author.save()
+        self.assertIn('Amira', self._render(self.author))
+
+        # Modification faite par un autre worker : pas d'invalidation dans ce cache
+        User.objects.filter(pk=self.author.pk).update(first_name='Nadia')
+        UserProfile.objects.filter(user=self.author).update(avatar='avatars/nadia.jpg')
+        html = self._render(User.objects.get(pk=self.author.pk))
+        self.assertIn('Nadia', html)
+        self.assertIn('avatars/nadia.jpg', html)
+
+    def test_relative_dates_are_not_cached(self):
+        html = self._render(self.author)
+        post = attach_viewer_state(Post.objects.filter(pk=self.post.pk), self.author)[0]
+        fragment = cache.get(post_card_key(post, 0))
+        self.assertIn('<!--viewer:post_time-->', fragment)
+        self.assertNotIn(' ago', fragment)
+        self.assertEqual(html.count(' ago'), 2)
+
+
+class StoryRingTests(TestCase):
+    """L'anneau de stories coûte un nombre fixe de requêtes."""
+
+    def test_ring_groups_and_seen_state(self):
+        viewer = User.objects.create_user('reader', password='x')
+        authors = [User.objects.create_user(f'storyteller{i}', password='x') for i in range(3)]
+        for author in authors:
+            for _ in range(2):
+                Story.objects.create(user=author, content_text='Hello')
+        seen_story = authors[0].stories.first()
+        self.assertTrue(record_story_view(seen_story, viewer))
+        self.assertFalse(record_story_view(seen_story, viewer))
+
+        get_story_ring(viewer)  # Construit l'index
+        with CaptureQueriesContext(connection) as ctx:
+            ring = get_story_ring(viewer)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        self.assertEqual(len(ring), 3)
+        self.assertTrue(all(len(group['stories']) == 2 for group in ring))
+        self.assertFalse(any(group['seen'] for group in ring))
+        first_author = next(group for group in ring if group['user'] == authors[0])
+        self.assertNotEqual(first_author['cover'], seen_story)
+        self.assertEqual([story.seen for story in first_author['stories']].count(True), 1)
+        seen_story.refresh_from_db()
+        self.assertEqual(seen_story.views_count, 1)
+
+
+def catalog_tables(cities=('Paris', 'Lyon', 'Tokyo', 'Kyoto')):
+    """Petit jeu de données de destinations au format de read_source_tables()."""
+    rows = {
+        'Paris': ('France', 'Europe', 'Mid-range', 48.85, 2.35, [5, 1, 2, 0, 4, 5, 2, 5, 0]),
+        'Lyon': ('France', 'Europe', 'Budget', 45.76, 4.83, [4, 1, 2, 0, 3, 5, 2, 4, 1]),
+        'Tokyo': ('Japan', 'Asia', 'Luxury', 35.68, 139.69, [4, 2, 1, 1, 5, 5, 3, 5, 0]),
+        'Kyoto': ('Japan', 'Asia', 'Mid-range', 35.01, 135.77, [5, 1, 4, 0, 1, 4, 4, 2, 3]),
+        'Nice': ('France', 'Europe', 'Luxury', 43.70, 7.27, [2, 2, 3, 5, 3, 4, 3, 2, 1]),
+    }
+    selected = [rows[city] for city in cities]
+    return {
+        'cities': {
+            'city': np.array(cities),
+            'country': np.array([row[0] for row in selected]),
+            'region': np.array([row[1] for row in selected]),
+            'budget_level': np.array([row[2] for row in selected]),
+            'description': np.array([f'Visiter {city}' for city in cities]),
+            'latitude': np.array([row[3] for row in selected]),
+            'longitude': np.array([row[4] for row in selected]),
+            'activities': np.array([row[5] for row in selected], dtype=np.int16),
+            'temps': np.array([[5.0 + month + index for month in range(12)] for index in range(len(cities))]),
+            'durations': np.array(['["Long weekend", "1 week"]'] * len(cities)),
+        },
+        'flags': {'code': np.array(['fr', 'jp']), 'flag': np.array(['fr.png', 'jp.png'])},
+        'workation': {
+            'city': np.array(['Lisbon', 'Bali', 'Porto']),
+            'country': np.array(['Portugal', 'Indonesia', 'Portugal']),
+            'wifi_speed': np.array([30.0, 20.0, 30.0]),
+            'coworking_spaces': np.array([100, 50, 100]),
+            'coffee_price': np.array([1.5, 3.0, 1.5]),
+            'accommodation_price': np.array([700.0, 350.0, 700.0]),
+        },
+    }
+
+
+class DestinationArtifactTests(SimpleTestCase):
+    """L'artefact compilé redonne le catalogue des CSV ; un rechargement ne touche pas l'ancien."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_artifact_round_trip(self):
+        tables = catalog_tables()
+        save_artifact(tables, self.directory)
+        loaded = load_artifact(self.directory)
+
+        self.assertIn('cities_index', loaded)
+        for name, columns in tables.items():
+            for column, values in columns.items():
+                self.assertIsInstance(loaded[name][column], np.memmap)
+                np.testing.assert_array_equal(loaded[name][column], values)
+
+        from_csv = DestinationCatalog(tables)
+        from_artifact = DestinationCatalog(loaded, source='artifact')
+        self.assertEqual(from_artifact.city_position(' kyoto', 'JAPAN'), from_csv.city_position('Kyoto', 'Japan'))
+        for field in DestinationRecord.__slots__:
+            self.assertEqual(getattr(from_artifact.records[2], field), getattr(from_csv.records[2], field))
+        self.assertEqual(from_artifact.countries, ['France', 'Japan'])
+
+    def test_reload_swaps_catalog(self):
+        save_artifact(catalog_tables(), self.directory)
+        loader = DestinationCatalogLoader(data_dir=self.directory, artifact_dir=self.directory)
+        first = loader.refresh()
+        self.assertEqual(first.source, 'artifact')
+        self.assertIs(loader.refresh(), first)
+
+        save_artifact(catalog_tables(('Nice', 'Tokyo')), self.directory)
+        manifest = os.path.join(self.directory, 'manifest.json')
+        stat = os.stat(manifest)
+        os.utime(manifest, (stat.st_atime, stat.st_mtime + 10))
+        second = loader.refresh()
+
+        self.assertIsNot(second, first)
+        self.assertTrue(second.has_city('Nice', 'France'))
+        # L'ancienne instance, encore utilisée par une requête en cours, reste cohérente
+        self.assertTrue(first.has_city('Paris', 'France'))
+        self.assertFalse(first.has_city('Nice', 'France'))
+        self.assertEqual(len(first.records), 4)
+
+
+class DestinationSimilarityTests(SimpleTestCase):
+    """Destinations similaires : cosinus des profils d'activités, sans la référence."""
+
+    def setUp(self):
+        self.tables = catalog_tables(('Paris', 'Lyon', 'Tokyo', 'Kyoto', 'Nice'))
+        self.catalog = DestinationCatalog(self.tables)
+
+    def test_similar_to_ranks_by_cosine(self):
+        activities = self.tables['cities']['activities'].astype(float)
+        vectors = activities / np.linalg.norm(activities, axis=1, keepdims=True)
+        expected = vectors @ vectors[0]
+        expected_order = [position for position in np.argsort(-expected, kind='stable').tolist() if position != 0]
+
+        positions, similarities = self.catalog.similar_to(0, k=3)
+        self.assertEqual(positions.tolist(), expected_order[:3])
+        np.testing.assert_allclose(similarities, expected[expected_order[:3]])
+
+        europe = self.catalog.region_keys == 'Europe'
+        self.assertEqual(self.catalog.similar_to(0, k=5, mask=europe)[0].tolist(), [1, 4])
+        # Plusieurs références : aucune n'est proposée
+        positions, _ = self.catalog.similar_to_many([0, 1], k=5)
+        self.assertEqual(sorted(positions.tolist()), [2, 3, 4])
+
+    def test_similarity_cache_is_bounded(self):
+        with mock.patch('core.utils.destinations.SIMILAR_CACHE_SIZE', 2):
+            for position in (0, 1, 2, 0):
+                self.catalog.similar_to(position)
+        self.assertEqual(list(self.catalog._similar_cache), [2, 0])
+
+
+class DestinationSearchTests(SimpleTestCase):
+    """Autocomplétion : préfixes de mots d'abord, trigrammes pour les fautes de frappe."""
+
+    def setUp(self):
+        tables = catalog_tables()
+        tables['cities']['city'] = np.array(['Paris', 'Lyon', 'New York', 'Zürich'])
+        tables['cities']['country'] = np.array(['France', 'France', 'United States', 'Switzerland'])
+        self.index = DestinationSearchIndex(DestinationCatalog(tables))
+
+    def _labels(self, query, **kwargs):
+        return [entry['label'] for entry in self.index.search(query, **kwargs)]
+
+    def test_prefix_search(self):
+        self.assertEqual(self._labels('par'), ['Paris, France'])
+        # Mot intérieur, accents et casse ignorés
+        self.assertEqual(self._labels('York'), ['New York, United States'])
+        self.assertEqual(self._labels('zur'), ['Zürich, Switzerland'])
+        self.assertEqual(self._labels('fr', kind='country'), ['France'])
+        self.assertEqual(self._labels('fr', kind='city'), [])
+        self.assertEqual(self._labels('  '), [])
+
+    def test_fuzzy_search(self):
+        self.assertEqual(self._labels('lyom'), ['Lyon, France'])
+        self.assertEqual(self._labels('pariss', kind='city'), ['Paris, France'])
+        # Pas de repli approché sous trois caractères
+        self.assertEqual(self._labels('ly'), ['Lyon, France'])
+        self.assertEqual(self._labels('lx'), [])
+
+
+class WorkationRankingTests(SimpleTestCase):
+    """Un classement workation par niveau de budget, calculé une fois."""
+
+    def test_ranking_per_budget_tier(self):
+        catalog = DestinationCatalog(catalog_tables())
+        order, scores = catalog.work_ranking('luxury')
+        # Lisbonne et Porto à égalité : ordre du dataset conservé
+        self.assertEqual(order.tolist(), [0, 2, 1])
+        self.assertEqual(scores, [66.5, 56.9, 66.5])
+
+        order, scores = catalog.work_ranking('economic')
+        self.assertEqual(order.tolist(), [1, 0, 2])
+        self.assertEqual(scores, [51.5, 56.9, 51.5])
+
+        # Budget inconnu : pas de critère de logement
+        self.assertEqual(catalog.work_ranking('unknown')[1], [51.5, 26.9, 51.5])
+        self.assertIs(catalog.work_ranking('luxury'), catalog.work_ranking('luxury'))
+        self.assertIs(catalog.work_ranking('unknown'), catalog.work_ranking(None))
+
+
+class ImageManifestTests(SimpleTestCase):
+    """Une destination affiche toujours la même image, sans lister les dossiers."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'image_manifest.json')
+        write_manifest({
+            'continents': {'Europe': ['a.jpg', 'b.jpg', 'c.jpg'], 'Afrique': ['sahara.png']},
+            'work': ['desk1.jpg', 'desk2.jpg'],
+        }, self.path)
+        self.manifest = ImageManifest(self.path).refresh()
+
+    def test_pick_is_deterministic(self):
+        image = self.manifest.continent_image('Europe', 'Paris|France')
+        expected = ['a.jpg', 'b.jpg', 'c.jpg'][zlib.crc32(b'paris|france') % 3]
+        self.assertEqual(image, f'/assets/images/Continent/Europe/{expected}')
+        self.assertEqual(self.manifest.continent_image('europe', 'PARIS|france'), image)
+        self.assertEqual(
+            self.manifest.work_image('Lisbon|Portugal'),
+            f"/assets/work/{['desk1.jpg', 'desk2.jpg'][zlib.crc32(b'lisbon|portugal') % 2]}",
+        )
+
+    def test_folder_fallbacks(self):
+        # Dossier français, région inconnue (continent par défaut), continent sans image
+        self.assertEqual(self.manifest.continent_image('Africa', 'x'), '/assets/images/Continent/Afrique/sahara.png')
+        self.assertEqual(self.manifest.continent_image('Atlantis', 'x'), '/assets/images/Continent/Afrique/sahara.png')
+        self.assertEqual(self.manifest.continent_image('Asia', 'x'), DEFAULT_CONTINENT_IMAGE)
+
+    def test_reloaded_when_file_changes(self):
+        write_manifest({'continents': {'Asia': ['fuji.jpg']}, 'work': []}, self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        self.manifest.refresh()
+        self.assertEqual(self.manifest.continent_image('Asia', 'Tokyo|Japan'), '/assets/images/Continent/Asia/fuji.jpg')
+
+
+@override_settings(PANEL_TIMEOUT=0.1, PANEL_TIMEOUTS={})
+class PanelTests(SimpleTestCase):
+    """Un panneau lent, en erreur ou jamais démarré laisse place à son repli."""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def _slow(self):
+        self.release.wait(5)
+        return 'slow'
+
+    def test_results_and_fallbacks(self):
+        def broken():
+            raise ValueError('Mongo indisponible')
+
+        results = panels.run_panels(
+            {'ok': lambda: [1], 'slow': self._slow, 'broken': broken},
+            fallbacks={'slow': None},
+        )
+        self.assertEqual(results, {'ok': [1], 'slow': None, 'broken': []})
+
+    def test_queued_panel_is_cancelled(self):
+        ran = []
+        with mock.patch.object(panels, '_executor', ThreadPoolExecutor(max_workers=1)) as executor:
+            self.addCleanup(executor.shutdown)
+            results = panels.run_panels({'slow': self._slow, 'queued': lambda: ran.append(True)})
+        self.assertEqual(results, {'slow': [], 'queued': []})
+        self.release.set()
+        executor.shutdown(wait=True)
+        self.assertEqual(ran, [])
+
+    @override_settings(PANEL_TIMEOUTS={'slow': 1.0})
+    def test_timeout_counts_from_panel_start(self):
+        def sleeper(seconds):
+            def panel():
+                time.sleep(seconds)
+                return 'done'
+            return panel
+
+        with mock.patch.object(panels, '_executor', ThreadPoolExecutor(max_workers=1)) as executor:
+            self.addCleanup(executor.shutdown)
+            # 'slow' attend 0,5 s en file puis dispose encore de sa seconde entière
+            results = panels.run_panels({'first': sleeper(0.5), 'slow': sleeper(0.8)})
+        self.assertEqual(results, {'first': [], 'slow': 'done'})
+
+class CompanionScorerTests(SimpleTestCase):
+    """Sans modèle compatible, le score pondéré prend le relais."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'travel_companions.joblib')
+        self.features = [[1, 2, 0, 1, 0], [0, 0, 1, 0, 1]]
+
+    def _save(self, constant, version=COMPANION_MODEL_VERSION):
+        from sklearn.dummy import DummyRegressor
+
+        model = DummyRegressor(strategy='constant', constant=constant)
+        model.fit(np.zeros((1, len(COMPANION_FEATURES))), [constant])
+        save_companion_model(model, {'version': version, 'features': COMPANION_FEATURES}, self.path)
+
+    def test_missing_model_uses_weighted_formula(self):
+        scorer = CompanionScorer(self.path).refresh()
+        self.assertIsNone(scorer.model)
+        np.testing.assert_array_equal(scorer.score(self.features), [115.0, 30.0])
+        np.testing.assert_array_equal(scorer.score(self.features), weighted_scores(self.features))
+        self.assertEqual(len(scorer.score([])), 0)
+
+    def test_incompatible_or_unreadable_model_is_ignored(self):
+        self._save(7.0, version=COMPANION_MODEL_VERSION + 1)
+        scorer = CompanionScorer(self.path).refresh()
+        self.assertIsNone(scorer.model)
+        np.testing.assert_array_equal(scorer.score(self.features), [115.0, 30.0])
+
+        with open(self.path, 'wb') as f:
+            f.write(b'corrompu')
+        os.utime(self.path, (0, 0))
+        self.assertIsNone(scorer.refresh().model)
+
+    def test_model_is_used_and_reloaded_on_change(self):
+        self._save(7.0)
+        scorer = CompanionScorer(self.path).refresh()
+        np.testing.assert_array_equal(scorer.score(self.features), [7.0, 7.0])
+
+        self._save(3.0)
+        os.utime(self.path, (0, 0))
+        np.testing.assert_array_equal(scorer.refresh().score(self.features), [3.0, 3.0])
+
+        os.remove(self.path)
+        self.assertIsNone(scorer.refresh().model)
+
+
+class RecommendationsTests(TestCase):
+    """Listes stockées : complétées, rechargées et rafraîchies sans tout recalculer."""
+
+    def setUp(self):
+        self.db = mock.MagicMock()
+        self.builds = []
+
+        def build_suggested(db, user_profile):
+            self.builds.append('suggested_users')
+            return {'suggested_users': [{'user_id': user_id} for user_id in (20, 21, 22, 23)]}
+
+        def build_companions(db, user_profile):
+            self.builds.append('travel_companions')
+            return {'travel_companions': [{'user_id': 30}]}
+
+        patcher = mock.patch.dict(recommendations.SECTION_BUILDERS, {
+            'suggested_users': build_suggested, 'travel_companions': build_companions,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _stored(self, sections):
+        self.db.user_recommendations.find_one.return_value = {
+            'version': recommendations.RECOMMENDATIONS_VERSION, 'sections': sections,
+        }
+
+    def test_missing_section_is_computed_and_stored(self):
+        self._stored({'travel_companions': [{'user_id': 31}]})
+        result = recommendations.get_recommendations(
+            self.db, {'user_id': 1}, ['suggested_users', 'travel_companions']
+        )
+        self.assertEqual(self.builds, ['suggested_users'])
+        self.assertEqual([entry['user_id'] for entry in result['travel_companions']], [31])
+        update = self.db.user_recommendations.update_one.call_args[0][1]
+        self.assertEqual(list(update['$set']), ['sections.suggested_users'])
+
+    def test_short_section_is_recomputed(self):
+        self._stored({'suggested_users': [{'user_id': user_id} for user_id in (10, 11, 12, 13, 14)]})
+
+        # Un abonnement : la section reste assez longue
+        result = recommendations.get_recommendations(self.db, {'user_id': 1, 'following': [10]}, ['suggested_users'])
+        self.assertEqual([entry['user_id'] for entry in result['suggested_users']], [11, 12, 13, 14])
+        self.assertEqual(self.builds, [])
+
+        result = recommendations.get_recommendations(
+            self.db, {'user_id': 1, 'following': [10, 11]}, ['suggested_users']
+        )
+        self.assertEqual(self.builds, ['suggested_users'])
+        self.assertEqual([entry['user_id'] for entry in result['suggested_users']], [20, 21, 22, 23])
+        self.db.user_recommendations.update_one.assert_called_once()
+
+    @mock.patch('core.utils.recommendations.get_profile_similarity_index')
+    def test_find_stale_users(self, get_index):
+        since = timezone.now()
+        get_index.return_value.candidates.return_value = [3, 4]
+        self.db.profiles.find.return_value = [{'user_id': 1}]
+
+        def find_recommendations(query, projection):
+            if 'neighbour_ids' in query:
+                return [{'user_id': 1}, {'user_id': 2}]
+            # Seul 3 a des listes stockées parmi les candidats
+            return [{'user_id': user_id} for user_id in query['user_id']['$in'] if user_id == 3]
+
+        self.db.user_recommendations.find.side_effect = find_recommendations
+        self.assertEqual(recommendations.find_stale_users(self.db, since), ({1}, {2, 3}))
+        self.assertEqual(self.db.profiles.find.call_args[0][0], {'updated_at': {'$gt': since}})
+
+        self.db.profiles.find.return_value = []
+        self.db.user_recommendations.find.reset_mock()
+        self.assertEqual(recommendations.find_stale_users(self.db, since), (set(), set()))
+        self.db.user_recommendations.find.assert_not_called()
+
+    @mock.patch('core.management.commands.refresh_recommendations.refresh_user_recommendations')
+    def test_refresh_keeps_failed_users_for_next_run(self, refresh):
+        def refresh_or_fail(db, profile, started_at):
+            if profile['user_id'] == 2:
+                raise ValueError('Profil invalide')
+
+        refresh.side_effect = refresh_or_fail
+        self.db.recommendation_runs.find_one.return_value = None
+        self.db.profiles.find.return_value = [{'user_id': user_id} for user_id in (1, 2, 3)]
+        with mock.patch('core.management.commands.refresh_recommendations.get_db', return_value=self.db):
+            call_command('refresh_recommendations', stdout=StringIO())
+        update = self.db.recommendation_runs.update_one.call_args[0][1]
+        self.assertEqual(update['$set']['failed_ids'], [2])
+
+        # Passage suivant : aucun profil modifié, l'échec est repris
+        self.db.recommendation_runs.find_one.return_value = {'started_at': timezone.now(), 'failed_ids': [2]}
+        self.db.profiles.find.return_value = []
+        with mock.patch('core.management.commands.refresh_recommendations.get_db', return_value=self.db):
+            output = StringIO()
+            call_command('refresh_recommendations', '--dry-run', stdout=output)
+        self.assertIn('1 échec(s) à reprendre', output.getvalue())
+
+
+class ProfileSimilarityTests(SimpleTestCase):
+    """La matrice creuse donne les mêmes scores qu'une comparaison profil par profil."""
+
+    def setUp(self):
+        self.profiles = [
+            {'user_id': 1, 'travel_type': ['beach', 'city'], 'languages': ['fr', 'en'],
+             'nationality': 'FR', 'interests': ['food']},
+            {'user_id': 2, 'travel_type': ['beach'], 'languages': ['en'], 'nationality': 'US',
+             'interests': ['food', 'art']},
+            {'user_id': 3, 'travel_type': ['mountain'], 'languages': ['de'], 'nationality': 'DE',
+             'interests': ['ski']},
+            {'user_id': 4, 'travel_type': 'city', 'languages': ['fr'], 'nationality': 'FR'},
+            {'user_id': 5, 'nationality': 'FR', 'future_countries': ['Japan']},
+        ]
+        self.viewer = {'user_id': 99, 'travel_type': ['beach', 'city'], 'languages': ['fr'],
+                       'nationality': 'FR', 'interests': ['food'], 'future_countries': ['Japan']}
+
+    def _expected(self, profiles):
+        """Top des profils par comparaison directe des valeurs (score > 0, ordre MongoDB)."""
+        viewer = profile_tokens(self.viewer)
+        scored = [
+            (profile['user_id'], sum(SIMILARITY_WEIGHTS[field] for field, _ in viewer & profile_tokens(profile)))
+            for profile in profiles
+        ]
+        return sorted([item for item in scored if item[1]], key=lambda item: -item[1])
+
+    def test_top_k_matches_pairwise_scores(self):
+        index = ProfileSimilarityIndex(self.profiles)
+        self.assertEqual(index.top_k(self.viewer, 10), self._expected(self.profiles))
+        self.assertEqual(index.top_k(self.viewer, 10), [(1, 13), (4, 8), (2, 5), (5, 5)])
+        self.assertEqual(index.top_k(self.viewer, 2, exclude={1}), [(4, 8), (2, 5)])
+        self.assertEqual(index.top_k(self.viewer, 0), [])
+
+    @override_settings(PROFILE_INDEX_COMPACT_SIZE=2)
+    def test_updates_and_compaction_match_a_rebuild(self):
+        index = ProfileSimilarityIndex(self.profiles)
+        profiles = list(self.profiles)
+
+        profiles[2] = {**profiles[2], 'nationality': 'FR', 'interests': ['food']}
+        index.update(profiles[2])
+        self.assertEqual(set(index._state['pending']), {3})
+        self.assertEqual(index.top_k(self.viewer, 10), self._expected(profiles))
+
+        # Deuxième profil en attente : fusion dans la matrice, rangs conservés
+        profiles.append({'user_id': 6, 'travel_type': ['beach'], 'nationality': 'FR'})
+        index.update(profiles[-1])
+        self.assertEqual(index._state['pending'], {})
+        self.assertEqual(index._state['user_ids'].tolist(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(index.top_k(self.viewer, 10), self._expected(profiles))
+        self.assertEqual(index.top_k(self.viewer, 10), ProfileSimilarityIndex(profiles).top_k(self.viewer, 10))
+
+    def test_candidates_follow_inverted_index(self):
+        index = ProfileSimilarityIndex(self.profiles)
+        self.assertEqual(index.candidates(self.viewer, ['future_countries'], budget=10), [5])
+        # Valeur la plus spécifique (Japan : un seul profil) avant la nationalité
+        self.assertEqual(index.candidates(self.viewer, ['nationality', 'future_countries'], budget=1), [5])
+        self.assertEqual(
+            index.candidates(self.viewer, ['nationality', 'future_countries'], budget=10, exclude={4}), [5, 1]
+        )
+        self.assertEqual(index.candidates({'nationality': 'IT'}, ['nationality'], budget=10), [])
+
+        everyone = index.candidates(self.viewer, list(SIMILARITY_WEIGHTS), budget=10)
+        self.assertEqual(sorted(everyone), [1, 2, 4, 5])
+        self.assertEqual(len(index.candidates(self.viewer, list(SIMILARITY_WEIGHTS), budget=2)), 2)
+
+    def test_budget_limits_scored_candidates(self):
+        index = ProfileSimilarityIndex(self.profiles)
+        user_ids, _, _ = index.scores(self.viewer, budget=2)
+        self.assertEqual(len(user_ids), 2)
+
+        # Profil modifié : candidat en attente, l'ancienne ligne n'est plus proposée
+        index.update({'user_id': 3, 'future_countries': ['Japan']})
+        index.update({'user_id': 1, 'nationality': 'DE'})
+        self.assertEqual(index.candidates(self.viewer, ['future_countries'], budget=10), [3, 5])
+        self.assertEqual(sorted(index.candidates(self.viewer, ['travel_type'], budget=10)), [2, 4])
+
+
+class SweepExpiredStoriesTests(TestCase):
+    """La purge respecte le délai de grâce, le découpage en lots et le dry-run."""
+
+    def setUp(self):
+        self.author = User.objects.create_user('sweeper', password='x')
+        self.viewer = User.objects.create_user('sweepviewer', password='x')
+        self.expired = []
+        for age in (26, 27, 28, 29, 30):
+            story = Story.objects.create(user=self.author, content_text=f'{age}h')
+            StoryView.objects.create(story=story, viewer=self.viewer)
+            Story.objects.filter(pk=story.pk).update(created_at=timezone.now() - timedelta(hours=age))
+            self.expired.append(story.pk)
+        self.active = Story.objects.create(user=self.author, content_text='Active').pk
+
+    def _sweep(self, *args):
+        out = StringIO()
+        call_command('sweep_expired_stories', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_changes_nothing(self):
+        output = self._sweep('--dry-run')
+        self.assertIn('Stories: 5', output)
+        self.assertIn('Vues: 5', output)
+        self.assertEqual(Story.objects.count(), 6)
+        self.assertEqual(StoryView.objects.count(), 5)
+
+    def test_batches_and_grace_period(self):
+        # 26h et 27h : expirées depuis moins de 4h, gardées
+        output = self._sweep('--batch-size', '2', '--grace-hours', '4')
+        self.assertIn('Lots traités: 2', output)
+        self.assertEqual(
+            sorted(Story.objects.values_list('pk', flat=True)), sorted(self.expired[:2] + [self.active])
+        )
+        self.assertEqual(StoryView.objects.count(), 2)
+        self.assertTrue(post_delete.has_listeners(StoryView))
+
+        self._sweep('--batch-size', '1', '--max-batches', '1')
+        self.assertEqual(sorted(Story.objects.values_list('pk', flat=True)), sorted(self.expired[1:2] + [self.active]))
+
+    def test_archive_written_after_commit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stories.jsonl')
+            with self.captureOnCommitCallbacks() as callbacks:
+                self._sweep('--archive', path, '--batch-size', '3')
+            self.assertFalse(os.path.exists(path))
+
+            for callback in callbacks:
+                callback()
+            with open(path, encoding='utf-8') as archive:
+                lines = [json.loads(line) for line in archive]
+        self.assertEqual([line['id'] for line in lines], self.expired)
+        self.assertEqual(lines[0]['content_text'], '26h')
+
+class UserDirectoryTests(TestCase):
+    """Les listes venues de Mongo se résolvent en une requête, avec des slugs utilisables."""
+
+    def setUp(self):
+        self.directory = UserDirectory(ttl=60)
+        self.users = [User.objects.create_user(f'member{i}', password='x') for i in range(6)]
+        for user in self.users[:4]:
+            UserProfile.objects.create(user=user, slug=f'member-{user.id}')
+
+    def test_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as ctx:
+            entries = self.directory.resolve([user.id for user in self.users] + [999999])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(set(entries), {user.id for user in self.users})
+        self.assertIsNone(entries[self.users[5].id]['slug'])
+
+        with self.assertNumQueries(0):
+            self.directory.resolve([user.id for user in self.users[:4]])
+
+    def test_repair_reloads_cached_invalid_slug(self):
+        user = self.users[0]
+        UserProfile.objects.filter(user=user).update(slug='a.b@x.com')
+        # Mis en cache sans réparation (cartes de profils)
+        self.assertEqual(self.directory.resolve([user.id])[user.id]['slug'], 'a.b@x.com')
+
+        entries = self.directory.resolve([user.id, self.users[5].id], create_missing_profiles=True)
+        self.assertEqual(entries[user.id]['slug'], f'user-{user.id}')
+        self.assertEqual(entries[self.users[5].id]['slug'], f'user-{self.users[5].id}')
+        for entry in entries.values():
+            reverse('profile', kwargs={'slug': entry['slug']})
+        self.assertEqual(UserProfile.objects.get(user=user).slug, f'user-{user.id}')
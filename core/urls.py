@@ -39,6 +39,10 @@ urlpatterns = [
     path('api/add-favorite/', views.add_favorite, name='add_favorite'),
     path('api/remove-favorite/', views.remove_favorite, name='remove_favorite'),
     path('api/pass-destination/', views.pass_destination, name='pass_destination'),
+    path('api/destinations/nearby/', views.nearby_destinations, name='nearby_destinations'),
+    path('api/destinations/similar/', views.similar_destinations, name='similar_destinations'),
+    path('api/destinations/climate/', views.climate_destinations, name='climate_destinations'),
+    path('api/destinations/autocomplete/', views.destination_autocomplete, name='destination_autocomplete'),
     # Feed
 
     
@@ -46,6 +50,7 @@ urlpatterns = [
     # FEED
     # ============================================
     path('feed/', views.feed, name='feed'),
+    path('api/feed/', views.feed_page, name='feed_page'),
     # work
     path('work/', views.work, name='work'),
     
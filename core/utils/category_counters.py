@@ -0,0 +1,224 @@
+# core/utils/category_counters.py
+"""
+Compteurs de posts par catégorie d'image (badges du feed et des albums).
+
+Chaque état d'un post contribue à un petit ensemble de clés
+(scope, user_id, category) ; à chaque sauvegarde/suppression on applique la
+différence entre l'ancien et le nouvel état (voir core/signals.py). La
+lecture des badges devient une simple lecture de quelques lignes.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from core.models import CategoryCounter, Post
+
+# Champs de Post dont dépendent les compteurs
+TRACKED_FIELDS = Post.COUNTER_FIELDS
+
+# Badges affichés dans le feed et les albums
+CATEGORY_BADGES = [
+    ('all', 'Tous', '🌍'),
+    ('sea', 'Mer', '🌊'),
+    ('mountain', 'Montagne', '⛰️'),
+    ('forest', 'Forêt', '🌲'),
+    ('buildings', 'Ville', '🏢'),
+    ('street', 'Rue', '🛣️'),
+    ('glacier', 'Glacier', '❄️'),
+]
+
+
+def counter_keys(user_id, visibility, image_category, has_image):
+    """
+    Clés de compteurs auxquelles contribue un post.
+
+    Returns:
+        set: Ensemble de tuples (scope, user_id ou None, category)
+    """
+    if visibility == 'public':
+        scope, owner = 'public', None
+    else:
+        scope, owner = 'private', user_id
+    keys = {(scope, owner, '')}
+    if image_category:
+        keys.add((scope, owner, image_category))
+    if has_image:
+        keys.add(('album', user_id, ''))
+        if image_category:
+            keys.add(('album', user_id, image_category))
+    return keys
+
+
+def tracked_state(post):
+    """
+    Valeurs brutes des champs suivis (Post.counter_state()).
+
+    Mémorisé à chaque chargement de Post (Post.from_db) : on se limite à un
+    tuple de quatre valeurs, les clés ne sont calculées qu'à la
+    sauvegarde/suppression.
+
+    Returns:
+        tuple: (user_id, visibility, image_category, has_image), ou None si
+        un champ suivi est différé (.only()/.defer())
+    """
+    return post.counter_state()
+
+
+def state_keys(state):
+    """Clés de compteurs d'un état renvoyé par tracked_state()."""
+    return counter_keys(*state) if state else set()
+
+
+def snapshot(post):
+    """
+    Clés de compteurs de l'état courant d'un post, sans requête SQL.
+
+    Returns:
+        set: Les clés, ou None si un champ suivi est différé (.only()/.defer())
+    """
+    state = tracked_state(post)
+    return None if state is None else state_keys(state)
+
+
+def stored_snapshot(post_id):
+    """Clés de compteurs d'un post telles qu'enregistrées en base."""
+    row = Post.objects.filter(pk=post_id).values(
+        'user_id', 'visibility', 'image_category', 'image'
+    ).first()
+    if row is None:
+        return set()
+    return counter_keys(row['user_id'], row['visibility'], row['image_category'], bool(row['image']))
+
+
+def apply_changes(old_keys, new_keys):
+    """
+    Applique la différence entre deux états d'un post aux compteurs.
+
+    Les mises à jour se font avec F() dans une transaction : deux écritures
+    concurrentes ne perdent pas d'incrément. Une ligne de compteur n'est
+    créée que pour un incrément : une suppression ne fait que décrémenter
+    les lignes existantes (lors de la suppression en cascade d'un
+    utilisateur, ses compteurs ont déjà été supprimés et ne doivent pas
+    être recréés).
+    """
+    old_keys, new_keys = old_keys or set(), new_keys or set()
+    deltas = {key: -1 for key in old_keys - new_keys}
+    deltas.update({key: 1 for key in new_keys - old_keys})
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        for (scope, user_id, category), delta in deltas.items():
+            counters = CategoryCounter.objects.filter(scope=scope, user_id=user_id, category=category)
+            if counters.update(count=F('count') + delta) or delta < 0:
+                continue
+            CategoryCounter.objects.get_or_create(scope=scope, user_id=user_id, category=category)
+            counters.update(count=F('count') + delta)
+
+
+def get_feed_category_counts(user):
+    """
+    Compteurs visibles dans le feed : posts publics + posts non publics de l'utilisateur.
+
+    Returns:
+        dict: {category: count}, la clé 'all' contenant le total
+    """
+    counts = defaultdict(int)
+    rows = CategoryCounter.objects.filter(
+        Q(scope='public', user__isnull=True) | Q(scope='private', user=user)
+    ).values_list('category', 'count')
+    for category, count in rows:
+        counts[category or 'all'] += count
+    return counts
+
+
+def get_album_category_counts(user):
+    """
+    Compteurs des albums d'un utilisateur (posts avec image).
+
+    Returns:
+        dict: {category: count}, la clé 'all' contenant le total
+    """
+    rows = CategoryCounter.objects.filter(scope='album', user=user).values_list('category', 'count')
+    return {category or 'all': count for category, count in rows}
+
+
+def build_category_badges(counts):
+    """Liste des catégories (id, nom, icône, compteur) pour les templates."""
+    return [
+        {'id': category_id, 'name': name, 'icon': icon, 'count': counts.get(category_id, 0)}
+        for category_id, name, icon in CATEGORY_BADGES
+    ]
+
+
+def compute_counters():
+    """
+    Recalcule tous les compteurs depuis la table Post (agrégats groupés).
+
+    Returns:
+        Counter: {(scope, user_id, category): count}
+    """
+    counters = Counter()
+
+    def add(scope, rows, per_user):
+        for row in rows:
+            owner = row['user_id'] if per_user else None
+            counters[(scope, owner, '')] += row['n']
+            if row['image_category']:
+                counters[(scope, owner, row['image_category'])] += row['n']
+
+    add('public', Post.objects.filter(visibility='public').order_by()
+        .values('image_category').annotate(n=Count('id')), per_user=False)
+    add('private', Post.objects.exclude(visibility='public').order_by()
+        .values('user_id', 'image_category').annotate(n=Count('id')), per_user=True)
+    add('album', Post.objects.filter(image__isnull=False).exclude(image='').order_by()
+        .values('user_id', 'image_category').annotate(n=Count('id')), per_user=True)
+    return counters
+
+
+def stored_counters(lock=False):
+    """
+    Compteurs enregistrés.
+
+    Args:
+        lock: Verrouiller les lignes (select_for_update, dans une transaction)
+
+    Returns:
+        dict: {(scope, user_id, category): count}
+    """
+    queryset = CategoryCounter.objects.select_for_update() if lock else CategoryCounter.objects.all()
+    return {
+        (scope, user_id, category): count
+        for scope, user_id, category, count in queryset.values_list('scope', 'user_id', 'category', 'count')
+    }
+
+
+def drifted_keys(expected, current):
+    """Clés dont le compteur enregistré diffère de la valeur recalculée."""
+    return [key for key in set(expected) | set(current) if expected.get(key, 0) != current.get(key, 0)]
+
+
+def rebuild_counters():
+    """
+    Recalcule les compteurs et corrige ceux qui ont dérivé.
+
+    Les lignes de compteurs sont verrouillées avant le recalcul, dans la même
+    transaction : une mise à jour concurrente (apply_changes) attend la fin
+    de la reconstruction et s'applique à la valeur corrigée au lieu d'être
+    écrasée. Seules les clés désynchronisées sont réécrites.
+
+    Returns:
+        tuple: (compteurs recalculés, compteurs enregistrés avant correction,
+        clés corrigées)
+    """
+    with transaction.atomic():
+        current = stored_counters(lock=True)
+        expected = compute_counters()
+        drifted = drifted_keys(expected, current)
+        for scope, user_id, category in drifted:
+            CategoryCounter.objects.update_or_create(
+                scope=scope, user_id=user_id, category=category,
+                defaults={'count': expected.get((scope, user_id, category), 0)},
+            )
+    return expected, current, drifted
@@ -0,0 +1,176 @@
+# core/utils/companions.py
+"""
+Score des compagnons de voyage (panneau "Travel companions" du feed).
+
+Le modèle (RandomForestRegressor) est entraîné hors ligne par
+`manage.py train_companion_model` et sauvegardé avec ses métadonnées
+versionnées. Le web le charge une seule fois par processus (rechargé si le
+fichier change) et ne prédit que sur un ensemble borné de candidats.
+Sans modèle compatible, le score pondéré (formule fermée) est utilisé.
+"""
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Version du schéma des caractéristiques : à incrémenter si COMPANION_FEATURES change
+COMPANION_MODEL_VERSION = 1
+
+COMPANION_FEATURES = [
+    'budget_match',       # 0 ou 1 (budget dans ±20%)
+    'travel_type_score',  # Nombre de styles de voyage communs
+    'language_score',     # Nombre de langues communes
+    'interest_score',     # Nombre d'intérêts communs
+    'nationality_match',  # 0 ou 1 (même nationalité)
+]
+COMPANION_WEIGHTS = np.array([40, 30, 20, 15, 10], dtype=float)
+
+# Champs dont une valeur commune fait d'un profil un candidat (index inversé des profils)
+COMPANION_CANDIDATE_FIELDS = ['travel_type', 'languages', 'interests', 'nationality']
+
+# Champs Mongo nécessaires au score et à l'affichage d'un candidat
+COMPANION_PROFILE_FIELDS = {
+    'user_id': 1, 'first_name': 1, 'last_name': 1, 'profile_image': 1, 'follower_count': 1,
+    'travel_budget': 1, 'travel_type': 1, 'languages': 1, 'interests': 1, 'nationality': 1,
+}
+
+
+def get_companion_model_path():
+    """Chemin du modèle entraîné (settings.COMPANION_MODEL_PATH)."""
+    default = settings.BASE_DIR / 'models' / 'travel_companions.joblib'
+    return str(getattr(settings, 'COMPANION_MODEL_PATH', default))
+
+
+def get_companion_candidate_limit():
+    """Nombre maximum de profils candidats scorés par requête."""
+    return getattr(settings, 'COMPANION_CANDIDATE_LIMIT', 200)
+
+
+def _budget_value(budget):
+    try:
+        return float(budget) if budget else 0
+    except (ValueError, TypeError):
+        return 0
+
+
+def companion_features(user_profile, profile):
+    """
+    Caractéristiques d'un couple (utilisateur, candidat), dans l'ordre de COMPANION_FEATURES.
+    """
+    user_budget = _budget_value(user_profile.get('travel_budget', 0))
+    budget = _budget_value(profile.get('travel_budget', 0))
+    user_nationality = user_profile.get('nationality', '')
+    return [
+        1 if user_budget and abs(user_budget - budget) <= user_budget * 0.2 else 0,
+        len(set(user_profile.get('travel_type', [])) & set(profile.get('travel_type', []))),
+        len(set(user_profile.get('languages', [])) & set(profile.get('languages', []))),
+        len(set(user_profile.get('interests', [])) & set(profile.get('interests', []))),
+        1 if user_nationality and user_nationality == profile.get('nationality', '') else 0,
+    ]
+
+
+def weighted_scores(features):
+    """Score pondéré (formule fermée) d'une matrice de caractéristiques."""
+    return np.asarray(features, dtype=float).reshape(-1, len(COMPANION_FEATURES)) @ COMPANION_WEIGHTS
+
+
+def save_companion_model(model, metadata, path=None):
+    """
+    Sauvegarde le modèle et ses métadonnées (dans le fichier et en JSON à côté).
+
+    Returns:
+        str: Chemin du modèle
+    """
+    import joblib
+
+    path = path or get_companion_model_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    joblib.dump({'model': model, 'metadata': metadata}, tmp_path)
+    os.replace(tmp_path, path)
+    with open(f'{os.path.splitext(path)[0]}_metadata.json', 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    return path
+
+
+class CompanionScorer:
+    """
+    Modèle de score des compagnons, chargé à la demande.
+
+    Rechargé si le fichier du modèle change ; ignoré (formule pondérée) s'il est
+    absent, illisible ou d'une autre version de caractéristiques.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or get_companion_model_path()
+        self._lock = threading.Lock()
+        self._mtime = object()  # Jamais égal : premier chargement forcé
+        self.model = None
+        self.metadata = {}
+
+    def refresh(self):
+        """Charge le modèle si le fichier a changé depuis le dernier chargement."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return self
+
+        with self._lock:
+            if mtime != self._mtime:
+                self.model, self.metadata = None, {}
+                if mtime is not None:
+                    self._load()
+                self._mtime = mtime
+        return self
+
+    def _load(self):
+        import joblib
+
+        try:
+            bundle = joblib.load(self.path)
+            metadata = bundle.get('metadata', {})
+        except Exception as e:
+            logger.warning("Modèle compagnons illisible (%s) : %s", self.path, e)
+            return
+        if metadata.get('version') != COMPANION_MODEL_VERSION or metadata.get('features') != COMPANION_FEATURES:
+            logger.warning(
+                "Modèle compagnons ignoré : version %s (attendue %s), relancer train_companion_model",
+                metadata.get('version'), COMPANION_MODEL_VERSION,
+            )
+            return
+        self.model, self.metadata = bundle['model'], metadata
+        logger.info("Modèle compagnons chargé (entraîné le %s)", metadata.get('trained_at'))
+
+    def score(self, features):
+        """
+        Scores d'une matrice de caractéristiques (candidats × COMPANION_FEATURES).
+
+        Returns:
+            np.ndarray: Prédictions du modèle, ou score pondéré sans modèle
+        """
+        if not len(features):
+            return np.zeros(0)
+        if self.model is None:
+            return weighted_scores(features)
+        return self.model.predict(np.asarray(features, dtype=float))
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_companion_scorer():
+    """Scorer partagé du processus."""
+    global _scorer
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                _scorer = CompanionScorer()
+    return _scorer.refresh()
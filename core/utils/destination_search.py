@@ -0,0 +1,145 @@
+# core/utils/destination_search.py
+"""
+Index d'autocomplétion des villes et pays du catalogue de destinations.
+
+- Préfixe : tableau trié des termes normalisés (minuscules, sans accents),
+  recherche dichotomique. Chaque mot d'un nom est indexé ("york" trouve
+  New York).
+- Fautes de frappe : index de trigrammes, utilisé seulement si les préfixes
+  ne donnent pas assez de résultats.
+
+L'index est reconstruit automatiquement quand le catalogue est rechargé.
+"""
+import bisect
+import threading
+import unicodedata
+
+from core.utils.destinations import get_destination_catalog
+from core.utils.reference_data import country_code
+
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+
+def normalize(text):
+    """Minuscules, sans accents ni espaces superflus ("Zürich " → "zurich")."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.lower().split())
+
+
+def trigrams(text):
+    """Trigrammes d'un terme normalisé, bornés par des espaces."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DestinationSearchIndex:
+    """
+    Index en mémoire des villes (city, country) et pays du catalogue.
+
+    Chaque entrée est un dict prêt pour la réponse JSON :
+    {'type': 'city', 'city', 'country', 'label'} ou {'type': 'country', 'country', 'code', 'label'}
+    """
+
+    def __init__(self, catalog):
+        self.records = catalog.records
+        self.entries = []
+        for record in catalog.records:
+            self.entries.append({
+                'type': 'city',
+                'city': record.city,
+                'country': record.country,
+                'label': f'{record.city}, {record.country}',
+            })
+        for name in catalog.countries:
+            self.entries.append({
+                'type': 'country',
+                'country': name,
+                'code': country_code(name),
+                'label': name,
+            })
+
+        # Termes triés : (terme, position du mot dans le nom, id d'entrée)
+        terms = []
+        self._names = []
+        self._trigram_counts = []
+        self._trigrams = {}
+        for entry_id, entry in enumerate(self.entries):
+            name = normalize(entry['city'] if entry['type'] == 'city' else entry['country'])
+            self._names.append(name)
+            words = name.split()
+            for i in range(len(words)):
+                terms.append((' '.join(words[i:]), i, entry_id))
+            name_trigrams = trigrams(name)
+            self._trigram_counts.append(len(name_trigrams))
+            for trigram in name_trigrams:
+                self._trigrams.setdefault(trigram, []).append(entry_id)
+        terms.sort()
+        self._terms = [term for term, _, _ in terms]
+        self._term_entries = [(word, entry_id) for _, word, entry_id in terms]
+
+    def _prefix_matches(self, query):
+        """Ids des entrées dont un mot commence par la requête (début du nom d'abord)."""
+        start = bisect.bisect_left(self._terms, query)
+        end = bisect.bisect_left(self._terms, query + '\uffff', lo=start)
+        matches = sorted(self._term_entries[start:end], key=lambda item: (item[0], self._names[item[1]]))
+        seen = set()
+        return [entry_id for _, entry_id in matches if not (entry_id in seen or seen.add(entry_id))]
+
+    def _fuzzy_matches(self, query):
+        """Ids des entrées proches de la requête (similarité de trigrammes décroissante)."""
+        query_trigrams = trigrams(query)
+        shared = {}
+        for trigram in query_trigrams:
+            for entry_id in self._trigrams.get(trigram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+        scored = []
+        for entry_id, count in shared.items():
+            # Coefficient de Jaccard entre les deux ensembles de trigrammes
+            similarity = count / (len(query_trigrams) + self._trigram_counts[entry_id] - count)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored.append((-similarity, self._names[entry_id], entry_id))
+        scored.sort()
+        return [entry_id for _, _, entry_id in scored]
+
+    def search(self, query, limit=8, kind=None):
+        """
+        Suggestions pour une saisie partielle.
+
+        Args:
+            query: Texte saisi
+            limit: Nombre maximum de suggestions
+            kind: 'city', 'country' ou None (les deux)
+
+        Returns:
+            list: Entrées (dicts), préfixes d'abord puis correspondances approchées
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        def allowed(entry_ids):
+            return [entry_id for entry_id in entry_ids if not kind or self.entries[entry_id]['type'] == kind]
+
+        candidates = allowed(self._prefix_matches(query))
+        if len(candidates) < limit and len(query) >= 3:
+            prefixed = set(candidates)
+            candidates += [entry_id for entry_id in allowed(self._fuzzy_matches(query)) if entry_id not in prefixed]
+        return [self.entries[entry_id] for entry_id in candidates[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_destination_search_index():
+    """Index partagé du processus, reconstruit si le catalogue a été rechargé."""
+    global _index
+    catalog = get_destination_catalog()
+    index = _index
+    if index is None or index.records is not catalog.records:
+        with _index_lock:
+            if _index is None or _index.records is not catalog.records:
+                _index = DestinationSearchIndex(catalog)
+            index = _index
+    return index
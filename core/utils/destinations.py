@@ -0,0 +1,922 @@
+# core/utils/destinations.py
+"""
+Catalogue des destinations (Cities.csv, Flags.csv, workation.csv).
+
+Les trois jeux de données sont chargés, normalisés et indexés une seule fois
+par processus, puis partagés par toutes les requêtes (place, feed, work,
+add_favorite, pass_destination).
+
+Deux sources possibles :
+- l'artefact compilé par `manage.py build_destination_catalog` : un fichier
+  .npy par colonne, mappé en mémoire (pages partagées entre les workers
+  forkés, pandas non nécessaire) ;
+- à défaut, les CSV d'origine lus avec pandas.
+
+L'artefact contient aussi les colonnes dérivées (clés de recherche,
+vecteurs d'activités normalisés, index climatique) : un worker n'a presque
+rien à recalculer ni à copier au chargement.
+
+La source est rechargée automatiquement au prochain accès si son mtime
+change : un nouveau catalogue est construit à part puis remplace l'ancien
+en une seule affectation. Les tableaux exposés sont partagés : lecture seule.
+"""
+import ast
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import cached_property, lru_cache
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CITIES_FILE = 'Cities.csv'
+FLAGS_FILE = 'Flags.csv'
+WORKATION_FILE = 'workation.csv'
+ARTIFACT_MANIFEST = 'manifest.json'
+ARTIFACT_VERSION = 3
+EARTH_RADIUS_KM = 6371.0
+CLIMATE_CACHE_SIZE = 512  # Requêtes climatiques (mois, plage, budget) gardées en cache
+SIMILAR_CACHE_SIZE = 256  # Vecteurs de similarité (une destination de référence) gardés en cache
+RECORD_CACHE_SIZE = 1024  # DestinationRecord construits gardés en cache par catalogue
+
+# Colonnes de scores d'activités (0-5) de Cities.csv, dans l'ordre d'affichage
+ACTIVITY_COLUMNS = [
+    'culture', 'adventure', 'nature', 'beaches', 'nightlife',
+    'cuisine', 'wellness', 'urban', 'seclusion',
+]
+
+# Colonnes de workation.csv conservées (clé courte → en-tête du CSV)
+WORKATION_COLUMNS = {
+    'wifi_speed': 'Remote connection: Average WiFi speed (Mbps per second)',
+    'coworking_spaces': 'Co-working spaces: Number of co-working spaces',
+    'coffee_price': 'Caffeine: Average price of buying a coffee',
+    'accommodation_price': 'Accommodation: Average price of 1 bedroom apartment per month',
+}
+
+# Intérêts du profil → colonne d'activité
+INTEREST_TO_ACTIVITY = {
+    'adventure': 'adventure',
+    'culture': 'culture',
+    'gastronomy': 'cuisine',
+    'nature': 'nature',
+    'sport': 'adventure',
+    'relaxation': 'wellness',
+    'work': 'urban',
+}
+
+# Budget du profil → niveau de budget du dataset
+BUDGET_MAPPING = {
+    'economic': 'Budget',
+    'medium': 'Mid-range',
+    'comfort': 'Mid-range',
+    'luxury': 'Luxury',
+}
+BUDGET_HIERARCHY = {'Budget': 1, 'Mid-range': 2, 'Luxury': 3}
+
+
+def get_destinations_data_dir():
+    """Dossier contenant les CSV de destinations (settings.DESTINATIONS_DATA_DIR)."""
+    return str(getattr(settings, 'DESTINATIONS_DATA_DIR', settings.BASE_DIR / 'public'))
+
+
+def get_destinations_artifact_dir():
+    """Dossier de l'artefact compilé (settings.DESTINATIONS_ARTIFACT_DIR)."""
+    default = os.path.join(get_destinations_data_dir(), 'destinations_catalog')
+    return str(getattr(settings, 'DESTINATIONS_ARTIFACT_DIR', default))
+
+
+def parse_monthly_temps(temp_data):
+    """
+    Températures moyennes mensuelles d'une ville à partir de la colonne
+    avg_temp_monthly (JSON, parfois mal échappé).
+
+    Returns:
+        dict: {'1': {'avg': float ou None}, ..., '12': {...}}, {} si absent
+    """
+    if not isinstance(temp_data, (str, dict)) or not temp_data:
+        return {}
+    try:
+        if isinstance(temp_data, dict):
+            temp_dict = temp_data
+        else:
+            cleaned = temp_data.strip()
+            if cleaned.startswith('"') and cleaned.endswith('"'):
+                cleaned = cleaned[1:-1]
+            cleaned = cleaned.replace('""', '"').replace("'", '"')
+            if cleaned.startswith('1:{'):
+                cleaned = '{' + cleaned + '}'
+            temp_dict = json.loads(cleaned)
+
+        formatted_temps = {}
+        for month in range(1, 13):
+            month_str = str(month)
+            try:
+                formatted_temps[month_str] = {'avg': round(float(temp_dict[month_str]['avg']), 1)}
+            except (KeyError, ValueError, TypeError):
+                formatted_temps[month_str] = {'avg': None}
+        return formatted_temps
+    except (json.JSONDecodeError, AttributeError, TypeError) as e:
+        logger.error("Températures illisibles : %s → %s", temp_data, e)
+        return {str(i): {'avg': None} for i in range(1, 13)}
+
+
+def parse_ideal_durations(value):
+    """Durées de séjour conseillées (liste) à partir de la colonne ideal_durations."""
+    if not isinstance(value, str):
+        return value if isinstance(value, list) else []
+    try:
+        durations = json.loads(value)
+    except ValueError:
+        try:
+            durations = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return []
+    return list(durations) if isinstance(durations, (list, tuple)) else []
+
+
+def temps_to_json(temps_row):
+    """Sérialise une ligne de la matrice des températures ({} si aucune donnée)."""
+    values = temps_row.tolist()
+    if all(value != value for value in values):  # Que des NaN
+        return json.dumps({})
+    return json.dumps({
+        str(month): {'avg': None if value != value else value}
+        for month, value in enumerate(values, start=1)
+    })
+
+
+# ============================================
+# SOURCES : CSV ET ARTEFACT COMPILÉ
+# ============================================
+
+def read_source_tables(data_dir=None):
+    """
+    Lit et normalise les trois CSV (pandas n'est importé qu'ici).
+
+    Returns:
+        dict: {'cities': {colonne: np.ndarray}, 'flags': {...}, 'workation': {...}}
+    """
+    import pandas as pd
+
+    data_dir = data_dir or get_destinations_data_dir()
+
+    def text(series, title=True):
+        series = series.fillna('').astype(str)
+        if title:
+            series = series.str.strip().str.title()
+        return series.to_numpy(dtype=str)
+
+    cities = pd.read_csv(os.path.join(data_dir, CITIES_FILE))
+    temps = np.full((len(cities), 12), np.nan)
+    for i, raw in enumerate(cities['avg_temp_monthly']):
+        for month, value in parse_monthly_temps(raw).items():
+            if value['avg'] is not None:
+                temps[i, int(month) - 1] = value['avg']
+
+    flags = pd.read_csv(os.path.join(data_dir, FLAGS_FILE))
+    workation = pd.read_csv(os.path.join(data_dir, WORKATION_FILE))
+
+    return {
+        'cities': {
+            'city': text(cities['city']),
+            'country': text(cities['country']),
+            'region': text(cities['region']),
+            'budget_level': text(cities['budget_level']),
+            'description': text(cities['short_description'], title=False),
+            'latitude': cities['latitude'].to_numpy(dtype=float),
+            'longitude': cities['longitude'].to_numpy(dtype=float),
+            'activities': cities[ACTIVITY_COLUMNS].fillna(0).to_numpy(dtype=np.int16),
+            'temps': temps,
+            'durations': np.array(
+                [json.dumps(parse_ideal_durations(value)) for value in cities['ideal_durations']],
+                dtype=str,
+            ),
+        },
+        'flags': {
+            'code': np.char.lower(text(flags['Country code'], title=False)),
+            'flag': text(flags['Flag'], title=False),
+        },
+        'workation': {
+            'city': text(workation['City']),
+            'country': text(workation['Country']),
+            # dtype d'origine conservé (compteurs entiers, prix décimaux)
+            **{key: workation[column].to_numpy() for key, column in WORKATION_COLUMNS.items()},
+        },
+    }
+
+
+def validate_tables(tables):
+    """
+    Contrôles de cohérence avant compilation.
+
+    Returns:
+        list: Messages d'erreur (vide si les données sont valides)
+    """
+    errors = []
+    for name, columns in tables.items():
+        lengths = {column: len(values) for column, values in columns.items()}
+        if len(set(lengths.values())) > 1:
+            errors.append(f'{name} : colonnes de longueurs différentes {lengths}')
+
+    cities = tables['cities']
+    for column in ('city', 'country', 'region'):
+        empty = int((cities[column] == '').sum())
+        if empty:
+            errors.append(f'cities.{column} : {empty} valeur(s) vide(s)')
+    keys = np.char.add(np.char.add(np.char.lower(cities['city']), '|'), np.char.lower(cities['country']))
+    duplicates = len(keys) - len(np.unique(keys))
+    if duplicates:
+        errors.append(f'cities : {duplicates} destination(s) en double')
+    known_levels = {level.lower() for level in BUDGET_HIERARCHY}
+    unknown = sorted({level for level in cities['budget_level'].tolist() if level.lower() not in known_levels})
+    if unknown:
+        errors.append(f'cities.budget_level : niveaux inconnus {unknown}')
+    if ((cities['activities'] < 0) | (cities['activities'] > 5)).any():
+        errors.append("cities.activities : scores hors de l'intervalle 0-5")
+    if (np.abs(cities['latitude']) > 90).any() or (np.abs(cities['longitude']) > 180).any():
+        errors.append('cities : coordonnées hors limites')
+
+    if (np.char.str_len(tables['flags']['code']) != 2).any():
+        errors.append('flags.code : codes pays invalides')
+
+    workation = tables['workation']
+    for key in WORKATION_COLUMNS:
+        missing = int(np.isnan(workation[key]).sum())
+        if missing:
+            errors.append(f'workation.{key} : {missing} valeur(s) manquante(s)')
+    return errors
+
+
+def derive_index_tables(tables):
+    """
+    Colonnes dérivées utilisées par les recherches du catalogue.
+
+    Calculées à la compilation de l'artefact (ou au chargement des CSV) pour
+    être mappées en mémoire comme les colonnes sources.
+
+    Returns:
+        dict: {'cities_index': {colonne: np.ndarray}, 'workation_index': {...}}
+    """
+    cities = tables['cities']
+    country_key = np.char.lower(np.asarray(cities['country']))
+    destination_key = np.char.add(np.char.add(np.char.lower(np.asarray(cities['city'])), '|'), country_key)
+    key_order = np.argsort(destination_key, kind='stable')
+
+    activities = np.asarray(cities['activities'], dtype=np.int64)
+    norms = np.linalg.norm(activities, axis=1, keepdims=True)
+    temps = np.asarray(cities['temps'])
+    # Index climatique : pour chaque mois, villes triées par température (NaN en fin)
+    temps_order = np.argsort(temps, axis=0, kind='stable')
+
+    return {
+        'cities_index': {
+            'country_key': country_key,
+            'destination_key': destination_key,
+            # Clés triées et positions correspondantes (recherche dichotomique)
+            'sorted_key': destination_key[key_order],
+            'sorted_position': key_order.astype(np.int64),
+            'activity_vectors': np.divide(activities, norms, out=np.zeros(activities.shape), where=norms > 0),
+            'temps_order': temps_order.astype(np.int64),
+            'temps_sorted': np.take_along_axis(temps, temps_order, axis=0),
+            'budget_rank': np.array(
+                [BUDGET_HIERARCHY.get(label, 2) for label in np.asarray(cities['budget_level']).tolist()],
+                dtype=np.int8,
+            ),
+        },
+        'workation_index': {
+            'country_key': np.char.lower(np.asarray(tables['workation']['country'])),
+        },
+    }
+
+
+def save_artifact(tables, output_dir=None):
+    """
+    Écrit l'artefact compilé : un .npy par colonne (sources et colonnes
+    dérivées), puis manifest.json.
+
+    Returns:
+        int: Taille totale de l'artefact (octets)
+    """
+    output_dir = output_dir or get_destinations_artifact_dir()
+    os.makedirs(output_dir, exist_ok=True)
+
+    tables = {**tables, **derive_index_tables(tables)}
+    size = 0
+    for name, columns in tables.items():
+        for column, values in columns.items():
+            path = os.path.join(output_dir, f'{name}__{column}.npy')
+            np.save(f'{path}.tmp.npy', np.ascontiguousarray(values), allow_pickle=False)
+            os.replace(f'{path}.tmp.npy', path)
+            size += os.path.getsize(path)
+
+    # Manifeste écrit en dernier : les workers rechargent sur son mtime
+    manifest = {
+        'version': ARTIFACT_VERSION,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': {name: len(next(iter(columns.values()))) for name, columns in tables.items()},
+        'columns': {name: list(columns) for name, columns in tables.items()},
+    }
+    manifest_path = os.path.join(output_dir, ARTIFACT_MANIFEST)
+    with open(f'{manifest_path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+    return size + os.path.getsize(manifest_path)
+
+
+def load_artifact(artifact_dir=None):
+    """
+    Charge l'artefact compilé, colonnes mappées en mémoire (lecture seule).
+
+    Returns:
+        dict: Même structure que read_source_tables(), plus les tables de
+        derive_index_tables()
+    """
+    artifact_dir = artifact_dir or get_destinations_artifact_dir()
+    with open(os.path.join(artifact_dir, ARTIFACT_MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != ARTIFACT_VERSION:
+        raise ValueError(f"Version d'artefact non supportée : {manifest.get('version')}")
+    return {
+        name: {
+            column: np.load(os.path.join(artifact_dir, f'{name}__{column}.npy'), mmap_mode='r')
+            for column in columns
+        }
+        for name, columns in manifest['columns'].items()
+    }
+
+
+# ============================================
+# CATALOGUE
+# ============================================
+
+class DestinationRecord:
+    """
+    Champs d'affichage d'une ville (températures sérialisées, durées,
+    activités principales), construits à la demande depuis les colonnes.
+    Partagé entre requêtes : lecture seule.
+    """
+    __slots__ = (
+        'city', 'country', 'region', 'description', 'budget',
+        'top_activities', 'ideal_durations', 'monthly_temps_json', 'key',
+    )
+
+    def __init__(self, city, country, region, description, budget, activity_scores, durations, temps_row):
+        self.city = city
+        self.country = country
+        self.region = region
+        self.description = description
+        self.budget = budget
+        self.top_activities = [
+            (column.title(), score)
+            for column, score in zip(ACTIVITY_COLUMNS, activity_scores)
+            if score >= 4
+        ]
+        self.ideal_durations = json.loads(durations)
+        self.monthly_temps_json = temps_to_json(temps_row)
+        self.key = (city.lower(), country.lower())
+
+
+class DestinationRecords:
+    """
+    Séquence des DestinationRecord du catalogue (positions = lignes des colonnes).
+
+    Les records sont construits à l'accès depuis les colonnes (mappées en
+    mémoire pour l'artefact) et gardés dans un cache LRU borné.
+    """
+
+    def __init__(self, cities):
+        self._cities = cities
+        self._size = len(cities['city'])
+        self._build = lru_cache(maxsize=RECORD_CACHE_SIZE)(self._build_record)
+
+    def _build_record(self, position):
+        cities = self._cities
+        return DestinationRecord(
+            str(cities['city'][position]),
+            str(cities['country'][position]),
+            str(cities['region'][position]),
+            str(cities['description'][position]),
+            str(cities['budget_level'][position]),
+            cities['activities'][position].tolist(),
+            str(cities['durations'][position]),
+            cities['temps'][position],
+        )
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, position):
+        position = int(position)
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError(position)
+        return self._build(position)
+
+    def __iter__(self):
+        return (self[position] for position in range(self._size))
+
+
+class WorkationRows:
+    """Champs d'affichage des cartes workation, construits à l'accès depuis les colonnes."""
+
+    FIELDS = ('city', 'country', *WORKATION_COLUMNS)
+
+    def __init__(self, workation):
+        self._workation = workation
+        self._size = len(workation['city'])
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, position):
+        return {field: self._workation[field][position].item() for field in self.FIELDS}
+
+    def __iter__(self):
+        return (self[position] for position in range(self._size))
+
+
+class DestinationCatalog:
+    """
+    Jeux de données de destinations indexés, construits en une fois à partir
+    des colonnes (voir DestinationCatalogLoader pour le rechargement).
+
+    Une instance n'est jamais modifiée après sa construction : une requête
+    garde la même vue cohérente même si le catalogue est rechargé entre-temps.
+    Les colonnes numériques et les colonnes dérivées de l'artefact restent
+    mappées en mémoire ; seuls les petits index (drapeaux, pays, niveaux de
+    budget par profil) sont construits au chargement, le BallTree l'est à la
+    première requête géographique.
+
+    Attributs :
+        records: DestinationRecord de chaque ville (DestinationRecords)
+        country_keys, region_keys: Pays (minuscules) et région de chaque ville
+        activity_matrix: Scores d'activités (villes × ACTIVITY_COLUMNS)
+        activity_vectors: activity_matrix normalisée (norme 1), pour la similarité cosinus
+        latitudes, longitudes: Coordonnées des villes
+        temps: Températures moyennes (villes × 12 mois, NaN si inconnue)
+        geo_index: BallTree haversine des coordonnées (radians), construit à la demande
+        flag_by_code: dict {code ISO minuscule: url du drapeau}
+        countries: Liste triée des pays présents dans le catalogue
+        workation_columns: dict {colonne: tableau} des villes workation
+        workation_rows: Champs d'affichage de chaque ville workation (WorkationRows)
+        source: 'artifact' ou 'csv'
+        signature: Signature de la source chargée (voir DestinationCatalogLoader)
+    """
+
+    def __init__(self, tables, source='csv', signature=None):
+        if 'cities_index' not in tables:
+            tables = {**tables, **derive_index_tables(tables)}
+        self.source = source
+        self.signature = signature
+
+        cities = tables['cities']
+        index = tables['cities_index']
+        self.country_keys = index['country_key']
+        self.region_keys = cities['region']
+        self.activity_matrix = cities['activities']
+        self.activity_vectors = index['activity_vectors']
+        self._similar_cache = OrderedDict()
+        self._similar_lock = threading.Lock()
+        self.latitudes = cities['latitude']
+        self.longitudes = cities['longitude']
+        self.temps = cities['temps']
+        self._temps_order = index['temps_order']
+        self._temps_sorted = index['temps_sorted']
+        self._climate_cache = OrderedDict()
+        self._climate_lock = threading.Lock()
+        self._destination_keys = index['destination_key']
+        self._sorted_keys = index['sorted_key']
+        self._sorted_positions = index['sorted_position']
+        self.countries = sorted(set(cities['country'].tolist()))
+
+        self._budget_labels = cities['budget_level']
+        self._budget_levels = index['budget_rank']
+        self._budget_tiers = {tier: self._compute_budget_tier(tier) for tier in BUDGET_MAPPING}
+
+        self.records = DestinationRecords(cities)
+
+        self.flag_by_code = dict(zip(tables['flags']['code'].tolist(), tables['flags']['flag'].tolist()))
+        self.workation_columns = tables['workation']
+        self.workation_country_keys = tables['workation_index']['country_key']
+        self.workation_rows = WorkationRows(self.workation_columns)
+        self._work_rankings = {}
+
+    # ============================================
+    # RECHERCHES
+    # ============================================
+
+    def city_position(self, city, country):
+        """Position d'une destination dans le catalogue (insensible à la casse), ou None."""
+        key = f'{city.strip().lower()}|{country.strip().lower()}'
+        index = int(np.searchsorted(self._sorted_keys, key, side='left'))
+        if index < len(self._sorted_keys) and self._sorted_keys[index] == key:
+            return int(self._sorted_positions[index])
+        return None
+
+    def get_city(self, city, country):
+        """DestinationRecord d'une destination, ou None si elle n'existe pas."""
+        position = self.city_position(city, country)
+        return None if position is None else self.records[position]
+
+    def has_city(self, city, country):
+        """True si la destination (ville, pays) existe dans le catalogue."""
+        return self.city_position(city, country) is not None
+
+    def destinations_mask(self, destinations):
+        """
+        Masque des villes présentes dans une liste [{'city', 'country'}]
+        (favoris, destinations passées...), insensible à la casse.
+        """
+        keys = [f"{dest['city'].lower()}|{dest['country'].lower()}" for dest in destinations]
+        return np.isin(self._destination_keys, keys)
+
+    # ============================================
+    # SIMILARITÉ D'ACTIVITÉS (kNN cosinus)
+    # ============================================
+
+    def _top_similar(self, similarities, k, mask, exclude):
+        """k meilleures similarités parmi les destinations autorisées, décroissantes."""
+        similarities = similarities.copy()
+        if mask is not None:
+            similarities[~mask] = -np.inf
+        similarities[exclude] = -np.inf
+        allowed = int(np.isfinite(similarities).sum())
+        k = min(k, allowed)
+        if k <= 0:
+            return np.array([], dtype=np.intp), np.array([], dtype=float)
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.lexsort((top, -similarities[top]))]
+        return top, similarities[top]
+
+    def similar_to(self, position, k=10, mask=None):
+        """
+        "Plus comme cette destination" : k destinations au profil d'activités
+        le plus proche (similarité cosinus), hors la destination elle-même.
+
+        Le produit matrice-vecteur est mis en cache par destination (LRU de
+        SIMILAR_CACHE_SIZE entrées).
+
+        Returns:
+            tuple: (positions, similarités entre 0 et 1), de la plus similaire à la moins similaire
+        """
+        with self._similar_lock:
+            similarities = self._similar_cache.get(position)
+            if similarities is not None:
+                self._similar_cache.move_to_end(position)
+        if similarities is None:
+            similarities = self.activity_vectors @ self.activity_vectors[position]
+            with self._similar_lock:
+                self._similar_cache[position] = similarities
+                if len(self._similar_cache) > SIMILAR_CACHE_SIZE:
+                    self._similar_cache.popitem(last=False)
+        return self._top_similar(similarities, k, mask, exclude=[position])
+
+    def similar_to_many(self, positions, k=10, mask=None):
+        """
+        "Plus comme mes favoris" : k destinations les plus proches du profil
+        moyen d'un ensemble de destinations (elles-mêmes exclues).
+
+        Returns:
+            tuple: (positions, similarités entre 0 et 1), de la plus similaire à la moins similaire
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        if not len(positions):
+            return np.array([], dtype=np.intp), np.array([], dtype=float)
+        if len(positions) == 1:
+            return self.similar_to(int(positions[0]), k, mask)
+        taste = self.activity_vectors[positions].mean(axis=0)
+        norm = np.linalg.norm(taste)
+        if norm > 0:
+            taste = taste / norm
+        return self._top_similar(self.activity_vectors @ taste, k, mask, exclude=positions)
+
+    # ============================================
+    # PROXIMITÉ GÉOGRAPHIQUE
+    # ============================================
+
+    @cached_property
+    def geo_index(self):
+        """
+        Index géographique : distances de grand cercle, requêtes en O(log n).
+
+        scikit-learn (et pandas, qu'il importe) n'est chargé qu'à la première
+        requête géographique, pas à l'import du module.
+        """
+        from sklearn.neighbors import BallTree
+
+        return BallTree(
+            np.radians(np.column_stack([self.latitudes, self.longitudes])), metric='haversine'
+        )
+
+    def nearest(self, latitude, longitude, k=10, mask=None):
+        """
+        k destinations les plus proches d'un point.
+
+        Args:
+            latitude, longitude: Coordonnées du point (degrés)
+            k: Nombre de destinations
+            mask: Masque booléen optionnel des destinations autorisées
+
+        Returns:
+            tuple: (positions, distances en km), de la plus proche à la plus lointaine
+        """
+        total = len(self.records)
+        if k <= 0:
+            return np.array([], dtype=np.intp), np.array([], dtype=float)
+        point = np.radians([[latitude, longitude]])
+        fetch = min(k, total)
+        while True:
+            distances, positions = self.geo_index.query(point, k=fetch)
+            distances, positions = distances[0], positions[0]
+            if mask is not None:
+                keep = mask[positions]
+                distances, positions = distances[keep], positions[keep]
+            # Pas assez de destinations autorisées : élargir la recherche
+            if len(positions) >= k or fetch == total:
+                break
+            fetch = min(fetch * 4, total)
+        return positions[:k], distances[:k] * EARTH_RADIUS_KM
+
+    def nearest_to(self, anchors, k=10, mask=None):
+        """
+        k destinations les plus proches d'un ensemble de destinations (distance
+        à la plus proche d'entre elles).
+
+        Args:
+            anchors: Positions des destinations de référence (favoris, projets...)
+            k: Nombre de destinations
+            mask: Masque booléen optionnel des destinations autorisées
+
+        Returns:
+            tuple: (positions, distances en km), de la plus proche à la plus lointaine
+        """
+        best = {}
+        for anchor in anchors:
+            # Les k plus proches globales sont parmi les k plus proches de chaque référence
+            positions, distances = self.nearest(self.latitudes[anchor], self.longitudes[anchor], k, mask)
+            for position, distance in zip(positions.tolist(), distances.tolist()):
+                if distance < best.get(position, np.inf):
+                    best[position] = distance
+        ranked = sorted(best.items(), key=lambda item: item[1])[:k]
+        return (
+            np.array([position for position, _ in ranked], dtype=np.intp),
+            np.array([distance for _, distance in ranked], dtype=float),
+        )
+
+    def within_radius(self, anchors, radius_km, mask=None):
+        """
+        Destinations situées à moins de radius_km d'au moins une destination de référence.
+
+        Returns:
+            tuple: (positions, distances en km), de la plus proche à la plus lointaine
+        """
+        anchors = np.asarray(anchors, dtype=np.intp)
+        if not len(anchors):
+            return np.array([], dtype=np.intp), np.array([], dtype=float)
+        points = np.radians(np.column_stack([self.latitudes[anchors], self.longitudes[anchors]]))
+        indices, distances = self.geo_index.query_radius(
+            points, r=radius_km / EARTH_RADIUS_KM, return_distance=True
+        )
+        positions = np.concatenate(indices)
+        distances = np.concatenate(distances) * EARTH_RADIUS_KM
+        if mask is not None:
+            keep = mask[positions]
+            positions, distances = positions[keep], distances[keep]
+
+        # Distance à la référence la plus proche, une entrée par destination
+        order = np.lexsort((distances, positions))
+        positions, distances = positions[order], distances[order]
+        first = np.ones(len(positions), dtype=bool)
+        first[1:] = positions[1:] != positions[:-1]
+        positions, distances = positions[first], distances[first]
+        order = np.argsort(distances, kind='stable')
+        return positions[order], distances[order]
+
+    # ============================================
+    # CLIMAT
+    # ============================================
+
+    def climate_query(self, month, min_temp=None, max_temp=None, max_budget=None):
+        """
+        Destinations dont la température moyenne du mois est dans une plage.
+
+        Deux recherches dichotomiques dans la colonne triée du mois, puis filtre
+        de budget vectorisé. Résultat en cache par (mois, plage, budget).
+
+        Args:
+            month: Mois (1-12)
+            min_temp, max_temp: Bornes incluses en °C (None = non bornée)
+            max_budget: Budget de profil maximum ('economic', 'medium', 'comfort',
+                'luxury'), None = tous budgets
+
+        Returns:
+            np.ndarray: Positions des destinations, de la plus fraîche à la plus chaude
+                (lecture seule)
+        """
+        if not 1 <= month <= 12:
+            raise ValueError(f'Mois invalide : {month}')
+        min_temp = None if min_temp is None else round(float(min_temp), 1)
+        max_temp = None if max_temp is None else round(float(max_temp), 1)
+        max_budget = max_budget if max_budget in BUDGET_MAPPING else None
+        key = (month, min_temp, max_temp, max_budget)
+
+        with self._climate_lock:
+            positions = self._climate_cache.get(key)
+            if positions is not None:
+                self._climate_cache.move_to_end(key)
+                return positions
+
+        column = self._temps_sorted[:, month - 1]
+        start = 0 if min_temp is None else np.searchsorted(column, min_temp, side='left')
+        # Les NaN (température inconnue) sont en fin de colonne : jamais retenus
+        end = int((~np.isnan(column)).sum()) if max_temp is None else np.searchsorted(column, max_temp, side='right')
+        positions = self._temps_order[start:end, month - 1]
+        if max_budget is not None:
+            positions = positions[self._budget_levels[positions] <= BUDGET_HIERARCHY[BUDGET_MAPPING[max_budget]]]
+        positions.flags.writeable = False
+
+        with self._climate_lock:
+            self._climate_cache[key] = positions
+            if len(self._climate_cache) > CLIMATE_CACHE_SIZE:
+                self._climate_cache.popitem(last=False)
+        return positions
+
+    # ============================================
+    # SCORES VECTORISÉS (place)
+    # ============================================
+
+    def _compute_budget_tier(self, travel_budget):
+        """Masque de visibilité et score de budget de toutes les villes pour un budget."""
+        target = BUDGET_MAPPING.get(travel_budget, 'Mid-range')
+        same_budget = self._budget_labels == target
+        if travel_budget in ('comfort', 'luxury'):
+            # Villes jusqu'au niveau du budget : 30 si niveau exact, 15 sinon
+            visible = self._budget_levels <= BUDGET_HIERARCHY[target]
+            scores = np.where(visible, np.where(same_budget, 30, 15), 0)
+        else:
+            visible = same_budget
+            scores = np.where(visible, 30, 0)
+        return visible, scores
+
+    def budget_tier(self, travel_budget):
+        """
+        Visibilité et score de budget précalculés pour un budget de profil.
+
+        Args:
+            travel_budget: 'economic', 'medium', 'comfort' ou 'luxury' (minuscules)
+
+        Returns:
+            tuple: (masque booléen de visibilité, scores de budget), une valeur par ville
+        """
+        if travel_budget in self._budget_tiers:
+            return self._budget_tiers[travel_budget]
+        # Budget inconnu : aucune destination visible
+        empty = np.zeros(len(self.records), dtype=bool)
+        return empty, np.zeros(len(self.records), dtype=int)
+
+    def interest_scores(self, interests):
+        """
+        Scores d'intérêt de toutes les villes : produit matriciel entre le
+        vecteur des intérêts du profil et les scores d'activités (×10).
+        """
+        weights = np.zeros(len(ACTIVITY_COLUMNS), dtype=int)
+        for interest in interests:
+            column = INTEREST_TO_ACTIVITY.get(interest.lower(), interest.lower())
+            if column in ACTIVITY_COLUMNS:
+                weights[ACTIVITY_COLUMNS.index(column)] += 10
+        return self.activity_matrix @ weights
+
+    # ============================================
+    # SCORES WORKATION (work)
+    # ============================================
+
+    def _compute_work_ranking(self, travel_budget):
+        """Scores workation de toutes les villes pour un budget, et ordre décroissant."""
+        columns = self.workation_columns
+        coffee = columns['coffee_price']
+        accommodation = columns['accommodation_price']
+
+        # WiFi (max 54 Mbps) et coworkings (max 165) sur 40, café (max ~2 $) sur 20
+        scores = (
+            columns['wifi_speed'] / 54.0 * 40
+            + columns['coworking_spaces'] / 165.0 * 40
+            + np.where(coffee <= 2.0, (2.0 - coffee) / 2.0 * 20, 0)
+        )
+        if travel_budget in ('comfort', 'luxury'):
+            scores = scores + np.where(accommodation <= 400, 30, np.where(accommodation <= 800, 15, 0))
+        elif travel_budget in ('economic', 'medium'):
+            scores = scores + np.where(accommodation <= 400, 30, 0)
+
+        scores = np.round(scores, 1)
+        # Tri stable : à score égal, l'ordre du dataset est conservé
+        order = np.argsort(-scores, kind='stable')
+        return order, scores.tolist()
+
+    def work_ranking(self, travel_budget):
+        """
+        Classement workation précalculé pour un budget de profil (cache par budget).
+
+        Args:
+            travel_budget: 'economic', 'medium', 'comfort' ou 'luxury' (minuscules)
+
+        Returns:
+            tuple: (positions triées par score décroissant, scores par position)
+        """
+        tier = travel_budget if travel_budget in BUDGET_MAPPING else None
+        ranking = self._work_rankings.get(tier)
+        if ranking is None:
+            ranking = self._work_rankings[tier] = self._compute_work_ranking(tier)
+        return ranking
+
+    def workation_mask(self, countries):
+        """Masque des villes workation situées dans une liste de pays (insensible à la casse)."""
+        return np.isin(self.workation_country_keys, [country.lower() for country in countries])
+
+
+class DestinationCatalogLoader:
+    """
+    Charge le catalogue depuis l'artefact (ou les CSV) et le recharge si la
+    source change sur disque.
+
+    Le nouveau catalogue est entièrement construit avant de remplacer
+    l'ancien (une seule affectation) : les lecteurs n'ont pas besoin du verrou
+    et ne voient jamais un état à moitié rechargé.
+    """
+
+    def __init__(self, data_dir=None, artifact_dir=None):
+        self.data_dir = data_dir or get_destinations_data_dir()
+        self.artifact_dir = artifact_dir or get_destinations_artifact_dir()
+        self._lock = threading.Lock()
+        self._catalog = None
+
+    def _current_signature(self):
+        """Source à utiliser (artefact s'il existe, sinon CSV) et mtime de ses fichiers."""
+        try:
+            return ('artifact', os.path.getmtime(os.path.join(self.artifact_dir, ARTIFACT_MANIFEST)))
+        except OSError:
+            pass
+        mtimes = []
+        for filename in (CITIES_FILE, FLAGS_FILE, WORKATION_FILE):
+            try:
+                mtimes.append(os.path.getmtime(os.path.join(self.data_dir, filename)))
+            except OSError:
+                mtimes.append(None)
+        return ('csv', tuple(mtimes))
+
+    def _build(self, signature):
+        """Construit un nouveau catalogue depuis la source désignée par la signature."""
+        tables, source = None, signature[0]
+        if source == 'artifact':
+            try:
+                tables = load_artifact(self.artifact_dir)
+            except (OSError, ValueError) as e:
+                # Artefact incomplet ou d'une autre version : relancer build_destination_catalog
+                logger.warning("Artefact destinations ignoré (%s), lecture des CSV", e)
+                source = 'csv'
+        if tables is None:
+            tables = read_source_tables(self.data_dir)
+        catalog = DestinationCatalog(tables, source=source, signature=signature)
+        logger.info("Catalogue destinations chargé (%s)", source)
+        return catalog
+
+    def refresh(self):
+        """
+        Catalogue courant, rechargé si la source est absente ou a changé.
+
+        Returns:
+            DestinationCatalog: Instance à utiliser pendant toute la requête
+        """
+        signature = self._current_signature()
+        catalog = self._catalog
+        if catalog is not None and catalog.signature == signature:
+            return catalog
+
+        with self._lock:
+            if self._catalog is None or self._catalog.signature != signature:
+                self._catalog = self._build(signature)
+            return self._catalog
+
+
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def get_destination_catalog():
+    """
+    Catalogue partagé du processus, rechargé si sa source a changé sur disque.
+
+    Garder l'instance retournée pour toute la requête : un rechargement
+    concurrent ne la modifie pas.
+    """
+    global _loader
+    if _loader is None:
+        with _loader_lock:
+            if _loader is None:
+                _loader = DestinationCatalogLoader()
+    return _loader.refresh()
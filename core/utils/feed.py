@@ -0,0 +1,268 @@
+# core/utils/feed.py
+import base64
+import secrets
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, prefetch_related_objects
+
+from core.models import Post, Reaction
+from core.utils.ranking import get_score_ttl, ranked_post_ids
+from core.utils.timeline import timeline_queryset
+
+
+# Relations préchargées pour une page du feed (uniquement les posts affichés).
+# Les réactions ne sont pas préchargées : attach_viewer_state() les agrège.
+FEED_PREFETCH = ('comments', 'comments__user', 'comments__user__profile')
+
+
+def get_feed_page_size():
+    """Taille d'une page du feed (configurable via settings.FEED_PAGE_SIZE)."""
+    return getattr(settings, 'FEED_PAGE_SIZE', 10)
+
+
+def encode_cursor(post):
+    """
+    Encode la position (created_at, id) d'un post en curseur opaque.
+
+    Args:
+        post: Le dernier Post de la page courante
+
+    Returns:
+        str: Curseur URL-safe à renvoyer au client
+    """
+    raw = f"{post.created_at.isoformat()}|{post.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Décode un curseur produit par encode_cursor().
+
+    Returns:
+        tuple: (created_at, id) ou None si le curseur est invalide
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, post_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def feed_queryset(user, category=None):
+    """Posts visibles par l'utilisateur : posts publics + ses propres posts."""
+    qs = Post.objects.filter(Q(visibility='public') | Q(user=user))
+    if category and category != 'all':
+        qs = qs.filter(image_category=category)
+    return qs
+
+
+def resolve_feed_queryset(user, mode='all', category=None):
+    """
+    Queryset de base du feed selon le mode demandé.
+
+    - 'all'  : tous les posts publics + ceux de l'utilisateur (défaut)
+    - 'home' : timeline matérialisée des comptes suivis (fan-out-on-write),
+               avec repli sur 'all' si la timeline est indisponible
+    """
+    if mode == 'home':
+        qs = timeline_queryset(user, category)
+        if qs is not None:
+            return qs
+    return feed_queryset(user, category)
+
+
+def get_feed_page(user, cursor=None, category=None, page_size=None, queryset=None):
+    """
+    Retourne une page du feed plus ancienne que le curseur (keyset pagination).
+
+    Le tri se fait sur (created_at, id) décroissants : la requête reste un
+    simple parcours d'index quelle que soit la profondeur de la page, et seuls
+    les posts de la page sont préchargés.
+
+    Args:
+        user: L'utilisateur qui consulte le feed
+        cursor: Curseur opaque renvoyé par la page précédente (None = première page)
+        category: Filtre optionnel sur image_category
+        page_size: Nombre de posts par page (défaut : settings.FEED_PAGE_SIZE)
+        queryset: Queryset de base optionnel (défaut : feed_queryset(user, category))
+
+    Returns:
+        tuple: (liste de posts, curseur suivant ou None s'il n'y a plus de posts)
+    """
+    page_size = page_size or get_feed_page_size()
+    qs = queryset if queryset is not None else feed_queryset(user, category)
+
+    position = decode_cursor(cursor)
+    if position:
+        created_at, post_id = position
+        qs = qs.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=post_id)
+        )
+
+    # Un post de plus que la page pour savoir s'il reste une page suivante
+    rows = list(
+        qs.select_related('user', 'user__profile', 'shared_post__user__profile')
+        .order_by('-created_at', '-id')[:page_size + 1]
+    )
+    posts = rows[:page_size]
+    next_cursor = encode_cursor(posts[-1]) if len(rows) > page_size else None
+
+    prefetch_related_objects(posts, *FEED_PREFETCH)
+    return posts, next_cursor
+
+
+def encode_rank_cursor(snapshot, offset):
+    """
+    Curseur opaque du mode "ranked" : classement mémorisé (snapshot) et
+    position dans ce classement.
+    """
+    return base64.urlsafe_b64encode(f"rank|{snapshot}|{offset}".encode()).decode().rstrip('=')
+
+
+def decode_rank_cursor(cursor):
+    """
+    Décode un curseur produit par encode_rank_cursor().
+
+    Returns:
+        tuple: (id du classement, position), ou None si le curseur est invalide
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        prefix, snapshot, offset = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        offset = int(offset)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    return (snapshot, offset) if prefix == 'rank' and snapshot and offset >= 0 else None
+
+
+def _ranking_cache_key(user, category, snapshot):
+    return f"feed_ranking:{user.id}:{category or 'all'}:{snapshot}"
+
+
+def get_ranked_feed_page(user, cursor=None, category=None, page_size=None):
+    """
+    Retourne une page du feed classé par engagement (mode "ranked").
+
+    La première page calcule un nouveau classement de la fenêtre de
+    candidats, mémorisé sous un id repris dans les curseurs ; les pages
+    suivantes relisent ce même classement, ce qui garde un ordre stable
+    pendant le défilement. Le TTL (FEED_SCORE_TTL) repart à chaque page.
+
+    Returns:
+        tuple: (liste de posts, curseur suivant ou None s'il n'y a plus de posts),
+               ou (None, None) si le classement du curseur a expiré : l'appelant
+               recommence alors à la première page
+    """
+    page_size = page_size or get_feed_page_size()
+
+    if cursor is None:
+        snapshot, offset = secrets.token_hex(6), 0
+        cache_key = _ranking_cache_key(user, category, snapshot)
+        ranking = ranked_post_ids(user, feed_queryset(user, category), cache_key=cache_key)
+    else:
+        snapshot, offset = decode_rank_cursor(cursor) or (None, 0)
+        cache_key = _ranking_cache_key(user, category, snapshot)
+        ranking = cache.get(cache_key) if snapshot else None
+        if ranking is None:
+            # Reprendre la position dans un autre classement dupliquerait ou sauterait des posts
+            return None, None
+        cache.touch(cache_key, get_score_ttl())
+
+    page_ids = ranking[offset:offset + page_size]
+    by_id = feed_queryset(user, category).select_related(
+        'user', 'user__profile', 'shared_post__user__profile'
+    ).in_bulk(page_ids)
+    # Les posts supprimés entre-temps disparaissent simplement de la page
+    posts = [by_id[post_id] for post_id in page_ids if post_id in by_id]
+
+    has_more = offset + page_size < len(ranking)
+    next_cursor = encode_rank_cursor(snapshot, offset + page_size) if has_more else None
+
+    prefetch_related_objects(posts, *FEED_PREFETCH)
+    return posts, next_cursor
+
+
+def get_feed_mode_page(user, mode='all', cursor=None, category=None):
+    """
+    Page du feed pour le mode demandé ('all', 'home' ou 'ranked').
+
+    Les modes chronologiques utilisent la pagination par curseur (created_at, id),
+    le mode "ranked" une position dans un classement mémorisé (voir
+    get_ranked_feed_page() : (None, None) si ce classement a expiré).
+    """
+    if mode == 'ranked':
+        return get_ranked_feed_page(user, cursor=cursor, category=category)
+    return get_feed_page(user, cursor=cursor, queryset=resolve_feed_queryset(user, mode, category))
+
+
+def is_valid_cursor(cursor, mode='all'):
+    """Vérifie qu'un curseur reçu du client correspond au mode du feed."""
+    if mode == 'ranked':
+        return decode_rank_cursor(cursor) is not None
+    return decode_cursor(cursor) is not None
+
+
+def attach_viewer_state(posts, user):
+    """
+    Ajoute aux posts l'état propre au lecteur attendu par les templates :
+    post.user_reaction, post.total_reactions, post.total_comments et
+    comment.user_reaction pour chaque commentaire.
+
+    Le nombre de requêtes est constant quelle que soit la taille de la liste :
+    commentaires préchargés (si ce n'est pas déjà fait), un comptage groupé des
+    réactions et une seule requête pour les réactions du lecteur.
+
+    Args:
+        posts: Liste (ou queryset) de Post à enrichir
+        user: L'utilisateur qui consulte la page (peut être anonyme)
+
+    Returns:
+        list: Les posts enrichis
+    """
+    posts = list(posts)
+    if not posts:
+        return posts
+
+    # Sans effet si les commentaires sont déjà dans le cache de prefetch
+    prefetch_related_objects(posts, 'comments')
+
+    post_ids = [post.id for post in posts]
+    comment_ids = [comment.id for post in posts for comment in post.comments.all()]
+
+    # 📊 Nombre de réactions par post (une requête groupée)
+    reaction_counts = dict(
+        Reaction.objects.filter(post_id__in=post_ids)
+        .order_by()
+        .values_list('post_id')
+        .annotate(total=Count('id'))
+    )
+
+    # 👍 Réactions du lecteur sur les posts ET les commentaires (une requête)
+    post_reactions, comment_reactions = {}, {}
+    if user is not None and user.is_authenticated:
+        viewer_reactions = Reaction.objects.filter(user=user).filter(
+            Q(post_id__in=post_ids) | Q(comment_id__in=comment_ids)
+        )
+        for reaction in viewer_reactions:
+            if reaction.post_id:
+                post_reactions[reaction.post_id] = reaction
+            else:
+                comment_reactions[reaction.comment_id] = reaction
+
+    for post in posts:
+        comments = post.comments.all()
+        post.user_reaction = post_reactions.get(post.id)
+        post.total_reactions = reaction_counts.get(post.id, 0)
+        post.total_comments = sum(1 for c in comments if c.parent_id is None)  # Seulement les commentaires principaux
+
+        for comment in comments:
+            comment.user_reaction = comment_reactions.get(comment.id)
+    return posts
@@ -0,0 +1,176 @@
+# core/utils/image_manifest.py
+"""
+Manifeste des images de cartes (continents et workation).
+
+Les dossiers public/assets/images/Continent/* et public/assets/work sont
+listés une seule fois (au premier usage, ou par la commande
+build_image_manifest qui écrit le manifeste JSON lors du déploiement).
+Le choix d'une image est déterministe par destination : la même ville
+affiche toujours la même image, ce qui rend les cartes cachables.
+"""
+import json
+import logging
+import os
+import threading
+import zlib
+
+from django.conf import settings
+
+from core.utils.destinations import get_destinations_data_dir
+
+logger = logging.getLogger(__name__)
+
+CONTINENT_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+WORK_IMAGE_EXTENSIONS = ('.jpg',)
+DEFAULT_CONTINENT_IMAGE = '/static/images/group/group-cover-1.webp'
+DEFAULT_WORK_IMAGE = '/static/images/events/img-1.webp'
+
+# Région du dataset → dossiers possibles (noms anglais ou français)
+CONTINENT_FOLDERS = {
+    'africa': ('Africa', 'Afrique'),
+    'asia': ('Asia', 'Asie'),
+    'europe': ('Europe',),
+    'north_america': ('North America', 'Amérique du Nord'),
+    'south_america': ('South America', 'Amérique du Sud'),
+    'oceania': ('Oceania', 'Océanie'),
+    'antarctica': ('Antarctica', 'Antarctique'),
+}
+DEFAULT_CONTINENT = 'africa'
+
+
+def get_continent_images_dir():
+    return os.path.join(get_destinations_data_dir(), 'assets', 'images', 'Continent')
+
+
+def get_work_images_dir():
+    return os.path.join(get_destinations_data_dir(), 'assets', 'work')
+
+
+def get_manifest_path():
+    """Chemin du manifeste JSON (settings.IMAGE_MANIFEST_PATH)."""
+    default = os.path.join(get_destinations_data_dir(), 'assets', 'image_manifest.json')
+    return str(getattr(settings, 'IMAGE_MANIFEST_PATH', default))
+
+
+def _list_images(path, extensions):
+    """Noms des images d'un dossier, triés (liste vide si le dossier n'existe pas)."""
+    try:
+        with os.scandir(path) as entries:
+            return sorted(
+                entry.name for entry in entries
+                if entry.is_file() and entry.name.lower().endswith(extensions)
+            )
+    except OSError:
+        logger.warning("Dossier d'images introuvable : %s", path)
+        return []
+
+
+def build_manifest():
+    """
+    Liste les images des dossiers de continents et de workation.
+
+    Returns:
+        dict: {'continents': {dossier: [fichiers]}, 'work': [fichiers]}
+    """
+    continents_dir = get_continent_images_dir()
+    folders = {name for names in CONTINENT_FOLDERS.values() for name in names}
+    continents = {}
+    for folder in sorted(folders):
+        images = _list_images(os.path.join(continents_dir, folder), CONTINENT_IMAGE_EXTENSIONS)
+        if images:
+            continents[folder] = images
+    return {
+        'continents': continents,
+        'work': _list_images(get_work_images_dir(), WORK_IMAGE_EXTENSIONS),
+    }
+
+
+def write_manifest(manifest, path=None):
+    """Écrit le manifeste JSON (écriture atomique)."""
+    path = path or get_manifest_path()
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _pick(images, seed):
+    """Choix déterministe d'une image pour une clé donnée (insensible à la casse)."""
+    return images[zlib.crc32(seed.lower().encode('utf-8')) % len(images)]
+
+
+class ImageManifest:
+    """
+    Images disponibles par continent et pour la workation, en mémoire.
+
+    Lu depuis le manifeste JSON s'il existe (rechargé si son mtime change),
+    sinon construit en listant les dossiers une seule fois.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or get_manifest_path()
+        self._lock = threading.Lock()
+        self._mtime = object()  # Jamais égal : premier chargement forcé
+        self.continents = {}
+        self.work = []
+
+    def refresh(self, force=False):
+        """Recharge le manifeste si le fichier a changé (ou si force=True)."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if not force and mtime == self._mtime:
+            return self
+
+        with self._lock:
+            if force or mtime != self._mtime:
+                manifest = None
+                if mtime is not None:
+                    try:
+                        with open(self.path, encoding='utf-8') as f:
+                            manifest = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logger.warning("Manifeste d'images illisible (%s) : %s", self.path, e)
+                if manifest is None:
+                    manifest = build_manifest()
+                self.continents = manifest.get('continents', {})
+                self.work = manifest.get('work', [])
+                self._mtime = mtime
+        return self
+
+    def continent_image(self, region, seed):
+        """
+        URL d'une image du continent de la région, stable pour une même clé.
+
+        Args:
+            region: Région du dataset (ex. 'Europe', 'North_America')
+            seed: Clé de la destination (ex. 'Paris|France')
+        """
+        folders = CONTINENT_FOLDERS.get((region or '').lower(), CONTINENT_FOLDERS[DEFAULT_CONTINENT])
+        for folder in folders:
+            images = self.continents.get(folder)
+            if images:
+                return f'/assets/images/Continent/{folder}/{_pick(images, seed)}'
+        return DEFAULT_CONTINENT_IMAGE
+
+    def work_image(self, seed):
+        """URL d'une image workation, stable pour une même clé."""
+        if not self.work:
+            return DEFAULT_WORK_IMAGE
+        return f'/assets/work/{_pick(self.work, seed)}'
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_image_manifest():
+    """Manifeste partagé du processus."""
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                _manifest = ImageManifest()
+    return _manifest.refresh()
@@ -0,0 +1,134 @@
+# core/utils/panels.py
+"""
+Exécution concurrente des panneaux latéraux d'une page (feed...).
+
+Chaque panneau est une fonction sans argument exécutée dans un pool de
+threads partagé par le processus, avec son propre délai maximum compté à
+partir du démarrage du panneau. Un panneau en erreur ou trop lent est
+remplacé par sa valeur de repli (liste vide par défaut) ; la page s'affiche
+quand même. Les durées de chaque panneau sont journalisées.
+
+Un panneau en retard n'est pas interrompu (un thread ne peut pas l'être) :
+il se termine en arrière-plan en occupant un thread du pool. Le pool est
+borné (PANEL_MAX_WORKERS), ce qui borne aussi les connexions DB ouvertes
+par les panneaux ; un panneau encore en file à l'échéance de sa requête est
+annulé. Un panneau ne doit pas appeler run_panels lui-même.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def get_panel_max_workers():
+    """Nombre de threads du pool partagé des panneaux."""
+    return getattr(settings, 'PANEL_MAX_WORKERS', 16)
+
+
+def get_panel_timeout(name):
+    """Délai maximum (secondes) d'un panneau : PANEL_TIMEOUTS[name] ou PANEL_TIMEOUT."""
+    timeouts = getattr(settings, 'PANEL_TIMEOUTS', {})
+    return timeouts.get(name, getattr(settings, 'PANEL_TIMEOUT', 2.0))
+
+
+def _timed(name, func, start_times):
+    """Exécute un panneau dans un thread du pool et mesure sa durée."""
+    start = start_times[name] = time.perf_counter()
+    try:
+        return func(), time.perf_counter() - start
+    finally:
+        # Chaque thread ouvre ses propres connexions DB : les refermer
+        connections.close_all()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_panel_executor():
+    """Pool de threads partagé du processus (créé au premier appel)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=get_panel_max_workers(), thread_name_prefix='panel')
+    return _executor
+
+
+def run_panels(panels, fallbacks=None, page='feed'):
+    """
+    Exécute plusieurs panneaux en parallèle.
+
+    Le délai d'un panneau court depuis son démarrage, pas depuis sa mise en
+    file. Un panneau encore en file quand le délai le plus long de la page
+    est écoulé est annulé et remplacé par sa valeur de repli.
+
+    Args:
+        panels: dict {nom: fonction sans argument}
+        fallbacks: dict optionnel {nom: valeur de repli} (défaut : [])
+        page: Nom de la page, pour les logs
+
+    Returns:
+        dict: {nom: résultat ou valeur de repli}
+    """
+    if not panels:
+        return {}
+    fallbacks = fallbacks or {}
+    start_times = {}
+    request_deadline = time.perf_counter() + max(get_panel_timeout(name) for name in panels)
+    executor = get_panel_executor()
+    futures = {}
+    try:
+        futures = {
+            name: executor.submit(_timed, name, func, start_times)
+            for name, func in panels.items()
+        }
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name], elapsed = _wait_panel(name, future, start_times, request_deadline)
+                logger.info("⏱️ [%s] panneau %s : %.1f ms", page, name, elapsed * 1000)
+            except FutureTimeoutError:
+                results[name] = fallbacks.get(name, [])
+                if name in start_times:
+                    logger.warning(
+                        "⏱️ [%s] panneau %s : délai dépassé (%.1f s), repli utilisé",
+                        page, name, get_panel_timeout(name),
+                    )
+                else:
+                    logger.warning("⏱️ [%s] panneau %s : jamais démarré, repli utilisé", page, name)
+            except Exception as e:
+                results[name] = fallbacks.get(name, [])
+                logger.warning("⏱️ [%s] panneau %s : erreur (%s), repli utilisé", page, name, e)
+        return results
+    finally:
+        # Les panneaux en retard finissent en arrière-plan, ceux en file sont abandonnés
+        for future in futures.values():
+            future.cancel()
+
+
+def _wait_panel(name, future, start_times, request_deadline):
+    """
+    Attend le résultat d'un panneau jusqu'à son échéance.
+
+    Raises:
+        concurrent.futures.TimeoutError: Délai dépassé, ou panneau annulé
+            parce qu'il était encore en file à l'échéance de la requête
+    """
+    while True:
+        started = start_times.get(name)
+        deadline = started + get_panel_timeout(name) if started is not None else request_deadline
+        try:
+            return future.result(timeout=max(deadline - time.perf_counter(), 0))
+        except FutureTimeoutError:
+            if started is not None:
+                raise
+            if name in start_times or not future.cancel():
+                # Démarré pendant l'attente : son propre délai s'applique
+                continue
+            raise
@@ -0,0 +1,187 @@
+# core/utils/post_cards.py
+"""
+Cache des fragments HTML des post-cards du feed.
+
+Le HTML partagé d'une carte (contenu, médias, arbre de commentaires) est
+rendu une fois puis réutilisé par tous les lecteurs. Les parties propres au
+lecteur (réaction, menus du propriétaire, jeton CSRF) et les dates relatives
+("il y a 5 minutes") sont laissées sous forme de marqueurs <!--viewer:...-->
+et remplies à chaque requête à partir de posts/post_card_viewer.html.
+
+Clé : id du post + updated_at + compteurs + état des commentaires (nombre,
+dernière modification, déjà préchargés) + nombre de réactions + empreinte
+des auteurs affichés (noms, avatars, slugs) + version. Toute modification
+visible dans le HTML partagé change donc la clé, même si la version
+(incrémentée par invalidate_post_card()) n'a pas atteint un autre worker ;
+avec plusieurs workers, fragments et versions doivent de toute façon vivre
+dans un cache partagé (CACHES, REDIS_URL) pour être réutilisés.
+"""
+import hashlib
+import logging
+import re
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.middleware.csrf import get_token
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+logger = logging.getLogger(__name__)
+
+VIEWER_SLOT_RE = re.compile(r'<!--viewer:(\w+)(?::(\d+))?-->')
+
+# Hook de statistiques : envoyé après chaque lot de cartes rendu
+# (kwargs : hits, misses). Connecter un receiver pour exporter les métriques.
+post_card_cache_stats = Signal()
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_post_card_ttl():
+    """Durée de vie (secondes) d'un fragment en cache."""
+    return getattr(settings, 'POST_CARD_CACHE_TTL', 300)
+
+
+def _version_key(post_id):
+    return f'post_card_version:{post_id}'
+
+
+def invalidate_post_card(post_id):
+    """
+    Invalide le fragment d'un post (commentaire, réaction, édition, suppression).
+
+    Incrémente la version du post : les anciennes entrées ne sont plus lues
+    et expirent d'elles-mêmes.
+    """
+    key = _version_key(post_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def _authors_digest(post, comments):
+    """
+    Empreinte des auteurs affichés dans la carte (post, post partagé,
+    commentaires) : nom, avatar et slug du lien de profil.
+    """
+    users = [post.user, *(comment.user for comment in comments)]
+    if post.shared_post_id:
+        users.append(post.shared_post.user)
+    identities = []
+    for user in users:
+        profile = getattr(user, 'profile', None)
+        identities.append((
+            user.id, user.username, user.first_name, user.last_name,
+            profile.avatar.name if profile and profile.avatar else '',
+            profile.slug if profile else '',
+        ))
+    return hashlib.md5(repr(identities).encode('utf-8')).hexdigest()[:16]
+
+
+def post_card_key(post, version):
+    """
+    Clé du fragment partagé d'un post.
+
+    Les commentaires et leurs auteurs doivent être préchargés (FEED_PREFETCH,
+    attach_viewer_state) : leur nombre, leur dernière modification (édition,
+    réaction, qui font avancer Comment.updated_at) et l'identité des auteurs
+    affichés entrent dans la clé sans requête.
+    """
+    updated = post.updated_at.timestamp() if post.updated_at else 0
+    comments = post.comments.all()
+    comments_updated = max(
+        (comment.updated_at.timestamp() for comment in comments if comment.updated_at), default=0
+    )
+    return (
+        f'post_card:{post.id}:{updated}:{post.likes_count}:'
+        f'{post.comments_count}:{post.shares_count}:'
+        f'{len(comments)}:{comments_updated}:{getattr(post, "total_reactions", 0)}:'
+        f'{_authors_digest(post, comments)}:{version}'
+    )
+
+
+def get_cache_stats():
+    """
+    Statistiques cumulées du cache des post-cards (par processus).
+
+    Returns:
+        dict: {'hits', 'misses', 'hit_rate'}
+    """
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+
+
+def reset_cache_stats():
+    """Remet les statistiques à zéro."""
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
+
+
+def _record(hits, misses):
+    with _stats_lock:
+        _stats['hits'] += hits
+        _stats['misses'] += misses
+    post_card_cache_stats.send(sender=None, hits=hits, misses=misses)
+    logger.debug("Cache post-cards : %s hit(s), %s miss(es)", hits, misses)
+
+
+def _fill_viewer_slots(html, post, request, csrf_token):
+    """Remplace les marqueurs d'un fragment partagé par l'état du lecteur."""
+    slot_template = get_template('posts/post_card_viewer.html')
+    comments = {comment.id: comment for comment in post.comments.all()}
+
+    def render_slot(match):
+        slot, comment_id = match.group(1), match.group(2)
+        context = {
+            'slot': slot,
+            'post': post,
+            'comment': comments.get(int(comment_id)) if comment_id else None,
+            'request': request,
+            'csrf_token': csrf_token,
+        }
+        return slot_template.render(context)
+
+    return VIEWER_SLOT_RE.sub(render_slot, html)
+
+
+def render_post_cards(posts, request):
+    """
+    Rend les post-cards d'une page en réutilisant les fragments en cache.
+
+    Les posts doivent déjà porter l'état du lecteur (attach_viewer_state).
+
+    Args:
+        posts: Liste de Post de la page
+        request: Requête courante (lecteur + jeton CSRF)
+
+    Returns:
+        list: HTML (sûr) de chaque carte, dans l'ordre des posts
+    """
+    if not posts:
+        return []
+
+    versions = cache.get_many([_version_key(post.id) for post in posts])
+    keys = [post_card_key(post, versions.get(_version_key(post.id), 0)) for post in posts]
+    cached = cache.get_many(keys)
+
+    fresh = {}
+    for post, key in zip(posts, keys):
+        if key not in cached:
+            fresh[key] = render_to_string(
+                'posts/post_card.html', {'post': post, 'fragment_cache': True}
+            )
+    if fresh:
+        cache.set_many(fresh, timeout=get_post_card_ttl())
+    _record(hits=len(keys) - len(fresh), misses=len(fresh))
+
+    csrf_token = get_token(request)
+    return [
+        mark_safe(_fill_viewer_slots(cached.get(key) or fresh[key], post, request, csrf_token))
+        for post, key in zip(posts, keys)
+    ]
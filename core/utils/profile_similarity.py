@@ -0,0 +1,319 @@
+# core/utils/profile_similarity.py
+"""
+Similarité entre profils (suggestions du feed, "People You May Like").
+
+Tous les profils MongoDB sont encodés une fois dans une matrice creuse
+binaire (une ligne par profil, une colonne par valeur : style de voyage,
+langue, intérêt, nationalité, pays futurs et visités). Ses colonnes
+servent d'index inversé (valeur → profils) : seuls les profils partageant
+au moins une valeur avec l'utilisateur sont candidats, dans la limite de
+PROFILE_CANDIDATE_BUDGET. Le score des candidats est un seul produit
+matrice-vecteur pondéré, suivi d'un top-k par argpartition. Le coût dépend
+donc du recouvrement, pas du nombre total de profils.
+
+La matrice est tenue à jour à l'écriture (inscription, édition du profil) :
+l'ancienne ligne est masquée et la nouvelle rangée dans un petit bloc
+d'attente, fusionné dans la matrice au-delà de PROFILE_INDEX_COMPACT_SIZE
+lignes. Elle est reconstruite depuis MongoDB au plus tard après
+PROFILE_INDEX_TTL secondes (écritures faites par d'autres processus).
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+# Champ du profil → poids d'une valeur commune
+SIMILARITY_WEIGHTS = {
+    'travel_type': 2,
+    'languages': 1,
+    'nationality': 5,
+    'interests': 3,
+    # Encodés pour les autres sections, sans effet sur le score par défaut
+    'future_countries': 0,
+    'visited_countries': 0,
+}
+SIMILARITY_PROFILE_FIELDS = {'user_id': 1, **{field: 1 for field in SIMILARITY_WEIGHTS}}
+
+
+def get_profile_index_ttl():
+    """Durée de vie maximale (secondes) de la matrice avant reconstruction."""
+    return getattr(settings, 'PROFILE_INDEX_TTL', 300)
+
+
+def get_profile_candidate_budget():
+    """Nombre maximum de profils candidats scorés par recommandation."""
+    return getattr(settings, 'PROFILE_CANDIDATE_BUDGET', 2000)
+
+
+def get_profile_index_compact_size():
+    """Nombre de lignes en attente au-delà duquel elles sont fusionnées dans la matrice."""
+    return getattr(settings, 'PROFILE_INDEX_COMPACT_SIZE', 256)
+
+
+def profile_tokens(profile):
+    """
+    Valeurs encodées d'un profil : ensemble de couples (champ, valeur).
+
+    La nationalité est toujours encodée, même absente : deux profils sans
+    nationalité sont considérés comme de même nationalité.
+    """
+    tokens = {('nationality', profile.get('nationality'))}
+    for field in SIMILARITY_WEIGHTS:
+        if field == 'nationality':
+            continue
+        values = profile.get(field) or []
+        if isinstance(values, str):
+            values = [values]
+        tokens.update((field, value) for value in values if isinstance(value, str))
+    return tokens
+
+
+class ProfileSimilarityIndex:
+    """
+    Matrice creuse profils × valeurs, avec mises à jour incrémentales.
+
+    Les lignes de `matrix` suivent l'ordre de `user_ids` ; `postings` est la
+    même matrice par colonnes (valeur → lignes des profils, index inversé) ;
+    `alive` masque les lignes remplacées. Les profils modifiés depuis la
+    dernière fusion sont dans `pending` (user_id → (ids de colonnes, rang)) et
+    gardent leur rang d'origine pour départager les égalités.
+
+    L'état courant est publié d'un bloc (`_state`) : une lecture concurrente
+    d'une mise à jour voit l'ancien ou le nouvel état, jamais un mélange.
+    """
+
+    def __init__(self, profiles=()):
+        self._lock = threading.Lock()
+        self.built_at = time.monotonic()
+        self.vocabulary = {}
+        self._build([(profile['user_id'], profile_tokens(profile)) for profile in profiles if profile])
+
+    def _columns(self, tokens, create=True):
+        """Ids de colonnes des valeurs (ajoutées au vocabulaire si create=True)."""
+        columns = []
+        for token in tokens:
+            column = self.vocabulary.get(token)
+            if column is None and create:
+                column = self.vocabulary[token] = len(self.vocabulary)
+            if column is not None:
+                columns.append(column)
+        return columns
+
+    def _build(self, rows):
+        """Construit la matrice à partir de [(user_id, tokens ou colonnes)]."""
+        indptr = [0]
+        indices = []
+        for _, tokens in rows:
+            columns = tokens if isinstance(tokens, list) else self._columns(tokens)
+            indices.extend(columns)
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), np.array(indices, dtype=np.int64), indptr),
+            shape=(len(rows), len(self.vocabulary)),
+        )
+        self._rows = {user_id: row for row, (user_id, _) in enumerate(rows)}
+        self._state = {
+            'matrix': matrix,
+            'postings': matrix.tocsc(),
+            'user_ids': np.array([user_id for user_id, _ in rows], dtype=np.int64),
+            'alive': np.ones(len(rows), dtype=bool),
+            'pending': {},
+        }
+
+    def update(self, profile):
+        """Remplace (ou ajoute) la ligne d'un profil après une écriture."""
+        if not profile or profile.get('user_id') is None:
+            return
+        user_id = profile['user_id']
+        with self._lock:
+            state = dict(self._state)
+            row = self._rows.get(user_id)
+            if row is not None and state['alive'][row]:
+                state['alive'] = state['alive'].copy()
+                state['alive'][row] = False
+            pending = dict(state['pending'])
+            if user_id in pending:
+                rank = pending[user_id][1]
+            else:
+                rank = row if row is not None else len(state['user_ids']) + len(pending)
+            pending[user_id] = (self._columns(profile_tokens(profile)), rank)
+            state['pending'] = pending
+            self._state = state
+            if len(pending) >= get_profile_index_compact_size():
+                self._compact()
+
+    def _compact(self):
+        """Fusionne les lignes en attente dans la matrice (ordre des rangs conservé)."""
+        state = self._state
+        matrix, alive = state['matrix'], state['alive']
+        rows, ranks = [], []
+        for row in np.flatnonzero(alive):
+            rows.append((int(state['user_ids'][row]), matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]].tolist()))
+            ranks.append(row)
+        for user_id, (columns, rank) in state['pending'].items():
+            rows.append((user_id, columns))
+            ranks.append(rank)
+        order = np.argsort(ranks, kind='stable')
+        self._build([rows[i] for i in order])
+
+    def _query_columns(self, user_profile, fields):
+        """Colonnes connues des valeurs de user_profile restreintes aux champs donnés."""
+        return self._columns(
+            [token for token in profile_tokens(user_profile) if token[0] in fields], create=False
+        )
+
+    def _candidates(self, state, columns, budget, exclude):
+        """
+        Lignes et profils en attente partageant au moins une colonne.
+
+        Les listes d'index inversé les plus courtes (valeurs les plus
+        spécifiques) sont parcourues en premier ; au-delà de `budget`
+        profils, les suivants sont ignorés.
+
+        Returns:
+            tuple: (lignes de la matrice, user_ids en attente)
+        """
+        postings, alive, user_ids = state['postings'], state['alive'], state['user_ids']
+        exclude = set(exclude)
+        excluded = np.fromiter((int(i) for i in exclude), dtype=np.int64)
+        column_set = set(columns)
+        pending_ids = [
+            user_id for user_id, (pending_columns, _) in state['pending'].items()
+            if column_set.intersection(pending_columns) and user_id not in exclude
+        ][:budget]
+
+        lists = sorted(
+            (postings.indices[postings.indptr[column]:postings.indptr[column + 1]]
+             for column in columns if column < postings.shape[1]),
+            key=len,
+        )
+        remaining = budget - len(pending_ids)
+        rows = np.zeros(0, dtype=np.int64)
+        chosen = []
+        for posting in lists:
+            chosen.append(posting)
+            if sum(len(p) for p in chosen) < remaining and posting is not lists[-1]:
+                continue
+            # Dédoublonnage en conservant l'ordre de première apparition
+            merged = np.concatenate(chosen)
+            _, first = np.unique(merged, return_index=True)
+            rows = merged[np.sort(first)]
+            rows = rows[alive[rows] & ~np.isin(user_ids[rows], excluded)]
+            if len(rows) >= remaining:
+                break
+        return rows[:max(remaining, 0)], pending_ids
+
+    def candidates(self, user_profile, fields, budget, exclude=()):
+        """
+        Profils partageant au moins une valeur de `fields` avec user_profile.
+
+        Args:
+            user_profile: Profil MongoDB du lecteur
+            fields: Champs à comparer (ex. ['future_countries'])
+            budget: Nombre maximum de profils retournés
+            exclude: user_ids à ignorer (lecteur, abonnements...)
+
+        Returns:
+            list: user_ids, valeurs les plus spécifiques d'abord
+        """
+        state = self._state
+        rows, pending_ids = self._candidates(state, self._query_columns(user_profile, fields), budget, exclude)
+        return pending_ids + state['user_ids'][rows].tolist()
+
+    def scores(self, user_profile, weights=None, budget=None, exclude=()):
+        """
+        Score de similarité de user_profile contre les profils candidats.
+
+        Seuls les profils partageant au moins une valeur pondérée sont
+        scorés (les autres ont un score nul), dans la limite de `budget`.
+
+        Args:
+            user_profile: Profil MongoDB du lecteur
+            weights: Poids par champ (défaut : SIMILARITY_WEIGHTS)
+            budget: Nombre maximum de candidats (défaut : PROFILE_CANDIDATE_BUDGET)
+            exclude: user_ids à ignorer
+
+        Returns:
+            tuple: (user_ids, scores, rangs) en tableaux numpy alignés
+        """
+        weights = SIMILARITY_WEIGHTS if weights is None else weights
+        budget = get_profile_candidate_budget() if budget is None else budget
+        state = self._state
+        matrix, user_ids, pending = state['matrix'], state['user_ids'], state['pending']
+
+        vector = np.zeros(len(self.vocabulary), dtype=np.int32)
+        for token in profile_tokens(user_profile):
+            column = self.vocabulary.get(token)
+            if column is not None:
+                vector[column] = weights.get(token[0], 0)
+        rows, pending_ids = self._candidates(state, np.flatnonzero(vector).tolist(), budget, exclude)
+
+        scores = matrix[rows] @ vector[:matrix.shape[1]]
+        if not pending_ids:
+            return user_ids[rows], scores, rows
+
+        pending_scores = [int(vector[pending[user_id][0]].sum()) for user_id in pending_ids]
+        pending_ranks = [pending[user_id][1] for user_id in pending_ids]
+        return (
+            np.concatenate([user_ids[rows], np.array(pending_ids, dtype=np.int64)]),
+            np.concatenate([scores, np.array(pending_scores, dtype=scores.dtype)]),
+            np.concatenate([rows, np.array(pending_ranks, dtype=rows.dtype)]),
+        )
+
+    def top_k(self, user_profile, k, exclude=(), weights=None, budget=None):
+        """
+        Profils les plus similaires (score décroissant, ordre MongoDB en cas d'égalité).
+
+        Args:
+            user_profile: Profil MongoDB du lecteur
+            k: Nombre de profils
+            exclude: user_ids à ignorer (lecteur, abonnements...)
+            budget: Nombre maximum de candidats scorés
+
+        Returns:
+            list: [(user_id, score)]
+        """
+        user_ids, scores, ranks = self.scores(user_profile, weights, budget, exclude)
+        if k <= 0 or not len(scores):
+            return []
+        if k < len(scores):
+            # Seuil du k-ième score, puis toutes les égalités pour un départage stable
+            threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            selected = np.flatnonzero(scores >= threshold)
+            user_ids, scores, ranks = user_ids[selected], scores[selected], ranks[selected]
+        order = np.lexsort((ranks, -scores))[:k]
+        return list(zip(user_ids[order].tolist(), scores[order].tolist()))
+
+
+_index = None
+_index_lock = threading.Lock()
+_indexes_ready = False
+
+
+def _ensure_indexes(db):
+    """Crée l'index sur profiles.user_id (lecture des candidats par $in, une fois par processus)."""
+    global _indexes_ready
+    if not _indexes_ready:
+        db.profiles.create_index('user_id')
+        _indexes_ready = True
+
+
+def get_profile_similarity_index(db):
+    """Index partagé du processus, reconstruit depuis MongoDB après PROFILE_INDEX_TTL."""
+    global _index
+    _ensure_indexes(db)
+    index = _index
+    if index is None or time.monotonic() - index.built_at > get_profile_index_ttl():
+        with _index_lock:
+            if _index is None or time.monotonic() - _index.built_at > get_profile_index_ttl():
+                _index = ProfileSimilarityIndex(db.profiles.find({}, SIMILARITY_PROFILE_FIELDS))
+            index = _index
+    return index
+
+
+def update_profile_similarity(profile):
+    """Met à jour la ligne d'un profil après une écriture (sans effet si l'index n'est pas chargé)."""
+    if _index is not None:
+        _index.update(profile)
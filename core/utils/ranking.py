@@ -0,0 +1,144 @@
+# core/utils/ranking.py
+"""
+Feed classé par engagement (mode "ranked").
+
+Les candidats sont les posts les plus récents d'une fenêtre bornée ; ils sont
+notés en une passe NumPy vectorisée :
+
+    score = (1 + likes + 2·commentaires + 3·partages) / (âge_h + 2) ^ gravité
+            × bonus si le lecteur suit l'auteur
+
+La partie indépendante du lecteur est mise en cache par post (TTL court) et
+le classement obtenu est mémorisé par lecteur pour servir les pages suivantes
+sans nouvelle passe. Les curseurs désignent ce classement mémorisé : avec
+plusieurs workers, le cache Django doit être partagé (CACHES, REDIS_URL).
+"""
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from pymongo.errors import PyMongoError
+
+from core.mongo import get_db
+
+logger = logging.getLogger(__name__)
+
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+SHARE_WEIGHT = 3.0
+GRAVITY = 1.5
+FOLLOW_BOOST = 1.5
+
+
+def get_ranking_window():
+    """Nombre de posts récents candidats au classement."""
+    return getattr(settings, 'FEED_RANKED_WINDOW', 500)
+
+
+def get_score_ttl():
+    """Durée de vie (secondes) des scores et classements en cache."""
+    return getattr(settings, 'FEED_SCORE_TTL', 60)
+
+
+def score_posts(likes, comments, shares, age_hours, followed):
+    """
+    Calcule les scores d'engagement de plusieurs posts en une passe.
+
+    Args:
+        likes, comments, shares: Tableaux de compteurs
+        age_hours: Âge des posts en heures
+        followed: Tableau booléen, True si le lecteur suit l'auteur
+
+    Returns:
+        np.ndarray: Scores (plus grand = mieux classé)
+    """
+    engagement = (
+        1.0
+        + LIKE_WEIGHT * np.asarray(likes, dtype=float)
+        + COMMENT_WEIGHT * np.asarray(comments, dtype=float)
+        + SHARE_WEIGHT * np.asarray(shares, dtype=float)
+    )
+    decay = np.power(np.maximum(np.asarray(age_hours, dtype=float), 0.0) + 2.0, GRAVITY)
+    return engagement / decay * np.where(followed, FOLLOW_BOOST, 1.0)
+
+
+def _base_scores(rows, now):
+    """
+    Scores indépendants du lecteur, lus en cache ou calculés pour les posts manquants.
+
+    Args:
+        rows: Liste de tuples (id, user_id, likes, comments, shares, created_at)
+
+    Returns:
+        np.ndarray: Un score par ligne, dans l'ordre de rows
+    """
+    keys = [f'feed_score:{row[0]}' for row in rows]
+    cached = cache.get_many(keys)
+    scores = np.array([cached.get(key, np.nan) for key in keys], dtype=float)
+
+    missing = np.flatnonzero(np.isnan(scores))
+    if missing.size:
+        subset = [rows[i] for i in missing]
+        ages = [(now - row[5]).total_seconds() / 3600.0 for row in subset]
+        scores[missing] = score_posts(
+            [row[2] for row in subset],
+            [row[3] for row in subset],
+            [row[4] for row in subset],
+            ages,
+            np.zeros(len(subset), dtype=bool),
+        )
+        cache.set_many(
+            {keys[i]: float(scores[i]) for i in missing}, timeout=get_score_ttl()
+        )
+    return scores
+
+
+def _following_ids(user):
+    """Ids des comptes suivis (profil MongoDB), vide si Mongo est indisponible."""
+    try:
+        profile = get_db().profiles.find_one({'user_id': user.id}, {'following': 1}) or {}
+    except PyMongoError as e:
+        logger.warning("Abonnements indisponibles pour %s : %s", user.id, e)
+        return []
+    return profile.get('following', [])
+
+
+def ranked_post_ids(user, queryset, cache_key=None):
+    """
+    Classe les posts candidats du queryset pour un lecteur.
+
+    Args:
+        user: Le lecteur
+        queryset: Posts visibles (déjà filtrés par catégorie)
+        cache_key: Clé optionnelle pour mémoriser le classement obtenu
+
+    Returns:
+        list: Ids des posts, du mieux classé au moins bien classé
+    """
+    if cache_key:
+        ranking = cache.get(cache_key)
+        if ranking is not None:
+            return ranking
+
+    rows = list(
+        queryset.order_by('-created_at', '-id').values_list(
+            'id', 'user_id', 'likes_count', 'comments_count', 'shares_count', 'created_at'
+        )[:get_ranking_window()]
+    )
+    if not rows:
+        return []
+
+    scores = _base_scores(rows, timezone.now())
+    following = np.array(list(set(_following_ids(user))), dtype=np.int64)
+    authors = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    scores = scores * np.where(np.isin(authors, following), FOLLOW_BOOST, 1.0)
+
+    # Tri stable : à score égal, l'ordre chronologique de la fenêtre est conservé
+    order = np.argsort(-scores, kind='stable')
+    ranking = [rows[i][0] for i in order]
+
+    if cache_key:
+        cache.set(cache_key, ranking, timeout=get_score_ttl())
+    return ranking
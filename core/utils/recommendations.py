@@ -0,0 +1,349 @@
+# core/utils/recommendations.py
+"""
+Recommandations de personnes matérialisées (collection Mongo `user_recommendations`).
+
+Un document par utilisateur contient les listes précalculées de chaque
+section (ids et données de score uniquement : noms, images et compteurs
+sont relus à l'affichage) :
+
+    {'user_id', 'version', 'computed_at', 'neighbour_ids',
+     'sections': {'travel_duo': [...], 'might_know': [...], 'may_like': [...],
+                  'suggested_users': [...], 'travel_companions': [...]}}
+
+Les vues lisent ces listes et ne calculent à la demande qu'une section
+absente (ou d'une autre version), ou une section courte que les abonnements
+faits depuis le calcul ont fait passer sous sa taille minimale. La commande refresh_recommendations ne
+recalcule que les utilisateurs dont le profil, ou celui d'un voisin, a
+changé depuis son dernier passage (champ `updated_at` des profils, écrit
+à l'inscription, à l'édition du profil et aux abonnements), ainsi que les
+utilisateurs en échec au passage précédent.
+"""
+import numpy as np
+from django.utils import timezone
+
+from core.utils.companions import (
+    COMPANION_CANDIDATE_FIELDS, COMPANION_PROFILE_FIELDS, companion_features,
+    get_companion_candidate_limit, get_companion_scorer,
+)
+from core.utils.profile_similarity import (
+    SIMILARITY_PROFILE_FIELDS, SIMILARITY_WEIGHTS, get_profile_candidate_budget, get_profile_similarity_index,
+)
+
+# Version du format des listes : à incrémenter si une section change de contenu
+RECOMMENDATIONS_VERSION = 1
+
+PAGES_SECTIONS = ('travel_duo', 'might_know', 'may_like')
+RECOMMENDATION_SECTIONS = PAGES_SECTIONS + ('suggested_users', 'travel_companions')
+PAGES_SECTION_SIZE = 100
+SUGGESTED_USERS_SIZE = 4
+TRAVEL_COMPANIONS_MIN = 3
+REFRESH_RUN_ID = 'user_recommendations'
+
+_indexes_ready = False
+
+
+def _ensure_indexes(db):
+    """Index de la collection et de profiles.updated_at (une fois par processus)."""
+    global _indexes_ready
+    if not _indexes_ready:
+        db.user_recommendations.create_index('user_id', unique=True)
+        db.user_recommendations.create_index('neighbour_ids')
+        db.profiles.create_index('updated_at')
+        _indexes_ready = True
+
+
+def _excluded(user_profile):
+    """Utilisateur et abonnements : jamais recommandés."""
+    return {user_profile['user_id'], *user_profile.get('following', [])}
+
+
+# ============================================
+# 🧮 CALCUL DES SECTIONS
+# ============================================
+
+def compute_pages_sections(db, user_profile):
+    """
+    Sections de la page "Pages" : Travel Duo, People You Might Know, People You May Like.
+
+    Returns:
+        dict: {'travel_duo': [{'user_id', 'common_future_countries'}],
+               'might_know': [{'user_id', 'common_visited_countries', 'nationality_match'}],
+               'may_like': [{'user_id', 'score'}]}
+    """
+    # Candidats par index inversé : seuls les profils partageant une valeur utile sont lus
+    index = get_profile_similarity_index(db)
+    excluded = _excluded(user_profile)
+    budget = get_profile_candidate_budget()
+    may_like = index.top_k(user_profile, PAGES_SECTION_SIZE, exclude=excluded)
+    candidate_ids = set(index.candidates(user_profile, ['future_countries'], budget, exclude=excluded))
+    candidate_ids.update(index.candidates(user_profile, ['visited_countries', 'nationality'], budget, exclude=excluded))
+    profiles = db.profiles.find(
+        {'user_id': {'$in': list(candidate_ids)}},
+        {'user_id': 1, 'travel_type': 1, 'future_countries': 1, 'travel_budget': 1,
+         'visited_countries': 1, 'nationality': 1},
+    )
+
+    user_travel_types = set(user_profile.get('travel_type', []))
+    user_future_countries = set(user_profile.get('future_countries', []))
+    user_travel_budget = user_profile.get('travel_budget', '')
+    user_visited_countries = set(user_profile.get('visited_countries', []))
+    user_nationality = user_profile.get('nationality', '')
+
+    travel_duo = []
+    might_know = []
+    for profile in profiles:
+        # Section 1: Find Your Travel Duo
+        common_travel_types = user_travel_types.intersection(set(profile.get('travel_type', [])))
+        common_future_countries = user_future_countries.intersection(set(profile.get('future_countries', [])))
+        same_budget = user_travel_budget == profile.get('travel_budget', '')
+        if common_travel_types and common_future_countries and same_budget:
+            travel_duo.append({
+                'user_id': profile['user_id'],
+                'common_future_countries': sorted(common_future_countries),
+            })
+
+        # Section 2: People You Might Know
+        common_visited_countries = user_visited_countries.intersection(set(profile.get('visited_countries', [])))
+        same_nationality = user_nationality == profile.get('nationality', '')
+        if common_visited_countries or same_nationality:
+            might_know.append({
+                'user_id': profile['user_id'],
+                'common_visited_countries': sorted(common_visited_countries),
+                'nationality_match': same_nationality,
+            })
+
+    travel_duo.sort(key=lambda x: len(x['common_future_countries']), reverse=True)
+    might_know.sort(key=lambda x: (len(x['common_visited_countries']), x['nationality_match']), reverse=True)
+    return {
+        'travel_duo': travel_duo[:PAGES_SECTION_SIZE],
+        'might_know': might_know[:PAGES_SECTION_SIZE],
+        'may_like': [{'user_id': user_id, 'score': score} for user_id, score in may_like],
+    }
+
+
+def compute_suggested_users(db, user_profile):
+    """Suggestions du feed : top 4 des profils similaires non suivis."""
+    top = get_profile_similarity_index(db).top_k(user_profile, SUGGESTED_USERS_SIZE, exclude=_excluded(user_profile))
+    return {'suggested_users': [{'user_id': user_id, 'score': score} for user_id, score in top]}
+
+
+def compute_travel_companions(db, user_profile):
+    """
+    Compagnons de voyage (3-4 profils non suivis, meilleur score d'abord).
+
+    Le score vient du modèle entraîné par `manage.py train_companion_model`
+    (formule pondérée s'il n'existe pas), calculé seulement sur un ensemble
+    borné de candidats partageant au moins un critère avec l'utilisateur.
+    """
+    excluded = list(_excluded(user_profile))
+    candidate_ids = get_profile_similarity_index(db).candidates(
+        user_profile, COMPANION_CANDIDATE_FIELDS, get_companion_candidate_limit(), exclude=excluded
+    )
+    candidates = list(db.profiles.find({'user_id': {'$in': candidate_ids}}, COMPANION_PROFILE_FIELDS))
+
+    companions = []
+    # Prédire les scores des candidats (une seule matrice, un seul predict)
+    if candidates:
+        features = [companion_features(user_profile, profile) for profile in candidates]
+        scores = get_companion_scorer().score(features)
+        order = np.argsort(-scores, kind='stable')[:4]
+        companions = [{'user_id': candidates[i]['user_id'], 'score': float(scores[i])} for i in order]
+
+    # Compléter avec des utilisateurs non suivis si moins de 3
+    if len(companions) < TRAVEL_COMPANIONS_MIN:
+        chosen = excluded + [companion['user_id'] for companion in companions]
+        additional_users = db.profiles.find(
+            {'user_id': {'$nin': chosen}}, {'user_id': 1}
+        ).limit(TRAVEL_COMPANIONS_MIN - len(companions))
+        companions.extend({'user_id': profile['user_id'], 'score': 0} for profile in additional_users)
+    return {'travel_companions': companions}
+
+
+# Taille minimale à l'affichage : en dessous, une section réduite par les
+# abonnements faits depuis son calcul est recalculée à la lecture
+SECTION_MIN_SIZES = {
+    'suggested_users': SUGGESTED_USERS_SIZE,
+    'travel_companions': TRAVEL_COMPANIONS_MIN,
+}
+
+# Section → fonction de calcul (les sections de "Pages" sont calculées ensemble)
+SECTION_BUILDERS = {
+    'travel_duo': compute_pages_sections,
+    'might_know': compute_pages_sections,
+    'may_like': compute_pages_sections,
+    'suggested_users': compute_suggested_users,
+    'travel_companions': compute_travel_companions,
+}
+
+
+def compute_sections(db, user_profile, sections=RECOMMENDATION_SECTIONS):
+    """Calcule les sections demandées (chaque fonction de calcul appelée une seule fois)."""
+    computed = {}
+    for section in sections:
+        if section not in computed:
+            computed.update(SECTION_BUILDERS[section](db, user_profile))
+    return {section: computed[section] for section in sections}
+
+
+# ============================================
+# 💾 LECTURE / ÉCRITURE
+# ============================================
+
+def save_recommendations(db, user_id, sections, computed_at=None):
+    """Remplace les listes stockées d'un utilisateur."""
+    _ensure_indexes(db)
+    neighbour_ids = sorted({entry['user_id'] for entries in sections.values() for entry in entries})
+    db.user_recommendations.replace_one(
+        {'user_id': user_id},
+        {
+            'user_id': user_id,
+            'version': RECOMMENDATIONS_VERSION,
+            'computed_at': computed_at or timezone.now(),
+            'neighbour_ids': neighbour_ids,
+            'sections': sections,
+        },
+        upsert=True,
+    )
+
+
+def _store_sections(db, user_id, sections):
+    """
+    Ajoute des sections calculées à la demande sans toucher aux autres
+    (les panneaux du feed peuvent écrire en parallèle).
+    """
+    _ensure_indexes(db)
+    neighbour_ids = sorted({entry['user_id'] for entries in sections.values() for entry in entries})
+    db.user_recommendations.update_one(
+        {'user_id': user_id},
+        {
+            '$set': {f'sections.{section}': entries for section, entries in sections.items()},
+            '$setOnInsert': {'version': RECOMMENDATIONS_VERSION, 'computed_at': timezone.now()},
+            '$addToSet': {'neighbour_ids': {'$each': neighbour_ids}},
+        },
+        upsert=True,
+    )
+
+
+def invalidate_recommendations(db, user_id):
+    """Supprime les listes d'un utilisateur (recalculées à sa prochaine visite)."""
+    db.user_recommendations.delete_one({'user_id': user_id})
+
+
+def refresh_user_recommendations(db, user_profile, computed_at=None):
+    """Recalcule et stocke toutes les sections d'un utilisateur."""
+    sections = compute_sections(db, user_profile)
+    save_recommendations(db, user_profile['user_id'], sections, computed_at)
+    return sections
+
+
+def get_recommendations(db, user_profile, sections):
+    """
+    Listes stockées des sections demandées, calculées à la demande si absentes.
+
+    Les abonnements faits depuis le calcul sont filtrés à la lecture ; une
+    section que ce filtre fait passer sous sa taille minimale
+    (SECTION_MIN_SIZES) est recalculée et stockée.
+
+    Args:
+        db: Base MongoDB
+        user_profile: Profil MongoDB du lecteur
+        sections: Noms de sections (voir RECOMMENDATION_SECTIONS)
+
+    Returns:
+        dict: {section: [{'user_id', ...}]}
+    """
+    user_id = user_profile['user_id']
+    document = db.user_recommendations.find_one({'user_id': user_id}, {'version': 1, 'sections': 1})
+    outdated = document is not None and document.get('version') != RECOMMENDATIONS_VERSION
+    stored = {} if document is None or outdated else document.get('sections', {})
+
+    missing = [section for section in sections if section not in stored]
+    if missing:
+        computed = compute_sections(db, user_profile, missing)
+        if outdated:
+            # Ancienne version : les autres sections stockées ne sont plus valides
+            save_recommendations(db, user_id, computed)
+        else:
+            _store_sections(db, user_id, computed)
+        stored = {**stored, **computed}
+
+    excluded = _excluded(user_profile)
+    filtered = {
+        section: [entry for entry in stored[section] if entry['user_id'] not in excluded]
+        for section in sections
+    }
+
+    # Sections vidées par de nouveaux abonnements : recalculées sans attendre la commande
+    short = [
+        section for section in sections
+        if section not in missing
+        and len(filtered[section]) < len(stored[section])
+        and len(filtered[section]) < SECTION_MIN_SIZES.get(section, 0)
+    ]
+    if short:
+        computed = compute_sections(db, user_profile, short)
+        _store_sections(db, user_id, computed)
+        filtered.update(computed)
+    return filtered
+
+
+# ============================================
+# 🔄 RAFRAÎCHISSEMENT INCRÉMENTAL
+# ============================================
+
+def get_last_refresh(db):
+    """Début du dernier passage de refresh_recommendations (None si jamais lancé)."""
+    run = db.recommendation_runs.find_one({'_id': REFRESH_RUN_ID})
+    return run.get('started_at') if run else None
+
+
+def get_failed_refreshes(db):
+    """Utilisateurs en échec au dernier passage (repris au suivant)."""
+    run = db.recommendation_runs.find_one({'_id': REFRESH_RUN_ID})
+    return set(run.get('failed_ids', [])) if run else set()
+
+
+def set_last_refresh(db, started_at, failed_ids=()):
+    """
+    Enregistre un passage : le suivant reprend les profils modifiés depuis
+    started_at et les utilisateurs en échec (failed_ids).
+    """
+    db.recommendation_runs.update_one(
+        {'_id': REFRESH_RUN_ID},
+        {'$set': {'started_at': started_at, 'failed_ids': sorted(failed_ids)}},
+        upsert=True,
+    )
+
+
+def find_stale_users(db, since):
+    """
+    Utilisateurs dont les listes sont à recalculer depuis `since`.
+
+    - profils modifiés (updated_at > since) ;
+    - utilisateurs dont une liste stockée contient un profil modifié ;
+    - utilisateurs ayant des listes stockées et partageant une valeur avec
+      un profil modifié (qui peut désormais y entrer), via l'index inversé.
+
+    Returns:
+        tuple: (ids des profils modifiés, ids des voisins à recalculer)
+    """
+    _ensure_indexes(db)
+    changed = list(db.profiles.find({'updated_at': {'$gt': since}}, SIMILARITY_PROFILE_FIELDS))
+    changed_ids = {profile['user_id'] for profile in changed}
+    if not changed_ids:
+        return changed_ids, set()
+
+    neighbours = {
+        document['user_id']
+        for document in db.user_recommendations.find({'neighbour_ids': {'$in': list(changed_ids)}}, {'user_id': 1})
+    }
+    index = get_profile_similarity_index(db)
+    budget = get_profile_candidate_budget()
+    potential = set()
+    for profile in changed:
+        potential.update(index.candidates(profile, list(SIMILARITY_WEIGHTS), budget, exclude={profile['user_id']}))
+    neighbours.update(
+        document['user_id']
+        for document in db.user_recommendations.find({'user_id': {'$in': list(potential)}}, {'user_id': 1})
+    )
+    return changed_ids, neighbours - changed_ids
@@ -0,0 +1,191 @@
+# core/utils/stories.py
+"""
+Index des stories actives (24h) et état "déjà vue" par lecteur.
+
+L'index regroupe les stories actives par auteur (auteur le plus récent
+d'abord, stories du plus récent au plus ancien). Il est construit en une
+requête, gardé en cache jusqu'à la première expiration (borné par
+STORY_INDEX_TTL) et invalidé à chaque création/suppression de story. Les
+entrées expirées sont ignorées à la lecture.
+
+L'état "vue" d'un lecteur est obtenu en une seule requête StoryView. Les
+compteurs de vues sont dénormalisés dans Story.views_count.
+
+Les stories expirées et leurs médias sont purgés par la commande
+sweep_expired_stories.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Story, StoryView
+
+STORY_LIFETIME = timedelta(hours=24)
+ACTIVE_STORIES_KEY = 'stories:active'
+
+
+def get_story_index_ttl():
+    """Durée de vie maximale (secondes) de l'index en cache."""
+    return getattr(settings, 'STORY_INDEX_TTL', 60)
+
+
+def active_cutoff(now=None):
+    """Date de création minimale d'une story encore active."""
+    return (now or timezone.now()) - STORY_LIFETIME
+
+
+def invalidate_active_stories():
+    """Invalide l'index (création ou suppression d'une story)."""
+    cache.delete(ACTIVE_STORIES_KEY)
+
+
+def _build_index(now):
+    """Charge les stories actives en une requête et calcule la durée de cache."""
+    stories = list(
+        Story.objects.filter(created_at__gte=active_cutoff(now))
+        .select_related('user', 'user__profile')
+        .order_by('-created_at', '-id')
+    )
+    timeout = get_story_index_ttl()
+    if stories:
+        # La plus ancienne story expire en premier : reconstruire à ce moment-là
+        first_expiry = stories[-1].created_at + STORY_LIFETIME
+        timeout = max(1, min(timeout, int((first_expiry - now).total_seconds()) + 1))
+    return stories, timeout
+
+
+def get_active_stories():
+    """
+    Stories actives, de la plus récente à la plus ancienne.
+
+    Returns:
+        list: Instances Story (avec user et user.profile chargés)
+    """
+    now = timezone.now()
+    stories = cache.get(ACTIVE_STORIES_KEY)
+    if stories is None:
+        stories, timeout = _build_index(now)
+        cache.set(ACTIVE_STORIES_KEY, stories, timeout=timeout)
+    cutoff = active_cutoff(now)
+    return [story for story in stories if story.created_at >= cutoff]
+
+
+def get_active_stories_by_author():
+    """
+    Stories actives regroupées par auteur.
+
+    Returns:
+        list: [(auteur, [stories])], auteur ayant publié le plus récemment en premier
+    """
+    groups = {}
+    for story in get_active_stories():
+        groups.setdefault(story.user_id, (story.user, []))[1].append(story)
+    return list(groups.values())
+
+
+def seen_story_ids(viewer, story_ids):
+    """
+    Ids des stories déjà vues par le lecteur parmi story_ids (une requête).
+    """
+    if not story_ids or not viewer.is_authenticated:
+        return set()
+    return set(
+        StoryView.objects.filter(viewer=viewer, story_id__in=story_ids)
+        .values_list('story_id', flat=True)
+    )
+
+
+def get_story_ring(viewer):
+    """
+    Anneau de stories du feed : un élément par auteur.
+
+    Chaque story porte `seen` ; chaque groupe expose `cover` (première story
+    non vue, sinon la plus récente) et `seen` (toutes vues). Les auteurs non
+    entièrement vus passent en premier. Coût : index (en cache) + une requête.
+
+    Returns:
+        list: Dicts {'user', 'stories', 'cover', 'seen'}
+    """
+    groups = get_active_stories_by_author()
+    seen = seen_story_ids(viewer, [story.id for _, stories in groups for story in stories])
+
+    ring = []
+    for author, stories in groups:
+        for story in stories:
+            story.seen = story.id in seen or story.user_id == viewer.id
+        unseen = [story for story in stories if not story.seen]
+        ring.append({
+            'user': author,
+            'stories': stories,
+            # Reprendre à la plus ancienne story non vue
+            'cover': unseen[-1] if unseen else stories[0],
+            'seen': not unseen,
+        })
+    # Tri stable : l'ordre de récence est conservé dans chaque catégorie
+    ring.sort(key=lambda group: group['seen'])
+    return ring
+
+
+def record_story_view(story, viewer):
+    """
+    Enregistre la vue d'une story et met à jour son compteur.
+
+    Args:
+        story: La story ouverte
+        viewer: Le lecteur (l'auteur n'est pas compté)
+
+    Returns:
+        bool: True si c'est une nouvelle vue
+    """
+    if viewer == story.user:
+        return False
+    try:
+        with transaction.atomic():
+            _, created = StoryView.objects.get_or_create(story=story, viewer=viewer)
+            if created:
+                Story.objects.filter(pk=story.pk).update(views_count=F('views_count') + 1)
+    except IntegrityError:
+        # Vue concurrente déjà enregistrée
+        return False
+    if created:
+        story.views_count += 1
+    return created
+
+
+def expired_stories(now=None, grace=timedelta(0)):
+    """Stories expirées depuis au moins `grace` (à purger par sweep_expired_stories)."""
+    return Story.objects.filter(created_at__lt=active_cutoff(now) - grace).order_by('id')
+
+
+def story_media_files(story):
+    """Fichiers (image, vidéo) attachés à une story : liste de FieldFile."""
+    return [field for field in (story.image, story.video) if field and field.name]
+
+
+def delete_media_files(files):
+    """
+    Supprime des fichiers média du stockage.
+
+    Args:
+        files: Liste de FieldFile
+
+    Returns:
+        tuple: (fichiers supprimés, octets récupérés)
+    """
+    deleted, reclaimed = 0, 0
+    for field in files:
+        storage, name = field.storage, field.name
+        try:
+            if not storage.exists(name):
+                continue
+            size = storage.size(name)
+            storage.delete(name)
+        except OSError:
+            continue
+        deleted += 1
+        reclaimed += size
+    return deleted, reclaimed
@@ -0,0 +1,243 @@
+# core/utils/timeline.py
+"""
+Timeline matérialisée (fan-out-on-write).
+
+À la création d'un post, son id est poussé dans la boîte de réception
+(collection Mongo `timelines`) de chaque follower de l'auteur ; un post qui
+devient public à l'édition y est poussé, un post qui cesse de l'être en est
+retiré. Le feed "home"
+lit ensuite cette liste d'ids, plafonnée et triée, au lieu de parcourir toute
+la table Post. Les auteurs avec énormément de followers ne sont pas diffusés :
+leurs posts sont récupérés à la lecture (fan-out-on-read).
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from core.models import Post
+from core.mongo import get_db
+
+logger = logging.getLogger(__name__)
+
+
+def get_timeline_max_size():
+    """Nombre maximum d'ids conservés par boîte de réception."""
+    return getattr(settings, 'TIMELINE_MAX_SIZE', 500)
+
+
+def get_fanout_max_followers():
+    """Au-delà de ce nombre de followers, l'auteur passe en fan-out-on-read."""
+    return getattr(settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 5000)
+
+
+_indexes_ready = False
+
+
+def _ensure_indexes(db):
+    """Crée l'index unique sur timelines.user_id (une fois par processus)."""
+    global _indexes_ready
+    if not _indexes_ready:
+        db.timelines.create_index('user_id', unique=True)
+        _indexes_ready = True
+
+
+def _push_ids(db, user_ids, post_ids):
+    """Ajoute des ids en tête de plusieurs boîtes de réception (un seul aller-retour)."""
+    if not user_ids or not post_ids:
+        return
+    _ensure_indexes(db)
+    operations = [
+        UpdateOne(
+            {'user_id': user_id},
+            {'$push': {'post_ids': {
+                '$each': list(post_ids),
+                '$position': 0,
+                '$slice': get_timeline_max_size(),
+            }}},
+            upsert=True,
+        )
+        for user_id in user_ids
+    ]
+    db.timelines.bulk_write(operations, ordered=False)
+
+
+def _fan_out_followers(db, author_id):
+    """Followers destinataires du fan-out ([] pour un auteur en fan-out-on-read)."""
+    author = db.profiles.find_one({'user_id': author_id}, {'followers': 1, 'follower_count': 1}) or {}
+    followers = author.get('followers', [])
+    if author.get('follower_count', len(followers)) > get_fanout_max_followers():
+        return []
+    return [f for f in followers if f != author_id]
+
+
+def fan_out_post(post, db=None):
+    """
+    Pousse un post dans la timeline de son auteur et de ses followers.
+
+    Les posts non publics ne vont que dans la timeline de l'auteur ; les auteurs
+    dépassant TIMELINE_FANOUT_MAX_FOLLOWERS ne sont pas diffusés (leurs posts
+    sont lus à la demande par read_timeline_ids()).
+
+    Args:
+        post: Le Post qui vient d'être créé
+        db: Base Mongo (défaut : get_db())
+
+    Returns:
+        int: Nombre de boîtes de réception mises à jour
+    """
+    db = db if db is not None else get_db()
+    try:
+        recipients = [post.user_id]
+        if post.visibility == 'public':
+            recipients.extend(_fan_out_followers(db, post.user_id))
+        _push_ids(db, recipients, [post.id])
+        return len(recipients)
+    except PyMongoError as e:
+        # La timeline est reconstruite à la lecture si elle est incomplète
+        logger.warning("Fan-out du post %s impossible : %s", post.id, e)
+        return 0
+
+
+def schedule_fan_out(post):
+    """Déclenche fan_out_post() une fois la transaction en cours validée."""
+    transaction.on_commit(lambda: fan_out_post(post))
+
+
+def update_post_visibility(post, previous_visibility, db=None):
+    """
+    Répercute un changement de visibilité sur les timelines des followers.
+
+    Un post devenu public y est poussé ; un post qui ne l'est plus en est
+    retiré (il reste dans la timeline de l'auteur).
+
+    Args:
+        post: Le Post modifié (nouvelle visibilité)
+        previous_visibility: Sa visibilité avant modification
+        db: Base Mongo (défaut : get_db())
+
+    Returns:
+        int: Nombre de boîtes de réception mises à jour
+    """
+    is_public = post.visibility == 'public'
+    if is_public == (previous_visibility == 'public'):
+        return 0
+    db = db if db is not None else get_db()
+    try:
+        followers = _fan_out_followers(db, post.user_id)
+        if not followers:
+            return 0
+        if is_public:
+            _push_ids(db, followers, [post.id])
+            return len(followers)
+        result = db.timelines.update_many(
+            {'user_id': {'$in': followers}}, {'$pull': {'post_ids': post.id}}
+        )
+        return result.modified_count
+    except PyMongoError as e:
+        # Les posts non publics sont de toute façon filtrés à la lecture
+        logger.warning("Mise à jour des timelines du post %s impossible : %s", post.id, e)
+        return 0
+
+
+def schedule_visibility_update(post, previous_visibility):
+    """Déclenche update_post_visibility() une fois la transaction en cours validée."""
+    transaction.on_commit(lambda: update_post_visibility(post, previous_visibility))
+
+
+def _visible_posts(user, author_ids):
+    """
+    Posts des auteurs suivis visibles par l'utilisateur : les posts publics
+    et ses propres posts. Suivre un auteur n'est pas une amitié (abonnement
+    sans approbation) : les posts 'friends' restent réservés à l'auteur.
+    """
+    return Post.objects.filter(user_id__in=author_ids).filter(
+        Q(visibility='public') | Q(user=user)
+    )
+
+
+def rebuild_timeline(user, following, db=None):
+    """
+    Reconstruit la timeline d'un utilisateur depuis la base SQL.
+
+    Utilisé quand la boîte de réception n'existe pas encore (nouvel
+    utilisateur, collection vidée...).
+
+    Returns:
+        list: Les ids de la timeline, du plus récent au plus ancien
+    """
+    db = db if db is not None else get_db()
+    post_ids = list(
+        _visible_posts(user, set(following) | {user.id})
+        .order_by('-created_at', '-id')
+        .values_list('id', flat=True)[:get_timeline_max_size()]
+    )
+    db.timelines.update_one(
+        {'user_id': user.id}, {'$set': {'post_ids': post_ids}}, upsert=True
+    )
+    return post_ids
+
+
+def read_timeline_ids(user, db=None):
+    """
+    Retourne les ids de la timeline "home" d'un utilisateur.
+
+    Fusionne la boîte de réception matérialisée avec les posts récents des
+    auteurs suivis trop populaires pour le fan-out-on-write.
+
+    Returns:
+        tuple: (ids des posts, ids des auteurs suivis + l'utilisateur)
+               ou None si MongoDB est indisponible
+    """
+    db = db if db is not None else get_db()
+    try:
+        profile = db.profiles.find_one({'user_id': user.id}, {'following': 1}) or {}
+        following = profile.get('following', [])
+        authors = set(following) | {user.id}
+
+        timeline = db.timelines.find_one({'user_id': user.id}, {'post_ids': 1})
+        if timeline is None:
+            post_ids = rebuild_timeline(user, following, db=db)
+        else:
+            post_ids = timeline.get('post_ids', [])
+
+        # Fan-out-on-read pour les auteurs non diffusés
+        popular = [
+            p['user_id'] for p in db.profiles.find(
+                {'user_id': {'$in': following},
+                 'follower_count': {'$gt': get_fanout_max_followers()}},
+                {'user_id': 1},
+            )
+        ]
+    except PyMongoError as e:
+        logger.warning("Timeline indisponible pour %s : %s", user.id, e)
+        return None
+
+    if popular:
+        post_ids = list(post_ids) + list(
+            _visible_posts(user, popular)
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)[:get_timeline_max_size()]
+        )
+    return post_ids, authors
+
+
+def timeline_queryset(user, category=None, db=None):
+    """
+    Queryset du feed "home" construit depuis la timeline matérialisée.
+
+    Les ids d'auteurs non suivis (désabonnement) ou de posts devenus non
+    publics sont filtrés à la lecture. Retourne None si la timeline est indisponible,
+    l'appelant retombe alors sur le feed global.
+    """
+    result = read_timeline_ids(user, db=db)
+    if result is None:
+        return None
+    post_ids, authors = result
+    qs = _visible_posts(user, authors).filter(id__in=post_ids)
+    if category and category != 'all':
+        qs = qs.filter(image_category=category)
+    return qs
@@ -0,0 +1,172 @@
+# core/utils/user_directory.py
+"""
+Annuaire des comptes Django pour les listes d'utilisateurs issues de MongoDB.
+
+Les listes d'ids (followers, abonnements, recommandations) sont résolues en
+une seule requête SQL (User + UserProfile) au lieu d'une requête par id.
+Les entrées sont gardées dans un LRU par processus, invalidé par les
+signaux de sauvegarde de User et UserProfile (et borné par
+USER_DIRECTORY_TTL pour les écritures faites par d'autres processus).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from core.models import UserProfile
+
+# Caractères d'anciens slugs (emails) qui cassent les URLs de profil
+INVALID_SLUG_CHARS = ('@', '.', '+')
+
+
+def get_user_directory_size():
+    """Nombre maximum d'utilisateurs gardés en cache par processus."""
+    return getattr(settings, 'USER_DIRECTORY_CACHE_SIZE', 4096)
+
+
+def get_user_directory_ttl():
+    """Durée de vie maximale (secondes) d'une entrée en cache."""
+    return getattr(settings, 'USER_DIRECTORY_TTL', 300)
+
+
+def _has_valid_slug(slug):
+    return bool(slug) and not any(char in slug for char in INVALID_SLUG_CHARS)
+
+
+class UserDirectory:
+    """
+    Cache LRU user_id → entrée d'annuaire.
+
+    Entrée : {'user_id', 'username', 'first_name', 'last_name',
+              'display_name', 'slug', 'avatar_url'}
+    (slug None si l'utilisateur n'a pas de UserProfile).
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or get_user_directory_size()
+        self.ttl = ttl if ttl is not None else get_user_directory_ttl()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, user_ids, create_missing_profiles):
+        """Charge les entrées depuis la base (une requête, plus les réparations éventuelles)."""
+        rows = list(
+            User.objects.filter(id__in=user_ids)
+            .values('id', 'username', 'first_name', 'last_name', 'profile__id', 'profile__slug', 'profile__avatar')
+        )
+        if create_missing_profiles:
+            rows = self._repair_profiles(rows)
+
+        avatar_storage = UserProfile._meta.get_field('avatar').storage
+        entries = {}
+        for row in rows:
+            full_name = f"{row['first_name']} {row['last_name']}".strip()
+            entries[row['id']] = {
+                'user_id': row['id'],
+                'username': row['username'],
+                'first_name': row['first_name'],
+                'last_name': row['last_name'],
+                'display_name': full_name or row['username'],
+                'slug': row['profile__slug'] if row['profile__id'] else None,
+                'avatar_url': avatar_storage.url(row['profile__avatar']) if row['profile__avatar'] else None,
+            }
+        return entries
+
+    def _repair_profiles(self, rows):
+        """
+        Crée les UserProfile manquants (en une requête) et remplace les slugs
+        invalides par "user-<id>", pour que chaque utilisateur ait une URL de profil.
+        """
+        missing = [row for row in rows if not row['profile__id']]
+        if missing:
+            UserProfile.objects.bulk_create([
+                UserProfile(
+                    user_id=row['id'],
+                    slug=f"user-{row['id']}",
+                    bio=f"Profile of {row['first_name']} {row['last_name']}" if row['first_name'] else f"Profile of {row['username']}",
+                )
+                for row in missing
+            ], ignore_conflicts=True)
+        for row in rows:
+            if row['profile__id'] and not _has_valid_slug(row['profile__slug']):
+                UserProfile.objects.filter(pk=row['profile__id']).update(slug=f"user-{row['id']}")
+        if missing or any(not _has_valid_slug(row['profile__slug']) for row in rows):
+            created = dict(
+                UserProfile.objects.filter(user_id__in=[row['id'] for row in rows])
+                .values_list('user_id', 'id')
+            )
+            for row in rows:
+                if not row['profile__id'] or not _has_valid_slug(row['profile__slug']):
+                    row['profile__id'] = created.get(row['id'])
+                    row['profile__slug'] = f"user-{row['id']}"
+        return rows
+
+    def resolve(self, user_ids, create_missing_profiles=False):
+        """
+        Entrées d'annuaire d'une liste d'ids (utilisateurs Django inexistants ignorés).
+
+        Args:
+            user_ids: Ids d'utilisateurs (doublons et ordre sans importance)
+            create_missing_profiles: Créer les UserProfile absents et réparer
+                les slugs invalides (listes avec liens vers les profils)
+
+        Returns:
+            dict: user_id → entrée (copie modifiable)
+        """
+        now = time.monotonic()
+        found = {}
+        missing = []
+        with self._lock:
+            for user_id in dict.fromkeys(user_ids):
+                cached = self._entries.get(user_id)
+                if cached is None or now - cached[0] > self.ttl or (create_missing_profiles and not _has_valid_slug(cached[1]['slug'])):
+                    missing.append(user_id)
+                else:
+                    self._entries.move_to_end(user_id)
+                    found[user_id] = cached[1]
+
+        if missing:
+            loaded = self._load(missing, create_missing_profiles)
+            with self._lock:
+                for user_id, entry in loaded.items():
+                    self._entries[user_id] = (now, entry)
+                    self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            found.update(loaded)
+        return {user_id: dict(entry) for user_id, entry in found.items()}
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_user_directory():
+    """Annuaire partagé du processus."""
+    global _directory
+    if _directory is None:
+        with _directory_lock:
+            if _directory is None:
+                _directory = UserDirectory()
+    return _directory
+
+
+def resolve_users(user_ids, create_missing_profiles=False):
+    """Raccourci : get_user_directory().resolve(...)."""
+    return get_user_directory().resolve(user_ids, create_missing_profiles)
+
+
+def invalidate_user(user_id):
+    """Retire un utilisateur du cache (sauvegarde de son User ou UserProfile)."""
+    if _directory is not None:
+        _directory.invalidate(user_id)
@@ -28,12 +28,10 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.db.models import Q
 from .models import Post, Comment, Reaction, Share, UserProfile
-from sklearn.ensemble import RandomForestRegressor
 import numpy as np
-import pandas as pd
 from django.db.models import Q, Avg, Count
 from django.core.paginator import Paginator
-from .models import Post, Comment, Reaction, Share, UserProfile, Avis, AnalyticsEvent, Story, StoryView
+from .models import Post, Comment, Reaction, Share, UserProfile, Avis, AnalyticsEvent, Story
 from django.db.utils import OperationalError as DBOperationalError
 from .ai_services import transcribe_voice_note, classify_travel_image, get_image_tags
 import json
@@ -42,6 +40,19 @@ import requests
 from django.conf import settings
 from decimal import Decimal
 from core.utils.subscription import can_user_perform_action, increment_usage
+from core.utils.category_counters import build_category_badges, get_album_category_counts, get_feed_category_counts
+from core.utils.feed import attach_viewer_state, get_feed_mode_page, get_feed_page, is_valid_cursor
+from core.utils.panels import run_panels
+from core.utils.post_cards import invalidate_post_card, render_post_cards
+from core.utils.profile_similarity import update_profile_similarity
+from core.utils.recommendations import PAGES_SECTIONS, get_recommendations, invalidate_recommendations
+from core.utils.destinations import get_destination_catalog
+from core.utils.image_manifest import get_image_manifest
+from core.utils.destination_search import get_destination_search_index
+from core.utils.reference_data import COUNTRIES, COUNTRIES_WITH_FLAGS, LANGUAGES, country_code, country_flag, country_name
+from core.utils.stories import get_active_stories, get_story_ring, record_story_view, seen_story_ids
+from core.utils.timeline import schedule_fan_out, schedule_visibility_update
+from core.utils.user_directory import resolve_users
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 from .models import Subscription, UsageQuota, PaymentHistory
@@ -58,85 +69,6 @@ TRAVEL_TYPES = [
     ('couple', 'Couple'),
     ('friends', 'Friends')
 ]
-CITIES_CSV_PATH = r'D:\Django_Projet\Socialite\public\Cities.csv'
-# Liste des langues du monde (basée sur ISO 639-1 et langues courantes)
-LANGUAGES = [
-    ('af', 'Afrikaans'), ('sq', 'Albanian'), ('am', 'Amharic'), ('ar', 'Arabic'), 
-    ('hy', 'Armenian'), ('az', 'Azerbaijani'), ('eu', 'Basque'), ('be', 'Belarusian'), 
-    ('bn', 'Bengali'), ('bs', 'Bosnian'), ('bg', 'Bulgarian'), ('my', 'Burmese'), 
-    ('ca', 'Catalan'), ('zh', 'Chinese'), ('hr', 'Croatian'), ('cs', 'Czech'), 
-    ('da', 'Danish'), ('nl', 'Dutch'), ('en', 'English'), ('et', 'Estonian'), 
-    ('fi', 'Finnish'), ('fr', 'French'), ('gl', 'Galician'), ('ka', 'Georgian'), 
-    ('de', 'German'), ('el', 'Greek'), ('gu', 'Gujarati'), ('ha', 'Hausa'), 
-    ('he', 'Hebrew'), ('hi', 'Hindi'), ('hu', 'Hungarian'), ('is', 'Icelandic'), 
-    ('ig', 'Igbo'), ('id', 'Indonesian'), ('ga', 'Irish'), ('it', 'Italian'), 
-    ('ja', 'Japanese'), ('kn', 'Kannada'), ('kk', 'Kazakh'), ('km', 'Khmer'), 
-    ('ko', 'Korean'), ('ky', 'Kyrgyz'), ('lo', 'Lao'), ('lv', 'Latvian'), 
-    ('lt', 'Lithuanian'), ('mk', 'Macedonian'), ('mg', 'Malagasy'), ('ms', 'Malay'), 
-    ('ml', 'Malayalam'), ('mt', 'Maltese'), ('mi', 'Maori'), ('mr', 'Marathi'), 
-    ('mn', 'Mongolian'), ('ne', 'Nepali'), ('no', 'Norwegian'), ('or', 'Odia'), 
-    ('ps', 'Pashto'), ('fa', 'Persian'), ('pl', 'Polish'), ('pt', 'Portuguese'), 
-    ('pa', 'Punjabi'), ('ro', 'Romanian'), ('ru', 'Russian'), ('sr', 'Serbian'), 
-    ('sn', 'Shona'), ('sd', 'Sindhi'), ('si', 'Sinhala'), ('sk', 'Slovak'), 
-    ('sl', 'Slovenian'), ('so', 'Somali'), ('es', 'Spanish'), ('su', 'Sundanese'), 
-    ('sw', 'Swahili'), ('sv', 'Swedish'), ('tl', 'Tagalog'), ('ta', 'Tamil'), 
-    ('te', 'Telugu'), ('th', 'Thai'), ('tr', 'Turkish'), ('uk', 'Ukrainian'), 
-    ('ur', 'Urdu'), ('uz', 'Uzbek'), ('vi', 'Vietnamese'), ('cy', 'Welsh'), 
-    ('xh', 'Xhosa'), ('yi', 'Yiddish'), ('yo', 'Yoruba'), ('zu', 'Zulu')
-]
-
-# Liste des pays du monde (basée sur ISO 3166-1 alpha-2)
-COUNTRIES = [
-    ('AF', 'Afghanistan'), ('AL', 'Albania'), ('DZ', 'Algeria'), ('AD', 'Andorra'),
-    ('AO', 'Angola'), ('AG', 'Antigua and Barbuda'), ('AR', 'Argentina'), ('AM', 'Armenia'),
-    ('AU', 'Australia'), ('AT', 'Austria'), ('AZ', 'Azerbaijan'), ('BS', 'Bahamas'),
-    ('BH', 'Bahrain'), ('BD', 'Bangladesh'), ('BB', 'Barbados'), ('BY', 'Belarus'),
-    ('BE', 'Belgium'), ('BZ', 'Belize'), ('BJ', 'Benin'), ('BT', 'Bhutan'),
-    ('BO', 'Bolivia'), ('BA', 'Bosnia and Herzegovina'), ('BW', 'Botswana'), ('BR', 'Brazil'),
-    ('BN', 'Brunei'), ('BG', 'Bulgaria'), ('BF', 'Burkina Faso'), ('BI', 'Burundi'),
-    ('KH', 'Cambodia'), ('CM', 'Cameroon'), ('CA', 'Canada'), ('CV', 'Cape Verde'),
-    ('CF', 'Central African Republic'), ('TD', 'Chad'), ('CL', 'Chile'), ('CN', 'China'),
-    ('CO', 'Colombia'), ('KM', 'Comoros'), ('CG', 'Congo'), ('CD', 'Congo, Democratic Republic'),
-    ('CR', 'Costa Rica'), ('HR', 'Croatia'), ('CU', 'Cuba'), ('CY', 'Cyprus'),
-    ('CZ', 'Czech Republic'), ('DK', 'Denmark'), ('DJ', 'Djibouti'), ('DM', 'Dominica'),
-    ('DO', 'Dominican Republic'), ('EC', 'Ecuador'), ('EG', 'Egypt'), ('SV', 'El Salvador'),
-    ('GQ', 'Equatorial Guinea'), ('ER', 'Eritrea'), ('EE', 'Estonia'), ('ET', 'Ethiopia'),
-    ('FJ', 'Fiji'), ('FI', 'Finland'), ('FR', 'France'), ('GA', 'Gabon'),
-    ('GM', 'Gambia'), ('GE', 'Georgia'), ('DE', 'Germany'), ('GH', 'Ghana'),
-    ('GR', 'Greece'), ('GD', 'Grenada'), ('GT', 'Guatemala'), ('GN', 'Guinea'),
-    ('GW', 'Guinea-Bissau'), ('GY', 'Guyana'), ('HT', 'Haiti'), ('HN', 'Honduras'),
-    ('HU', 'Hungary'), ('IS', 'Iceland'), ('IN', 'India'), ('ID', 'Indonesia'),
-    ('IR', 'Iran'), ('IQ', 'Iraq'), ('IE', 'Ireland'), ('IL', 'Israel'),
-    ('IT', 'Italy'), ('JM', 'Jamaica'), ('JP', 'Japan'), ('JO', 'Jordan'),
-    ('KZ', 'Kazakhstan'), ('KE', 'Kenya'), ('KI', 'Kiribati'), ('KP', 'North Korea'),
-    ('KR', 'South Korea'), ('KW', 'Kuwait'), ('KG', 'Kyrgyzstan'), ('LA', 'Laos'),
-    ('LV', 'Latvia'), ('LB', 'Lebanon'), ('LS', 'Lesotho'), ('LR', 'Liberia'),
-    ('LY', 'Libya'), ('LI', 'Liechtenstein'), ('LT', 'Lithuania'), ('LU', 'Luxembourg'),
-    ('MG', 'Madagascar'), ('MW', 'Malawi'), ('MY', 'Malaysia'), ('MV', 'Maldives'),
-    ('ML', 'Mali'), ('MT', 'Malta'), ('MH', 'Marshall Islands'), ('MR', 'Mauritania'),
-    ('MU', 'Mauritius'), ('MX', 'Mexico'), ('FM', 'Micronesia'), ('MD', 'Moldova'),
-    ('MC', 'Monaco'), ('MN', 'Mongolia'), ('ME', 'Montenegro'), ('MA', 'Morocco'),
-    ('MZ', 'Mozambique'), ('MM', 'Myanmar'), ('NA', 'Namibia'), ('NR', 'Nauru'),
-    ('NP', 'Nepal'), ('NL', 'Netherlands'), ('NZ', 'New Zealand'), ('NI', 'Nicaragua'),
-    ('NE', 'Niger'), ('NG', 'Nigeria'), ('NO', 'Norway'), ('OM', 'Oman'),
-    ('PK', 'Pakistan'), ('PW', 'Palau'), ('PA', 'Panama'), ('PG', 'Papua New Guinea'),
-    ('PY', 'Paraguay'), ('PE', 'Peru'), ('PH', 'Philippines'), ('PL', 'Poland'),
-    ('PT', 'Portugal'), ('QA', 'Qatar'), ('RO', 'Romania'), ('RU', 'Russia'),
-    ('RW', 'Rwanda'), ('KN', 'Saint Kitts and Nevis'), ('LC', 'Saint Lucia'),
-    ('VC', 'Saint Vincent and the Grenadines'), ('WS', 'Samoa'), ('SM', 'San Marino'),
-    ('ST', 'Sao Tome and Principe'), ('SA', 'Saudi Arabia'), ('SN', 'Senegal'),
-    ('RS', 'Serbia'), ('SC', 'Seychelles'), ('SL', 'Sierra Leone'), ('SG', 'Singapore'),
-    ('SK', 'Slovakia'), ('SI', 'Slovenia'), ('SB', 'Solomon Islands'), ('SO', 'Somalia'),
-    ('ZA', 'South Africa'), ('SS', 'South Sudan'), ('ES', 'Spain'), ('LK', 'Sri Lanka'),
-    ('SD', 'Sudan'), ('SR', 'Suriname'), ('SE', 'Sweden'), ('CH', 'Switzerland'),
-    ('SY', 'Syria'), ('TW', 'Taiwan'), ('TJ', 'Tajikistan'), ('TZ', 'Tanzania'),
-    ('TH', 'Thailand'), ('TL', 'Timor-Leste'), ('TG', 'Togo'), ('TO', 'Tonga'),
-    ('TT', 'Trinidad and Tobago'), ('TN', 'Tunisia'), ('TR', 'Turkey'), ('TM', 'Turkmenistan'),
-    ('TV', 'Tuvalu'), ('UG', 'Uganda'), ('UA', 'Ukraine'), ('AE', 'United Arab Emirates'),
-    ('GB', 'United Kingdom'), ('US', 'United States'), ('UY', 'Uruguay'), ('UZ', 'Uzbekistan'),
-    ('VU', 'Vanuatu'), ('VE', 'Venezuela'), ('VN', 'Vietnam'), ('YE', 'Yemen'),
-    ('ZM', 'Zambia'), ('ZW', 'Zimbabwe')
-]
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 def format_follower_count(count):
@@ -147,29 +79,34 @@ def format_follower_count(count):
         return f"{count // 1_000}K"
     return str(count)
 
-def calculate_similarity(user_profile, other_profile):
-    """Calculate similarity score between two user profiles."""
-    score = 0
-    # Travel types
-    user_travel_types = set(user_profile.get('travel_type', []))
-    other_travel_types = set(other_profile.get('travel_type', []))
-    score += len(user_travel_types.intersection(other_travel_types)) * 2
-    
-    # Languages
-    user_languages = set(user_profile.get('languages', []))
-    other_languages = set(other_profile.get('languages', []))
-    score += len(user_languages.intersection(other_languages))
-    
-    # Nationality
-    if user_profile.get('nationality') == other_profile.get('nationality'):
-        score += 5
-    
-    # Interests
-    user_interests = set(user_profile.get('interests', []))
-    other_interests = set(other_profile.get('interests', []))
-    score += len(user_interests.intersection(other_interests)) * 3
-    
-    return score
+def load_profile_cards(db, user_ids):
+    """
+    Données d'affichage des profils recommandés (une requête MongoDB, une requête SQL au plus).
+
+    Returns:
+        dict: user_id → {'user_id', 'first_name', 'last_name', 'profile_image', 'follower_count', 'is_following', 'slug'}
+    """
+    cards = {}
+    user_ids = list(user_ids)
+    profiles = db.profiles.find(
+        {'user_id': {'$in': user_ids}},
+        {'user_id': 1, 'first_name': 1, 'last_name': 1, 'profile_image': 1, 'follower_count': 1},
+    )
+    # Slugs des comptes Django : une requête (annuaire en cache)
+    directory = resolve_users(user_ids)
+    for profile in profiles:
+        entry = directory.get(profile['user_id'])
+        slug = entry['slug'] if entry and entry['slug'] else str(profile['user_id'])  # Fallback sur user_id
+        cards[profile['user_id']] = {
+            'user_id': profile['user_id'],
+            'first_name': profile.get('first_name', ''),
+            'last_name': profile.get('last_name', ''),
+            'profile_image': profile.get('profile_image', '/static/images/avatars/avatar-default.webp'),
+            'follower_count': format_follower_count(profile.get('follower_count', 0)),
+            'is_following': False,  # Abonnements exclus des recommandations
+            'slug': slug,
+        }
+    return cards
 
 @csrf_exempt
 @api_view(['GET'])
@@ -382,7 +319,7 @@ def register_page(request):
 
         # Save profile to MongoDB
         db = get_db()
-        db.profiles.insert_one({
+        mongo_profile = {
             'user_id': user.id,
             'email': email,
             'first_name': first_name,
@@ -398,8 +335,11 @@ def register_page(request):
             'future_countries': future_countries,  # Ajout
             'followers': [],  # Initialize empty followers list
             'following': [],  # Initialize empty following list
-            'follower_count': 0  # Initialize follower count
-        })
+            'follower_count': 0,  # Initialize follower count
+            'updated_at': timezone.now(),  # Recommandations des voisins à rafraîchir
+        }
+        db.profiles.insert_one(mongo_profile)
+        update_profile_similarity(mongo_profile)
 
         return redirect('login_page')
 
@@ -484,7 +424,7 @@ def follow_unfollow_user(request):
         # Unfollow
         db.profiles.update_one(
             {'user_id': user.id},
-            {'$pull': {'following': target_user_id}}
+            {'$pull': {'following': target_user_id}, '$set': {'updated_at': timezone.now()}}
         )
         db.profiles.update_one(
             {'user_id': target_user_id},
@@ -496,7 +436,7 @@ def follow_unfollow_user(request):
         # Follow
         db.profiles.update_one(
             {'user_id': user.id},
-            {'$addToSet': {'following': target_user_id}}
+            {'$addToSet': {'following': target_user_id}, '$set': {'updated_at': timezone.now()}}
         )
         db.profiles.update_one(
             {'user_id': target_user_id},
@@ -542,7 +482,7 @@ def follow_unfollow(request):
         # Unfollow
         db.profiles.update_one(
             {'user_id': user.id},
-            {'$pull': {'following': target_user_id}}
+            {'$pull': {'following': target_user_id}, '$set': {'updated_at': timezone.now()}}
         )
         db.profiles.update_one(
             {'user_id': target_user_id},
@@ -553,7 +493,7 @@ def follow_unfollow(request):
         # Follow
         db.profiles.update_one(
             {'user_id': user.id},
-            {'$addToSet': {'following': target_user_id}}
+            {'$addToSet': {'following': target_user_id}, '$set': {'updated_at': timezone.now()}}
         )
         db.profiles.update_one(
             {'user_id': target_user_id},
@@ -594,293 +534,179 @@ def feed(request):
     Affiche tous les posts publics + posts de l'utilisateur.
     Supporte le filtrage par catégorie d'image.
     """
-    # Imports nécessaires
-    from django.utils import timezone
-    from datetime import timedelta
-    from django.db.models import Count, Q
-    import os
-    import random
-    import pandas as pd
-    
-    # Récupérer le filtre de catégorie depuis les paramètres GET
+    # Récupérer le filtre de catégorie et le mode du feed depuis les paramètres GET
     category_filter = request.GET.get('category', 'all')
+    feed_mode = request.GET.get('mode', 'all')
     
-    # Récupérer tous les posts publics + posts de l'utilisateur
-    posts_query = Post.objects.filter(
-        Q(visibility='public') | Q(user=request.user)
-    )
-    
-    # 🔍 Filtrage par catégorie d'image
-    if category_filter and category_filter != 'all':
-        posts_query = posts_query.filter(image_category=category_filter)
-    
-    posts = posts_query.select_related('user', 'user__profile').prefetch_related(
-        'comments', 'comments__user', 'comments__user__profile', 
-        'comments__reactions', 'reactions', 'post_shares'
-    ).order_by('-created_at')
+    # Récupérer les posts du mode choisi (🔍 filtrés par catégorie) :
+    # 'all' = posts publics + posts de l'utilisateur (ordre chronologique, défaut),
+    # 'home' = timeline des abonnements, 'ranked' = classement par engagement
+    # 📄 Première page uniquement : la suite est chargée via /api/feed/
+    posts, next_cursor = get_feed_mode_page(request.user, feed_mode, category=category_filter)
 
-    # Stories actives (24h)
-    cutoff = timezone.now() - timedelta(hours=24)
-    try:
-        active_stories_qs = (
-            Story.objects.filter(created_at__gte=cutoff)
-            .select_related('user', 'user__profile')
-            .order_by('-created_at')
-        )
-        # Force l'évaluation ici pour attraper l'erreur DB avant le template
-        active_stories = list(active_stories_qs)
-    except DBOperationalError:
-        # Table non migrée encore → éviter de casser le feed
-        active_stories = []
-    
-    # 📊 Compter les posts par catégorie (pour les badges de comptage)
-    category_counts = Post.objects.filter(
-        Q(visibility='public') | Q(user=request.user),
-        image_category__isnull=False
-    ).values('image_category').annotate(count=Count('id'))
-    
-    # Transformer en dictionnaire pour faciliter l'accès
-    counts_dict = {item['image_category']: item['count'] for item in category_counts}
-    
-    # Mapping des catégories avec leurs informations
-    categories = [
-        {'id': 'all', 'name': 'Tous', 'icon': '🌍', 'count': posts_query.count()},
-        {'id': 'sea', 'name': 'Mer', 'icon': '🌊', 'count': counts_dict.get('sea', 0)},
-        {'id': 'mountain', 'name': 'Montagne', 'icon': '⛰️', 'count': counts_dict.get('mountain', 0)},
-        {'id': 'forest', 'name': 'Forêt', 'icon': '🌲', 'count': counts_dict.get('forest', 0)},
-        {'id': 'buildings', 'name': 'Ville', 'icon': '🏢', 'count': counts_dict.get('buildings', 0)},
-        {'id': 'street', 'name': 'Rue', 'icon': '🛣️', 'count': counts_dict.get('street', 0)},
-        {'id': 'glacier', 'name': 'Glacier', 'icon': '❄️', 'count': counts_dict.get('glacier', 0)},
-    ]
+    # 📊 Badges de comptage par catégorie (compteurs maintenus à l'écriture)
+    categories = build_category_badges(get_feed_category_counts(request.user))
     
     # Pour chaque post, vérifier si l'utilisateur a déjà réagi
-    for post in posts:
-        # Est-ce que l'utilisateur a liké ce post ?
-        post.user_reaction = post.reactions.filter(user=request.user).first()
-        
-        # Calculer les statistiques
-        post.total_reactions = post.reactions.count()
-        post.total_comments = post.comments.filter(parent=None).count()  # Seulement les commentaires principaux
-        
-        # Pour chaque commentaire, vérifier si l'utilisateur a réagi
-        for comment in post.comments.all():
-            comment.user_reaction = comment.reactions.filter(user=request.user).first()
+    attach_viewer_state(posts, request.user)
     
-    # 🔎 Log vue du feed (une ligne par appel, pas par post)
-    try:
+    # 🧩 HTML des cartes (fragments partagés en cache + état du lecteur)
+    for post, card_html in zip(posts, render_post_cards(posts, request)):
+        post.card_html = card_html
+
+    # ============================================
+    # PANNEAUX LATÉRAUX (exécutés en parallèle, chacun avec son délai)
+    # ============================================
+    db = get_db()
+    user = request.user
+
+    # Profil MongoDB du lecteur : chargé une seule fois et partagé par les panneaux
+    user_profile = run_panels(
+        {'mongo_profile': lambda: db.profiles.find_one({'user_id': user.id})},
+        fallbacks={'mongo_profile': None},
+    )['mongo_profile']
+
+    def load_stories():
+        # Anneau de stories (index des stories actives + état "vue" du lecteur)
+        try:
+            return get_story_ring(user)
+        except DBOperationalError:
+            # Table non migrée encore → éviter de casser le feed
+            return []
+
+    def log_feed_view():
+        # 🔎 Log vue du feed (une ligne par appel, pas par post)
         AnalyticsEvent.objects.create(
             event_type='view_feed',
-            user=request.user if request.user.is_authenticated else None,
+            user=user if user.is_authenticated else None,
             media_type='mixed',
             success=True
         )
-    except Exception:
-        pass
 
-    # AJOUT : Récupérer les destinations "future_places" pour la section "Just for you"
-    future_places = []
-    db = get_db()
-    user_profile = db.profiles.find_one({'user_id': request.user.id})
+    def build_future_places():
+        # AJOUT : Récupérer les destinations "future_places" pour la section "Just for you"
+        future_places = []
+        if not user_profile:
+            return future_places
 
-    if user_profile:
         future_countries = user_profile.get('future_countries', [])
         travel_budget = user_profile.get('travel_budget', '').lower()
-        
+    
         try:
-            # Charger les datasets
-            cities_df = pd.read_csv(r'D:\Django_Projet\Socialite\public\Cities.csv')
-            
-            # Normaliser les données
-            cities_df['city'] = cities_df['city'].str.strip().str.title()
-            cities_df['country'] = cities_df['country'].str.strip().str.title()
-            cities_df['region'] = cities_df['region'].str.strip().str.title()
-            cities_df['budget_level'] = cities_df['budget_level'].str.strip().str.title()
-            
-            # Dictionnaire de mappage des codes ISO aux noms de pays
-            country_code_to_name = {
-                'af': 'Afghanistan', 'al': 'Albania', 'dz': 'Algeria', 'ad': 'Andorra',
-                'ao': 'Angola', 'ag': 'Antigua and Barbuda', 'ar': 'Argentina', 'am': 'Armenia',
-                'au': 'Australia', 'at': 'Austria', 'az': 'Azerbaijan', 'bs': 'Bahamas',
-                'bh': 'Bahrain', 'bd': 'Bangladesh', 'bb': 'Barbados', 'by': 'Belarus',
-                'be': 'Belgium', 'bz': 'Belize', 'bj': 'Benin', 'bt': 'Bhutan',
-                'bo': 'Bolivia', 'ba': 'Bosnia and Herzegovina', 'bw': 'Botswana', 'br': 'Brazil',
-                'bn': 'Brunei', 'bg': 'Bulgaria', 'bf': 'Burkina Faso', 'bi': 'Burundi',
-                'kh': 'Cambodia', 'cm': 'Cameroon', 'ca': 'Canada', 'cv': 'Cape Verde',
-                'cf': 'Central African Republic', 'td': 'Chad', 'cl': 'Chile', 'cn': 'China',
-                'co': 'Colombia', 'km': 'Comoros', 'cg': 'Congo', 'cd': 'Congo, Democratic Republic',
-                'cr': 'Costa Rica', 'hr': 'Croatia', 'cu': 'Cuba', 'cy': 'Cyprus',
-                'cz': 'Czech Republic', 'dk': 'Denmark', 'dj': 'Djibouti', 'dm': 'Dominica',
-                'do': 'Dominican Republic', 'ec': 'Ecuador', 'eg': 'Egypt', 'sv': 'El Salvador',
-                'gq': 'Equatorial Guinea', 'er': 'Eritrea', 'ee': 'Estonia', 'et': 'Ethiopia',
-                'fj': 'Fiji', 'fi': 'Finland', 'fr': 'France', 'ga': 'Gabon',
-                'gm': 'Gambia', 'ge': 'Georgia', 'de': 'Germany', 'gh': 'Ghana',
-                'gr': 'Greece', 'gd': 'Grenada', 'gt': 'Guatemala', 'gn': 'Guinea',
-                'gw': 'Guinea-Bissau', 'gy': 'Guyana', 'ht': 'Haiti', 'hn': 'Honduras',
-                'hu': 'Hungary', 'is': 'Iceland', 'in': 'India', 'id': 'Indonesia',
-                'ir': 'Iran', 'iq': 'Iraq', 'ie': 'Ireland', 'il': 'Israel',
-                'it': 'Italy', 'jm': 'Jamaica', 'jp': 'Japan', 'jo': 'Jordan',
-                'kz': 'Kazakhstan', 'ke': 'Kenya', 'ki': 'Kiribati', 'kp': 'North Korea',
-                'kr': 'South Korea', 'kw': 'Kuwait', 'kg': 'Kyrgyzstan', 'la': 'Laos',
-                'lv': 'Latvia', 'lb': 'Lebanon', 'ls': 'Lesotho', 'lr': 'Liberia',
-                'ly': 'Libya', 'li': 'Liechtenstein', 'lt': 'Lithuania', 'lu': 'Luxembourg',
-                'mg': 'Madagascar', 'mw': 'Malawi', 'my': 'Malaysia', 'mv': 'Maldives',
-                'ml': 'Mali', 'mt': 'Malta', 'mh': 'Marshall Islands', 'mr': 'Mauritania',
-                'mu': 'Mauritius', 'mx': 'Mexico', 'fm': 'Micronesia', 'md': 'Moldova',
-                'mc': 'Monaco', 'mn': 'Mongolia', 'me': 'Montenegro', 'ma': 'Morocco',
-                'mz': 'Mozambique', 'mm': 'Myanmar', 'na': 'Namibia', 'nr': 'Nauru',
-                'np': 'Nepal', 'nl': 'Netherlands', 'nz': 'New Zealand', 'ni': 'Nicaragua',
-                'ne': 'Niger', 'ng': 'Nigeria', 'no': 'Norway', 'om': 'Oman',
-                'pk': 'Pakistan', 'pw': 'Palau', 'pa': 'Panama', 'pg': 'Papua New Guinea',
-                'py': 'Paraguay', 'pe': 'Peru', 'ph': 'Philippines', 'pl': 'Poland',
-                'pt': 'Portugal', 'qa': 'Qatar', 'ro': 'Romania', 'ru': 'Russia',
-                'rw': 'Rwanda', 'kn': 'Saint Kitts and Nevis', 'lc': 'Saint Lucia',
-                'vc': 'Saint Vincent and the Grenadines', 'ws': 'Samoa', 'sm': 'San Marino',
-                'st': 'Sao Tome and Principe', 'sa': 'Saudi Arabia', 'sn': 'Senegal',
-                'rs': 'Serbia', 'sc': 'Seychelles', 'sl': 'Sierra Leone', 'sg': 'Singapore',
-                'sk': 'Slovakia', 'si': 'Slovenia', 'sb': 'Solomon Islands', 'so': 'Somalia',
-                'za': 'South Africa', 'ss': 'South Sudan', 'es': 'Spain', 'lk': 'Sri Lanka',
-                'sd': 'Sudan', 'sr': 'Suriname', 'se': 'Sweden', 'ch': 'Switzerland',
-                'sy': 'Syria', 'tw': 'Taiwan', 'tj': 'Tajikistan', 'tz': 'Tanzania',
-                'th': 'Thailand', 'tl': 'Timor-Leste', 'tg': 'Togo', 'to': 'Tonga',
-                'tt': 'Trinidad and Tobago', 'tn': 'Tunisia', 'tr': 'Turkey', 'tm': 'Turkmenistan',
-                'tv': 'Tuvalu', 'ug': 'Uganda', 'ua': 'Ukraine', 'ae': 'United Arab Emirates',
-                'gb': 'United Kingdom', 'us': 'United States', 'uy': 'Uruguay', 'uz': 'Uzbekistan',
-                'vu': 'Vanuatu', 've': 'Venezuela', 'vn': 'Vietnam', 'ye': 'Yemen',
-                'zm': 'Zambia', 'zw': 'Zimbabwe'
-            }
-            
+            # Datasets chargés et indexés une fois par processus
+            catalog = get_destination_catalog()
+        
             # Convertir les codes ISO en noms complets pour future_countries
-            future_country_names = [country_code_to_name.get(code.lower(), '') for code in future_countries]
+            future_country_names = [country_name(code) for code in future_countries]
             future_country_names = [name for name in future_country_names if name]  # Supprimer les entrées vides
-            
-            # Fonction pour obtenir une image aléatoire du continent
-            def get_random_continent_image(region):
-                continent_images_base = r"D:\Django_Projet\Socialite\public\assets\images\Continent"
-                continent_mapping = {
-                    'africa': 'Africa',
-                    'asia': 'Asia', 
-                    'europe': 'Europe',
-                    'north_america': 'North America',
-                    'south_america': 'South America',
-                    'oceania': 'Oceania',
-                    'antarctica': 'Antarctica'
-                }
-                
-                continent_folder = continent_mapping.get(region.lower(), 'Africa')
-                continent_path = os.path.join(continent_images_base, continent_folder)
-                default_image = "/static/images/group/group-cover-1.webp"
-                
-                if os.path.exists(continent_path):
-                    try:
-                        images = [f for f in os.listdir(continent_path)
-                                 if f.lower().endswith(('.jpg', '.jpeg', '.png')) and os.path.isfile(os.path.join(continent_path, f))]
-                        if images:
-                            chosen_image = random.choice(images)
-                            image_url = f"/assets/images/Continent/{continent_folder}/{chosen_image}"
-                            return image_url
-                    except (OSError, PermissionError):
-                        pass
-                
-                return default_image
-            
-            # Fonction pour vérifier la visibilité selon le budget
-            def is_place_visible(place, user_budget):
-                budget_mapping = {
-                    'economic': 'Budget',
-                    'medium': 'Mid-range',
-                    'comfort': 'Mid-range', 
-                    'luxury': 'Luxury'
-                }
-                target_budget_mapped = budget_mapping.get(user_budget, 'Mid-range')
-                budget_hierarchy = {
-                    'Budget': 1,
-                    'Mid-range': 2,
-                    'Luxury': 3
-                }
-                user_budget_level = budget_hierarchy.get(target_budget_mapped, 2)
-                place_budget_level = budget_hierarchy.get(place['budget_level'].title(), 2)
-                return (user_budget in ['comfort', 'luxury'] and place_budget_level <= user_budget_level) or \
-                       (user_budget in ['economic', 'medium'] and place['budget_level'].title() == target_budget_mapped)
-            
+        
+            # Images des continents (manifeste en mémoire, choix stable par ville)
+            image_manifest = get_image_manifest()
+        
+            # Visibilité selon le budget : masque précalculé par le catalogue
+            visible, _ = catalog.budget_tier(travel_budget)
+        
             # Récupérer les destinations pour les pays futurs
-            for country_name in future_country_names:
-                country_places = cities_df[cities_df['country'].str.lower() == country_name.lower()]
-                for _, place in country_places.iterrows():
-                    if is_place_visible(place, travel_budget):
-                        # Utiliser get_random_continent_image() au lieu de l'image par défaut
-                        destination = {
-                            'city': place['city'],
-                            'country': place['country'],
-                            'continent': place['region'],
-                            'description': place.get('short_description', 'Discover this amazing destination'),
-                            'continent_image': get_random_continent_image(place['region']),
-                            'budget': place['budget_level']
-                        }
-                        future_places.append(destination)
-            
+            for future_name in future_country_names:
+                positions = np.flatnonzero(visible & (catalog.country_keys == future_name.lower()))
+                for position in positions:
+                    place = catalog.records[position]
+                    future_places.append({
+                        'city': place.city,
+                        'country': place.country,
+                        'continent': place.region,
+                        'description': place.description or 'Discover this amazing destination',
+                        'continent_image': image_manifest.continent_image(
+                            place.region, f"{place.city}|{place.country}"
+                        ),
+                        'budget': place.budget
+                    })
+        
             # Limiter à 6 destinations maximum
             future_places = future_places[:6]
-            
+        
         except Exception as e:
             # En cas d'erreur avec les datasets, on continue sans future_places
             print(f"Erreur lors du chargement des destinations: {e}")
             future_places = []
+        return future_places
+
+    def build_travel_companions():
+        # Ne modifie pas ces lignes et ne les supprime pas ines dahmani :)
+        if not user_profile:
+            return []
+        return get_travel_companions(user, db, user_profile=user_profile)
+
+    def build_suggested_users():
+        # Ajout de la logique pour suggested_users
+        suggested_users = []
+        
+        # Vérifier si l'utilisateur a un profil MongoDB
+        if not user_profile:
+            return suggested_users
+
+        # Top 4 des profils similaires non suivis (liste précalculée dans user_recommendations)
+        entries = get_recommendations(db, user_profile, ['suggested_users'])['suggested_users']
+        cards = load_profile_cards(db, [entry['user_id'] for entry in entries])
+        for entry in entries:
+            if entry['user_id'] in cards:  # Profil supprimé depuis le calcul
+                suggested_users.append({**cards[entry['user_id']], 'score': entry['score']})
+        return suggested_users
+
+    panels = run_panels({
+        'stories': load_stories,
+        'analytics': log_feed_view,
+        'future_places': build_future_places,
+        'travel_companions': build_travel_companions,
+        'suggested_users': build_suggested_users,
+    }, fallbacks={'analytics': None})
 
     context = {
         'posts': posts,
+        'next_cursor': next_cursor,
         'categories': categories,
         'current_category': category_filter,
-        'stories': active_stories,
-        'future_places': future_places,  # AJOUT : Destinations pour "Just for you"
+        'feed_mode': feed_mode,
+        'stories': panels['stories'],
+        'future_places': panels['future_places'],  # AJOUT : Destinations pour "Just for you"
+        'travel_companions': panels['travel_companions'],
+        'suggested_users': panels['suggested_users'],
     }
 
-    # Ne modifie pas ces trois lignes et ne les supprime pas ines dahmani :)
-    db = get_db()
-    travel_companions = get_travel_companions(request.user, db)
-    context['travel_companions'] = travel_companions
+    return render(request, 'feed.html', context)
 
-    # Ajout de la logique pour suggested_users
-    user = request.user
-    user_profile = db.profiles.find_one({'user_id': user.id})
-    
-    # Initialiser suggested_users comme liste vide
-    suggested_users = []
-    
-    # Vérifier si l'utilisateur a un profil MongoDB
-    if user_profile:
-        # Récupérer tous les profils sauf celui de l'utilisateur actuel
-        profiles = list(db.profiles.find({'user_id': {'$ne': user.id}}))
-        
-        # Calculer les scores de similarité
-        for profile in profiles:
-            if profile:  # Vérifier que le profil n'est pas None
-                score = calculate_similarity(user_profile, profile)
-                try:
-                    user_profile_obj = UserProfile.objects.get(user_id=profile['user_id'])
-                    slug = user_profile_obj.slug
-                except UserProfile.DoesNotExist:
-                    slug = str(profile['user_id'])  # Fallback sur user_id
-                suggested_users.append({
-                    'user_id': profile['user_id'],
-                    'first_name': profile['first_name'],
-                    'last_name': profile['last_name'],
-                    'profile_image': profile.get('profile_image', '/static/images/avatars/avatar-default.webp'),
-                    'follower_count': format_follower_count(profile.get('follower_count', 0)),
-                    'is_following': profile['user_id'] in user_profile.get('following', []),
-                    'score': score,
-                    'slug': slug
-                })
-        
-        # Trier par score de similarité (décroissant)
-        suggested_users.sort(key=lambda x: x.get('score', 0), reverse=True)
-        
-        # Filtrer pour n'afficher que les utilisateurs non suivis et limiter à 4
-        suggested_users = [user for user in suggested_users if not user['is_following']][:4]
-    
-    # Ajouter suggested_users au contexte
-    context['suggested_users'] = suggested_users
 
-    return render(request, 'feed.html', context)
+@login_required(login_url='/login/')
+@require_http_methods(["GET"])
+def feed_page(request):
+    """
+    API du défilement infini : retourne la page de posts plus ancienne que le
+    curseur fourni, rendue avec le même template que le feed.
+    """
+    cursor = request.GET.get('cursor')
+    category_filter = request.GET.get('category', 'all')
+    feed_mode = request.GET.get('mode', 'all')
+
+    if cursor and not is_valid_cursor(cursor, feed_mode):
+        return JsonResponse({'success': False, 'error': 'Curseur invalide'}, status=400)
+
+    posts, next_cursor = get_feed_mode_page(request.user, feed_mode, cursor=cursor, category=category_filter)
+    restart = posts is None
+    if restart:
+        # Classement "ranked" expiré : première page d'un nouveau classement,
+        # le client remplace la liste au lieu de l'allonger
+        posts, next_cursor = get_feed_mode_page(request.user, feed_mode, category=category_filter)
+    attach_viewer_state(posts, request.user)
+
+    html = ''.join(render_post_cards(posts, request))
+
+    return JsonResponse({
+        'success': True,
+        'html': html,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        'restart': restart,
+    })
 
  
 
@@ -919,366 +745,106 @@ def place(request):
         favorite_destinations = user_profile.get('favorite_destinations', [])
         passed_destinations = user_profile.get('passed_destinations', [])  # Nouveau champ pour les destinations passées
 
-        # Charger les datasets
-        cities_df = pd.read_csv(r'D:\Django_Projet\Socialite\public\Cities.csv')
-        flags_df = pd.read_csv(r"D:\Django_Projet\Socialite\public\Flags.csv")
-
-        # Normaliser les données
-        cities_df['city'] = cities_df['city'].str.strip().str.title()
-        cities_df['country'] = cities_df['country'].str.strip().str.title()
-        cities_df['region'] = cities_df['region'].str.strip().str.title()
-        cities_df['budget_level'] = cities_df['budget_level'].str.strip().str.title()
+        # Datasets chargés et normalisés une fois par processus
+        catalog = get_destination_catalog()
 
         # Liste des pays uniques pour le filtre country
-        countries = sorted(cities_df['country'].unique().tolist())
-
-        # Dictionnaire de mappage des codes ISO aux noms de pays
-        country_code_to_name = {
-            code.lower(): name for code, name in [
-                ('af', 'Afghanistan'), ('al', 'Albania'), ('dz', 'Algeria'), ('ad', 'Andorra'),
-                ('ao', 'Angola'), ('ag', 'Antigua and Barbuda'), ('ar', 'Argentina'), ('am', 'Armenia'),
-                ('au', 'Australia'), ('at', 'Austria'), ('az', 'Azerbaijan'), ('bs', 'Bahamas'),
-                ('bh', 'Bahrain'), ('bd', 'Bangladesh'), ('bb', 'Barbados'), ('by', 'Belarus'),
-                ('be', 'Belgium'), ('bz', 'Belize'), ('bj', 'Benin'), ('bt', 'Bhutan'),
-                ('bo', 'Bolivia'), ('ba', 'Bosnia and Herzegovina'), ('bw', 'Botswana'), ('br', 'Brazil'),
-                ('bn', 'Brunei'), ('bg', 'Bulgaria'), ('bf', 'Burkina Faso'), ('bi', 'Burundi'),
-                ('kh', 'Cambodia'), ('cm', 'Cameroon'), ('ca', 'Canada'), ('cv', 'Cape Verde'),
-                ('cf', 'Central African Republic'), ('td', 'Chad'), ('cl', 'Chile'), ('cn', 'China'),
-                ('co', 'Colombia'), ('km', 'Comoros'), ('cg', 'Congo'), ('cd', 'Congo, Democratic Republic'),
-                ('cr', 'Costa Rica'), ('hr', 'Croatia'), ('cu', 'Cuba'), ('cy', 'Cyprus'),
-                ('cz', 'Czech Republic'), ('dk', 'Denmark'), ('dj', 'Djibouti'), ('dm', 'Dominica'),
-                ('do', 'Dominican Republic'), ('ec', 'Ecuador'), ('eg', 'Egypt'), ('sv', 'El Salvador'),
-                ('gq', 'Equatorial Guinea'), ('er', 'Eritrea'), ('ee', 'Estonia'), ('et', 'Ethiopia'),
-                ('fj', 'Fiji'), ('fi', 'Finland'), ('fr', 'France'), ('ga', 'Gabon'),
-                ('gm', 'Gambia'), ('ge', 'Georgia'), ('de', 'Germany'), ('gh', 'Ghana'),
-                ('gr', 'Greece'), ('gd', 'Grenada'), ('gt', 'Guatemala'), ('gn', 'Guinea'),
-                ('gw', 'Guinea-Bissau'), ('gy', 'Guyana'), ('ht', 'Haiti'), ('hn', 'Honduras'),
-                ('hu', 'Hungary'), ('is', 'Iceland'), ('in', 'India'), ('id', 'Indonesia'),
-                ('ir', 'Iran'), ('iq', 'Iraq'), ('ie', 'Ireland'), ('il', 'Israel'),
-                ('it', 'Italy'), ('jm', 'Jamaica'), ('jp', 'Japan'), ('jo', 'Jordan'),
-                ('kz', 'Kazakhstan'), ('ke', 'Kenya'), ('ki', 'Kiribati'), ('kp', 'North Korea'),
-                ('kr', 'South Korea'), ('kw', 'Kuwait'), ('kg', 'Kyrgyzstan'), ('la', 'Laos'),
-                ('lv', 'Latvia'), ('lb', 'Lebanon'), ('ls', 'Lesotho'), ('lr', 'Liberia'),
-                ('ly', 'Libya'), ('li', 'Liechtenstein'), ('lt', 'Lithuania'), ('lu', 'Luxembourg'),
-                ('mg', 'Madagascar'), ('mw', 'Malawi'), ('my', 'Malaysia'), ('mv', 'Maldives'),
-                ('ml', 'Mali'), ('mt', 'Malta'), ('mh', 'Marshall Islands'), ('mr', 'Mauritania'),
-                ('mu', 'Mauritius'), ('mx', 'Mexico'), ('fm', 'Micronesia'), ('md', 'Moldova'),
-                ('mc', 'Monaco'), ('mn', 'Mongolia'), ('me', 'Montenegro'), ('ma', 'Morocco'),
-                ('mz', 'Mozambique'), ('mm', 'Myanmar'), ('na', 'Namibia'), ('nr', 'Nauru'),
-                ('np', 'Nepal'), ('nl', 'Netherlands'), ('nz', 'New Zealand'), ('ni', 'Nicaragua'),
-                ('ne', 'Niger'), ('ng', 'Nigeria'), ('no', 'Norway'), ('om', 'Oman'),
-                ('pk', 'Pakistan'), ('pw', 'Palau'), ('pa', 'Panama'), ('pg', 'Papua New Guinea'),
-                ('py', 'Paraguay'), ('pe', 'Peru'), ('ph', 'Philippines'), ('pl', 'Poland'),
-                ('pt', 'Portugal'), ('qa', 'Qatar'), ('ro', 'Romania'), ('ru', 'Russia'),
-                ('rw', 'Rwanda'), ('kn', 'Saint Kitts and Nevis'), ('lc', 'Saint Lucia'),
-                ('vc', 'Saint Vincent and the Grenadines'), ('ws', 'Samoa'), ('sm', 'San Marino'),
-                ('st', 'Sao Tome and Principe'), ('sa', 'Saudi Arabia'), ('sn', 'Senegal'),
-                ('rs', 'Serbia'), ('sc', 'Seychelles'), ('sl', 'Sierra Leone'), ('sg', 'Singapore'),
-                ('sk', 'Slovakia'), ('si', 'Slovenia'), ('sb', 'Solomon Islands'), ('so', 'Somalia'),
-                ('za', 'South Africa'), ('ss', 'South Sudan'), ('es', 'Spain'), ('lk', 'Sri Lanka'),
-                ('sd', 'Sudan'), ('sr', 'Suriname'), ('se', 'Sweden'), ('ch', 'Switzerland'),
-                ('sy', 'Syria'), ('tw', 'Taiwan'), ('tj', 'Tajikistan'), ('tz', 'Tanzania'),
-                ('th', 'Thailand'), ('tl', 'Timor-Leste'), ('tg', 'Togo'), ('to', 'Tonga'),
-                ('tt', 'Trinidad and Tobago'), ('tn', 'Tunisia'), ('tr', 'Turkey'), ('tm', 'Turkmenistan'),
-                ('tv', 'Tuvalu'), ('ug', 'Uganda'), ('ua', 'Ukraine'), ('ae', 'United Arab Emirates'),
-                ('gb', 'United Kingdom'), ('us', 'United States'), ('uy', 'Uruguay'), ('uz', 'Uzbekistan'),
-                ('vu', 'Vanuatu'), ('ve', 'Venezuela'), ('vn', 'Vietnam'), ('ye', 'Yemen'),
-                ('zm', 'Zambia'), ('zw', 'Zimbabwe')
-            ]
-        }
-
-        # Créer un dictionnaire pour les drapeaux
-        flag_dict = dict(zip(flags_df['Country code'].str.lower(), flags_df['Flag']))
-
-        # Mappage des budgets utilisateur aux budgets du dataset
-        budget_mapping = {
-            'economic': 'Budget',
-            'medium': 'Mid-range',
-            'comfort': 'Mid-range',
-            'luxury': 'Luxury'
-        }
-        target_budget = budget_mapping.get(travel_budget, 'Mid-range')
-
-        # Chemin vers les images des continents
-        continent_images_base = r"D:\Django_Projet\Socialite\public\assets\images\Continent"
-        continent_mapping = {
-            'africa': 'Africa',
-            'asia': 'Asia',
-            'europe': 'Europe',
-            'north_america': 'North America',
-            'south_america': 'South America',
-            'oceania': 'Oceania',
-            'antarctica': 'Antarctica'
-        }
-
-        def get_random_continent_image(region):
-            continent_folder = continent_mapping.get(region.lower(), 'Africa')
-            continent_path = os.path.join(continent_images_base, continent_folder)
-            default_image = "/static/images/group/group-cover-1.webp"
-            if os.path.exists(continent_path):
-                images = [f for f in os.listdir(continent_path)
-                         if f.lower().endswith(('.jpg', '.jpeg', '.png')) and os.path.isfile(os.path.join(continent_path, f))]
-                if images:
-                    chosen_image = random.choice(images)
-                    image_url = f"/assets/images/Continent/{continent_folder}/{chosen_image}"
-                    logger.debug(f"Selected image: {os.path.join(continent_path, chosen_image)}, URL: {image_url}")
-                    return image_url
-                else:
-                    logger.warning(f"No images found in directory: {continent_path}")
-            else:
-                logger.warning(f"Directory not found: {continent_path}")
-            return default_image
-
-        def get_monthly_temps(temp_data):
-            if pd.isna(temp_data) or not temp_data:
-                logger.debug("Temp_data is None or empty")
-                return {}
-            try:
-                if isinstance(temp_data, dict):
-                    temp_dict = temp_data
-                else:
-                    cleaned = temp_data.strip()
-                    if cleaned.startswith('"') and cleaned.endswith('"'):
-                        cleaned = cleaned[1:-1]
-                    cleaned = cleaned.replace('""', '"').replace("'", '"')
-                    if cleaned.startswith('1:{'):
-                        cleaned = '{' + cleaned + '}'
-                    logger.debug(f"Cleaned temp_data: {cleaned}")
-                    temp_dict = json.loads(cleaned)
-                
-                # Vérifier et formater les données de température
-                formatted_temps = {}
-                for month in range(1, 13):
-                    month_str = str(month)
-                    if month_str in temp_dict and 'avg' in temp_dict[month_str]:
-                        try:
-                            formatted_temps[month_str] = {'avg': round(float(temp_dict[month_str]['avg']), 1)}
-                        except (ValueError, TypeError):
-                            formatted_temps[month_str] = {'avg': None}
-                    else:
-                        formatted_temps[month_str] = {'avg': None}
-                return formatted_temps
-            except (json.JSONDecodeError, KeyError, TypeError) as e:
-                logger.error(f"Error parsing temperature data: {temp_data} → {str(e)}")
-                return {str(i): {'avg': None} for i in range(1, 13)}
-
-        def calculate_interest_score(place, user_interests, user_budget):
-            interest_mapping = {
-                'adventure': 'adventure',
-                'culture': 'culture',
-                'gastronomy': 'cuisine',
-                'nature': 'nature',
-                'sport': 'adventure',
-                'relaxation': 'wellness',
-                'work': 'urban'
-            }
-            interest_score = 0
-            for interest in user_interests:
-                mapped_field = interest_mapping.get(interest.lower(), interest.lower())
-                if mapped_field in place and pd.notna(place[mapped_field]):
-                    interest_score += place[mapped_field] * 10
-
-            budget_score = 0
-            place_budget = place['budget_level'].title()
-            target_budget_mapped = budget_mapping.get(user_budget, 'Mid-range')
-            budget_hierarchy = {
-                'Budget': 1,
-                'Mid-range': 2,
-                'Luxury': 3
-            }
-            user_budget_level = budget_hierarchy.get(target_budget_mapped, 2)
-            place_budget_level = budget_hierarchy.get(place_budget, 2)
-
-            if user_budget in ['comfort', 'luxury'] and place_budget_level <= user_budget_level:
-                if place_budget == target_budget_mapped:
-                    budget_score = 30
-                else:
-                    budget_score = 15
-            elif user_budget in ['economic', 'medium'] and place_budget == target_budget_mapped:
-                budget_score = 30
-            else:
-                budget_score = 0
-
-            total_score = interest_score + budget_score
-            return total_score
-
-        def is_place_visible(place, user_budget):
-            target_budget_mapped = budget_mapping.get(user_budget, 'Mid-range')
-            budget_hierarchy = {
-                'Budget': 1,
-                'Mid-range': 2,
-                'Luxury': 3
+        countries = catalog.countries
+
+        # Dictionnaire des drapeaux
+        flag_dict = catalog.flag_by_code
+
+        # Visibilité selon le budget (masque précalculé par niveau) et scores
+        # d'intérêt de toutes les villes en une passe vectorisée
+        visible, budget_scores = catalog.budget_tier(travel_budget)
+        scores = catalog.interest_scores(user_interests) + budget_scores
+
+        # Destinations passées exclues ; favoris testés par ensemble haché
+        candidates = visible & ~catalog.destinations_mask(passed_destinations)
+        favorite_keys = {(dest['city'].lower(), dest['country'].lower()) for dest in favorite_destinations}
+        default_flag = '/static/images/avatars/avatar-default.webp'
+
+        # Images des continents (manifeste en mémoire, choix stable par ville)
+        image_manifest = get_image_manifest()
+
+        def get_country_flag_url(name):
+            return flag_dict.get(country_code(name), default_flag)
+
+        def build_place_card(position, flag, is_favorite=None):
+            # Champs d'affichage précalculés au chargement du catalogue
+            record = catalog.records[position]
+            return {
+                'city': record.city,
+                'country': record.country,
+                'continent': record.region,
+                'description': record.description,
+                'flag': flag,
+                'continent_image': image_manifest.continent_image(record.region, f'{record.city}|{record.country}'),
+                'top_activities': record.top_activities,
+                'budget': record.budget,
+                'ideal_durations': record.ideal_durations,
+                'monthly_temps_json': record.monthly_temps_json,
+                'interest_score': scores[position],
+                'is_favorite': record.key in favorite_keys if is_favorite is None else is_favorite
             }
-            user_budget_level = budget_hierarchy.get(target_budget_mapped, 2)
-            place_budget_level = budget_hierarchy.get(place['budget_level'].title(), 2)
-            return (user_budget in ['comfort', 'luxury'] and place_budget_level <= user_budget_level) or \
-                   (user_budget in ['economic', 'medium'] and place['budget_level'].title() == target_budget_mapped)
 
         # Convertir les codes ISO en noms complets pour future_countries
-        future_country_names = [country_code_to_name.get(code.lower(), '') for code in future_countries]
+        future_country_names = [country_name(code) for code in future_countries]
         future_country_names = [name for name in future_country_names if name]  # Supprimer les entrées vides
-
-        # Fonction pour vérifier si une destination est passée
-        def is_passed_destination(city, country, passed_destinations):
-            return any(dest['city'].lower() == city.lower() and dest['country'].lower() == country.lower() for dest in passed_destinations)
+        home_country_name = country_name(nationality)
 
         # Section 1 : Explorez votre pays (basé sur la nationalité)
-        if nationality:
-            country_name = country_code_to_name.get(nationality.lower(), '')
-            if country_name:
-                country_places = cities_df[cities_df['country'].str.lower() == country_name.lower()]
-                for _, place in country_places.iterrows():
-                    if is_place_visible(place, travel_budget) and not is_passed_destination(place['city'], place['country'], passed_destinations):
-                        interest_score = calculate_interest_score(place, user_interests, travel_budget)
-                        activities = [
-                            ('Culture', place['culture']),
-                            ('Adventure', place['adventure']),
-                            ('Nature', place['nature']),
-                            ('Beaches', place['beaches']),
-                            ('Nightlife', place['nightlife']),
-                            ('Cuisine', place['cuisine']),
-                            ('Wellness', place['wellness']),
-                            ('Urban', place['urban']),
-                            ('Seclusion', place['seclusion'])
-                        ]
-                        top_activities = [(name.title(), score) for name, score in activities if score >= 4]
-                        monthly_temps_json = get_monthly_temps(place['avg_temp_monthly'])
-                        is_favorite = any(dest['city'].lower() == place['city'].lower() and dest['country'].lower() == place['country'].lower() for dest in favorite_destinations)
-                        home_country_places.append({
-                            'city': place['city'],
-                            'country': place['country'],
-                            'continent': place['region'],
-                            'description': place['short_description'],
-                            'flag': flag_dict.get(nationality.lower(), '/static/images/avatars/avatar-default.webp'),
-                            'continent_image': get_random_continent_image(place['region']),
-                            'top_activities': top_activities,
-                            'budget': place['budget_level'],
-                            'ideal_durations': eval(place['ideal_durations']) if isinstance(place['ideal_durations'], str) else place['ideal_durations'],
-                            'monthly_temps_json': json.dumps(monthly_temps_json),
-                            'interest_score': interest_score,
-                            'is_favorite': is_favorite
-                        })
+        if home_country_name:
+            flag = flag_dict.get(nationality.lower(), default_flag)
+            positions = np.flatnonzero(candidates & (catalog.country_keys == home_country_name.lower()))
+            home_country_places = [build_place_card(position, flag) for position in positions]
 
         # Section 2 : Destinations pour vos projets de voyage
-        for country_name in future_country_names:
-            country_places = cities_df[cities_df['country'].str.lower() == country_name.lower()]
-            for _, place in country_places.iterrows():
-                if is_place_visible(place, travel_budget) and not is_passed_destination(place['city'], place['country'], passed_destinations):
-                    interest_score = calculate_interest_score(place, user_interests, travel_budget)
-                    activities = [
-                        ('Culture', place['culture']),
-                        ('Adventure', place['adventure']),
-                        ('Nature', place['nature']),
-                        ('Beaches', place['beaches']),
-                        ('Nightlife', place['nightlife']),
-                        ('Cuisine', place['cuisine']),
-                        ('Wellness', place['wellness']),
-                        ('Urban', place['urban']),
-                        ('Seclusion', place['seclusion'])
-                    ]
-                    top_activities = [(name.title(), score) for name, score in activities if score >= 4]
-                    monthly_temps_json = get_monthly_temps(place['avg_temp_monthly'])
-                    country_code = [k for k, v in country_code_to_name.items() if v.lower() == country_name.lower()]
-                    flag = flag_dict.get(country_code[0].lower() if country_code else '', '/static/images/avatars/avatar-default.webp')
-                    is_favorite = any(dest['city'].lower() == place['city'].lower() and dest['country'].lower() == place['country'].lower() for dest in favorite_destinations)
-                    future_places.append({
-                        'city': place['city'],
-                        'country': place['country'],
-                        'continent': place['region'],
-                        'description': place['short_description'],
-                        'flag': flag,
-                        'continent_image': get_random_continent_image(place['region']),
-                        'top_activities': top_activities,
-                        'budget': place['budget_level'],
-                        'ideal_durations': eval(place['ideal_durations']) if isinstance(place['ideal_durations'], str) else place['ideal_durations'],
-                        'monthly_temps_json': json.dumps(monthly_temps_json),
-                        'interest_score': interest_score,
-                        'is_favorite': is_favorite
-                    })
-
-        # Section 3 : Places You Might Like
+        for future_name in future_country_names:
+            flag = get_country_flag_url(future_name)
+            positions = np.flatnonzero(candidates & (catalog.country_keys == future_name.lower()))
+            future_places.extend(build_place_card(position, flag) for position in positions)
+
+        # Section 3 : Places You Might Like (mêmes continents, autres pays) : les 100
+        # destinations au profil d'activités le plus proche des favoris (à défaut, des
+        # destinations futures), classées par proximité géographique
         if future_country_names:
-            future_continents = cities_df[cities_df['country'].isin(future_country_names)]['region'].unique()
-            similar_places_df = cities_df[
-                (cities_df['region'].isin(future_continents)) &
-                (~cities_df['country'].isin(future_country_names + [country_code_to_name.get(nationality.lower(), '')]))
+            future_keys = [name.lower() for name in future_country_names]
+            in_future_countries = np.isin(catalog.country_keys, future_keys)
+            in_favorites = catalog.destinations_mask(favorite_destinations)
+            future_continents = np.unique(catalog.region_keys[in_future_countries])
+            similar = (
+                candidates
+                & np.isin(catalog.region_keys, future_continents)
+                & ~np.isin(catalog.country_keys, future_keys + [home_country_name.lower()])
+            )
+            taste = np.flatnonzero(in_favorites if in_favorites.any() else in_future_countries)
+            positions, similarities = catalog.similar_to_many(taste, k=100, mask=similar)
+            similarity_by_position = dict(zip(positions.tolist(), similarities.tolist()))
+
+            selected = np.zeros(len(catalog.records), dtype=bool)
+            selected[positions] = True
+            anchors = np.flatnonzero(in_future_countries | in_favorites)
+            positions, distances = catalog.nearest_to(anchors, k=len(similarity_by_position), mask=selected)
+            similar_places = [
+                {
+                    **build_place_card(position, get_country_flag_url(catalog.records[position].country)),
+                    'distance_km': round(distance),
+                    'similarity': round(similarity_by_position[position] * 100),
+                }
+                for position, distance in zip(positions.tolist(), distances.tolist())
             ]
-            similar_places_df = similar_places_df.head(100)
-            for _, place in similar_places_df.iterrows():
-                if is_place_visible(place, travel_budget) and not is_passed_destination(place['city'], place['country'], passed_destinations):
-                    interest_score = calculate_interest_score(place, user_interests, travel_budget)
-                    activities = [
-                        ('Culture', place['culture']),
-                        ('Adventure', place['adventure']),
-                        ('Nature', place['nature']),
-                        ('Beaches', place['beaches']),
-                        ('Nightlife', place['nightlife']),
-                        ('Cuisine', place['cuisine']),
-                        ('Wellness', place['wellness']),
-                        ('Urban', place['urban']),
-                        ('Seclusion', place['seclusion'])
-                    ]
-                    top_activities = [(name.title(), score) for name, score in activities if score >= 4]
-                    monthly_temps_json = get_monthly_temps(place['avg_temp_monthly'])
-                    country_code = [k for k, v in country_code_to_name.items() if v.lower() == place['country'].lower()]
-                    flag = flag_dict.get(country_code[0].lower() if country_code else '', '/static/images/avatars/avatar-default.webp')
-                    is_favorite = any(dest['city'].lower() == place['city'].lower() and dest['country'].lower() == place['country'].lower() for dest in favorite_destinations)
-                    similar_places.append({
-                        'city': place['city'],
-                        'country': place['country'],
-                        'continent': place['region'],
-                        'description': place['short_description'],
-                        'flag': flag,
-                        'continent_image': get_random_continent_image(place['region']),
-                        'top_activities': top_activities,
-                        'budget': place['budget_level'],
-                        'ideal_durations': eval(place['ideal_durations']) if isinstance(place['ideal_durations'], str) else place['ideal_durations'],
-                        'monthly_temps_json': json.dumps(monthly_temps_json),
-                        'interest_score': interest_score,
-                        'is_favorite': is_favorite
-                    })
 
         # Section 4 : Favorites
         for dest in favorite_destinations:
-            place = cities_df[(cities_df['city'].str.lower() == dest['city'].lower()) & (cities_df['country'].str.lower() == dest['country'].lower())]
-            if not place.empty:
-                place = place.iloc[0]
-                if is_place_visible(place, travel_budget):
-                    interest_score = calculate_interest_score(place, user_interests, travel_budget)
-                    activities = [
-                        ('Culture', place['culture']),
-                        ('Adventure', place['adventure']),
-                        ('Nature', place['nature']),
-                        ('Beaches', place['beaches']),
-                        ('Nightlife', place['nightlife']),
-                        ('Cuisine', place['cuisine']),
-                        ('Wellness', place['wellness']),
-                        ('Urban', place['urban']),
-                        ('Seclusion', place['seclusion'])
-                    ]
-                    top_activities = [(name.title(), score) for name, score in activities if score >= 4]
-                    monthly_temps_json = get_monthly_temps(place['avg_temp_monthly'])
-                    country_code = [k for k, v in country_code_to_name.items() if v.lower() == place['country'].lower()]
-                    flag = flag_dict.get(country_code[0].lower() if country_code else '', '/static/images/avatars/avatar-default.webp')
-                    favorite_places.append({
-                        'city': place['city'],
-                        'country': place['country'],
-                        'continent': place['region'],
-                        'description': place['short_description'],
-                        'flag': flag,
-                        'continent_image': get_random_continent_image(place['region']),
-                        'top_activities': top_activities,
-                        'budget': place['budget_level'],
-                        'ideal_durations': eval(place['ideal_durations']) if isinstance(place['ideal_durations'], str) else place['ideal_durations'],
-                        'monthly_temps_json': json.dumps(monthly_temps_json),
-                        'interest_score': interest_score,
-                        'is_favorite': True
-                    })
+            position = catalog.city_position(dest['city'], dest['country'])
+            if position is not None and visible[position]:
+                flag = get_country_flag_url(catalog.records[position].country)
+                favorite_places.append(build_place_card(position, flag, is_favorite=True))
 
         # Trier les destinations par score d'intérêt
         home_country_places.sort(key=lambda x: x['interest_score'], reverse=True)
         future_places.sort(key=lambda x: x['interest_score'], reverse=True)
-        similar_places.sort(key=lambda x: x['interest_score'], reverse=True)
         favorite_places.sort(key=lambda x: x['interest_score'], reverse=True)
 
     # Contexte pour le template
@@ -1288,7 +854,7 @@ def place(request):
         'similar_places': similar_places,
         'favorite_places': favorite_places,
         'countries': countries,
-        'user_nationality': country_code_to_name.get(nationality.lower(), '') if user_profile else '',
+        'user_nationality': country_name(nationality) if user_profile else '',
         'future_countries': future_country_names if user_profile else [],
     }
     return render(request, 'place.html', context)
@@ -1306,19 +872,15 @@ def add_favorite(request):
     if not city or not country:
         return JsonResponse({'success': False, 'message': 'Ville et pays requis'}, status=400)
 
-    # Vérifier si la destination existe dans le dataset
-    cities_df = pd.read_csv(r'D:\Django_Projet\Socialite\public\Cities.csv')
-    cities_df['city'] = cities_df['city'].str.strip().str.title()
-    cities_df['country'] = cities_df['country'].str.strip().str.title()
-    place = cities_df[(cities_df['city'].str.lower() == city.lower()) & (cities_df['country'].str.lower() == country.lower())]
-
-    if place.empty:
+    # Vérifier si la destination existe dans le catalogue (recherche hachée (ville, pays))
+    record = get_destination_catalog().get_city(city, country)
+    if record is None:
         return JsonResponse({'success': False, 'message': 'Destination introuvable'}, status=404)
 
     # Ajouter au profil utilisateur
     db.profiles.update_one(
         {'user_id': user.id},
-        {'$addToSet': {'favorite_destinations': {'city': city.title(), 'country': country.title()}}},
+        {'$addToSet': {'favorite_destinations': {'city': record.city, 'country': record.country}}},
         upsert=True
     )
 
@@ -1361,25 +923,196 @@ def pass_destination(request):
     if not city or not country:
         return JsonResponse({'success': False, 'message': 'Ville et pays requis'}, status=400)
 
-    # Vérifier si la destination existe dans le dataset
-    cities_df = pd.read_csv(r'D:\Django_Projet\Socialite\public\Cities.csv')
-    cities_df['city'] = cities_df['city'].str.strip().str.title()
-    cities_df['country'] = cities_df['country'].str.strip().str.title()
-    place = cities_df[(cities_df['city'].str.lower() == city.lower()) & (cities_df['country'].str.lower() == country.lower())]
-
-    if place.empty:
+    # Vérifier si la destination existe dans le catalogue (recherche hachée (ville, pays))
+    record = get_destination_catalog().get_city(city, country)
+    if record is None:
         return JsonResponse({'success': False, 'message': 'Destination introuvable'}, status=404)
 
     # Ajouter à passed_destinations
     db.profiles.update_one(
         {'user_id': user.id},
-        {'$addToSet': {'passed_destinations': {'city': city.title(), 'country': country.title()}}},
+        {'$addToSet': {'passed_destinations': {'city': record.city, 'country': record.country}}},
         upsert=True
     )
 
     return JsonResponse({'success': True, 'message': 'Destination hider'})
 
 
+@csrf_exempt
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def nearby_destinations(request):
+    """
+    Destinations les plus proches (index géographique du catalogue).
+
+    Paramètres GET (une référence au choix) :
+        city + country: autour d'une destination du catalogue
+        lat + lon: autour d'un point
+        near=favorites: autour des destinations favorites de l'utilisateur
+    Options : k (défaut 10, max 50), radius_km (rayon maximum, max 2000).
+    """
+    catalog = get_destination_catalog()
+    city = request.GET.get('city', '').strip()
+    country = request.GET.get('country', '').strip()
+
+    try:
+        k = min(max(int(request.GET.get('k', 10)), 1), 50)
+        radius_km = request.GET.get('radius_km')
+        radius_km = min(max(float(radius_km), 0.0), 2000.0) if radius_km else None
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Paramètres k ou radius_km invalides'}, status=400)
+
+    if request.GET.get('near') == 'favorites':
+        profile = get_db().profiles.find_one({'user_id': request.user.id}) or {}
+        anchors = np.flatnonzero(catalog.destinations_mask(profile.get('favorite_destinations', [])))
+    elif city and country:
+        position = catalog.city_position(city, country)
+        if position is None:
+            return JsonResponse({'success': False, 'message': 'Destination introuvable'}, status=404)
+        anchors = np.array([position])
+    else:
+        try:
+            latitude, longitude = float(request.GET['lat']), float(request.GET['lon'])
+        except (KeyError, ValueError):
+            return JsonResponse({'success': False, 'message': 'Ville et pays, lat et lon, ou near=favorites requis'}, status=400)
+        anchors = None
+
+    if anchors is None:
+        positions, distances = catalog.nearest(latitude, longitude, k)
+        if radius_km is not None:
+            within = distances <= radius_km
+            positions, distances = positions[within], distances[within]
+    else:
+        # Les destinations de référence ne sont pas renvoyées
+        mask = np.ones(len(catalog.records), dtype=bool)
+        mask[anchors] = False
+        if radius_km is not None:
+            positions, distances = catalog.within_radius(anchors, radius_km, mask)
+            positions, distances = positions[:k], distances[:k]
+        else:
+            positions, distances = catalog.nearest_to(anchors, k, mask)
+
+    destinations = []
+    for position, distance in zip(positions.tolist(), distances.tolist()):
+        record = catalog.records[position]
+        destinations.append({
+            'city': record.city,
+            'country': record.country,
+            'continent': record.region,
+            'latitude': float(catalog.latitudes[position]),
+            'longitude': float(catalog.longitudes[position]),
+            'distance_km': round(distance, 1),
+        })
+    return JsonResponse({'success': True, 'destinations': destinations})
+
+
+@csrf_exempt
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def similar_destinations(request):
+    """
+    Destinations au profil d'activités le plus proche (similarité cosinus).
+
+    Paramètres GET (une référence au choix) :
+        city + country: "plus comme cette destination"
+        favorites=1: "plus comme mes favoris"
+    Options : k (défaut 10, max 50), continent (région du dataset, ex. 'Europe').
+    """
+    catalog = get_destination_catalog()
+    city = request.GET.get('city', '').strip()
+    country = request.GET.get('country', '').strip()
+
+    try:
+        k = min(max(int(request.GET.get('k', 10)), 1), 50)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Paramètre k invalide'}, status=400)
+
+    continent = request.GET.get('continent', '').strip()
+    mask = catalog.region_keys == continent.title() if continent else None
+
+    if request.GET.get('favorites'):
+        profile = get_db().profiles.find_one({'user_id': request.user.id}) or {}
+        favorites = np.flatnonzero(catalog.destinations_mask(profile.get('favorite_destinations', [])))
+        positions, similarities = catalog.similar_to_many(favorites, k, mask)
+    elif city and country:
+        position = catalog.city_position(city, country)
+        if position is None:
+            return JsonResponse({'success': False, 'message': 'Destination introuvable'}, status=404)
+        positions, similarities = catalog.similar_to(position, k, mask)
+    else:
+        return JsonResponse({'success': False, 'message': 'Ville et pays, ou favorites=1 requis'}, status=400)
+
+    destinations = []
+    for position, similarity in zip(positions.tolist(), similarities.tolist()):
+        record = catalog.records[position]
+        destinations.append({
+            'city': record.city,
+            'country': record.country,
+            'continent': record.region,
+            'top_activities': [activity for activity, _ in record.top_activities],
+            'similarity': round(similarity, 3),
+        })
+    return JsonResponse({'success': True, 'destinations': destinations})
+
+
+@csrf_exempt
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def climate_destinations(request):
+    """
+    Destinations selon la température moyenne d'un mois (index climatique).
+
+    Paramètres GET : month (1-12, requis), min_temp, max_temp (°C, inclus),
+    budget (budget de profil maximum : economic, medium, comfort, luxury).
+    """
+    try:
+        month = int(request.GET.get('month', ''))
+        min_temp = request.GET.get('min_temp')
+        max_temp = request.GET.get('max_temp')
+        min_temp = float(min_temp) if min_temp else None
+        max_temp = float(max_temp) if max_temp else None
+        if not 1 <= month <= 12:
+            raise ValueError(month)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Mois ou températures invalides'}, status=400)
+
+    catalog = get_destination_catalog()
+    positions = catalog.climate_query(month, min_temp, max_temp, request.GET.get('budget', '').lower() or None)
+
+    destinations = []
+    for position in positions.tolist():
+        record = catalog.records[position]
+        destinations.append({
+            'city': record.city,
+            'country': record.country,
+            'continent': record.region,
+            'budget': record.budget,
+            'temperature': float(catalog.temps[position, month - 1]),
+        })
+    return JsonResponse({'success': True, 'count': len(destinations), 'destinations': destinations})
+
+
+@csrf_exempt
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def destination_autocomplete(request):
+    """
+    Autocomplétion des villes et pays du catalogue (préfixe, puis fautes de frappe).
+
+    Paramètres GET : q (texte saisi), type ('city' ou 'country', optionnel),
+    limit (défaut 8, max 20).
+    """
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('type') if request.GET.get('type') in ('city', 'country') else None
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+
+    suggestions = get_destination_search_index().search(query, limit=limit, kind=kind) if query else []
+    return JsonResponse({'success': True, 'suggestions': suggestions})
+
+
 
 
 @login_required(login_url='/login/')
@@ -1405,167 +1138,51 @@ def work(request):
     # Initialiser les listes pour les recommandations
     recommended_places = []
     other_places = []
-
-    # Dictionnaire de mappage des codes ISO aux noms de pays
-    country_code_to_name = {
-        'af': 'Afghanistan', 'al': 'Albania', 'dz': 'Algeria', 'ad': 'Andorra',
-        'ao': 'Angola', 'ag': 'Antigua and Barbuda', 'ar': 'Argentina', 'am': 'Armenia',
-        'au': 'Australia', 'at': 'Austria', 'az': 'Azerbaijan', 'bs': 'Bahamas',
-        'bh': 'Bahrain', 'bd': 'Bangladesh', 'bb': 'Barbados', 'by': 'Belarus',
-        'be': 'Belgium', 'bz': 'Belize', 'bj': 'Benin', 'bt': 'Bhutan',
-        'bo': 'Bolivia', 'ba': 'Bosnia and Herzegovina', 'bw': 'Botswana', 'br': 'Brazil',
-        'bn': 'Brunei', 'bg': 'Bulgaria', 'bf': 'Burkina Faso', 'bi': 'Burundi',
-        'kh': 'Cambodia', 'cm': 'Cameroon', 'ca': 'Canada', 'cv': 'Cape Verde',
-        'cf': 'Central African Republic', 'td': 'Chad', 'cl': 'Chile', 'cn': 'China',
-        'co': 'Colombia', 'km': 'Comoros', 'cg': 'Congo', 'cd': 'Congo, Democratic Republic',
-        'cr': 'Costa Rica', 'hr': 'Croatia', 'cu': 'Cuba', 'cy': 'Cyprus',
-        'cz': 'Czech Republic', 'dk': 'Denmark', 'dj': 'Djibouti', 'dm': 'Dominica',
-        'do': 'Dominican Republic', 'ec': 'Ecuador', 'eg': 'Egypt', 'sv': 'El Salvador',
-        'gq': 'Equatorial Guinea', 'er': 'Eritrea', 'ee': 'Estonia', 'et': 'Ethiopia',
-        'fj': 'Fiji', 'fi': 'Finland', 'fr': 'France', 'ga': 'Gabon',
-        'gm': 'Gambia', 'ge': 'Georgia', 'de': 'Germany', 'gh': 'Ghana',
-        'gr': 'Greece', 'gd': 'Grenada', 'gt': 'Guatemala', 'gn': 'Guinea',
-        'gw': 'Guinea-Bissau', 'gy': 'Guyana', 'ht': 'Haiti', 'hn': 'Honduras',
-        'hu': 'Hungary', 'is': 'Iceland', 'in': 'India', 'id': 'Indonesia',
-        'ir': 'Iran', 'iq': 'Iraq', 'ie': 'Ireland', 'il': 'Israel',
-        'it': 'Italy', 'jm': 'Jamaica', 'jp': 'Japan', 'jo': 'Jordan',
-        'kz': 'Kazakhstan', 'ke': 'Kenya', 'ki': 'Kiribati', 'kp': 'North Korea',
-        'kr': 'South Korea', 'kw': 'Kuwait', 'kg': 'Kyrgyzstan', 'la': 'Laos',
-        'lv': 'Latvia', 'lb': 'Lebanon', 'ls': 'Lesotho', 'lr': 'Liberia',
-        'ly': 'Libya', 'li': 'Liechtenstein', 'lt': 'Lithuania', 'lu': 'Luxembourg',
-        'mg': 'Madagascar', 'mw': 'Malawi', 'my': 'Malaysia', 'mv': 'Maldives',
-        'ml': 'Mali', 'mt': 'Malta', 'mh': 'Marshall Islands', 'mr': 'Mauritania',
-        'mu': 'Mauritius', 'mx': 'Mexico', 'fm': 'Micronesia', 'md': 'Moldova',
-        'mc': 'Monaco', 'mn': 'Mongolia', 'me': 'Montenegro', 'ma': 'Morocco',
-        'mz': 'Mozambique', 'mm': 'Myanmar', 'na': 'Namibia', 'nr': 'Nauru',
-        'np': 'Nepal', 'nl': 'Netherlands', 'nz': 'New Zealand', 'ni': 'Nicaragua',
-        'ne': 'Niger', 'ng': 'Nigeria', 'no': 'Norway', 'om': 'Oman',
-        'pk': 'Pakistan', 'pw': 'Palau', 'pa': 'Panama', 'pg': 'Papua New Guinea',
-        'py': 'Paraguay', 'pe': 'Peru', 'ph': 'Philippines', 'pl': 'Poland',
-        'pt': 'Portugal', 'qa': 'Qatar', 'ro': 'Romania', 'ru': 'Russia',
-        'rw': 'Rwanda', 'kn': 'Saint Kitts and Nevis', 'lc': 'Saint Lucia',
-        'vc': 'Saint Vincent and the Grenadines', 'ws': 'Samoa', 'sm': 'San Marino',
-        'st': 'Sao Tome and Principe', 'sa': 'Saudi Arabia', 'sn': 'Senegal',
-        'rs': 'Serbia', 'sc': 'Seychelles', 'sl': 'Sierra Leone', 'sg': 'Singapore',
-        'sk': 'Slovakia', 'si': 'Slovenia', 'sb': 'Solomon Islands', 'so': 'Somalia',
-        'za': 'South Africa', 'ss': 'South Sudan', 'es': 'Spain', 'lk': 'Sri Lanka',
-        'sd': 'Sudan', 'sr': 'Suriname', 'se': 'Sweden', 'ch': 'Switzerland',
-        'sy': 'Syria', 'tw': 'Taiwan', 'tj': 'Tajikistan', 'tz': 'Tanzania',
-        'th': 'Thailand', 'tl': 'Timor-Leste', 'tg': 'Togo', 'to': 'Tonga',
-        'tt': 'Trinidad and Tobago', 'tn': 'Tunisia', 'tr': 'Turkey', 'tm': 'Turkmenistan',
-        'tv': 'Tuvalu', 'ug': 'Uganda', 'ua': 'Ukraine', 'ae': 'United Arab Emirates',
-        'gb': 'United Kingdom', 'us': 'United States', 'uy': 'Uruguay', 'uz': 'Uzbekistan',
-        'vu': 'Vanuatu', 've': 'Venezuela', 'vn': 'Vietnam', 'ye': 'Yemen',
-        'zm': 'Zambia', 'zw': 'Zimbabwe', 'gl': 'Greenland'
-    }
+    page_obj = None
+    nationality_name = ''
+    future_country_names = []
 
     if user_profile and 'work' in user_profile.get('interests', []):
         nationality = user_profile.get('nationality', '')
         future_countries = user_profile.get('future_countries', [])
         travel_budget = user_profile.get('travel_budget', '').lower()
 
-        # Charger le dataset workation.csv
-        workation_df = pd.read_csv(r"D:\Django_Projet\Socialite\public\workation.csv")
-        print(workation_df.columns.tolist())
-        # Normaliser les colonnes texte
-        workation_df['City'] = workation_df['City'].str.strip().str.title()
-        workation_df['Country'] = workation_df['Country'].str.strip().str.title()
+        # Dataset workation (chargé une fois par processus, scores en cache par budget)
+        catalog = get_destination_catalog()
+        order, scores = catalog.work_ranking(travel_budget)
 
         # Convertir les codes ISO en noms complets pour future_countries
-        future_country_names = [country_code_to_name.get(code.lower(), '') for code in future_countries]
+        future_country_names = [country_name(code) for code in future_countries]
         future_country_names = [name for name in future_country_names if name]
-        nationality_name = country_code_to_name.get(nationality.lower(), '')
-
-        # Chemin vers les images
-        work_images_base = r"D:\Django_Projet\Socialite\public\assets\work"
-        def get_random_work_image():
-            images = [f for f in os.listdir(work_images_base) if f.lower().endswith('.jpg')]
-            if images:
-                chosen_image = random.choice(images)
-                return f"/assets/work/{chosen_image}"
-            logger.warning(f"No images found in directory: {work_images_base}")
-            return "/static/images/events/img-1.webp"
-
-        # Mappage du budget
-        budget_mapping = {
-            'economic': 'Budget',
-            'medium': 'Mid-range',
-            'comfort': 'Mid-range',
-            'luxury': 'Luxury'
-        }
-        target_budget = budget_mapping.get(travel_budget, 'Mid-range')
-
-        def calculate_work_score(row, user_budget):
-            # Normaliser les valeurs pour le score
-            wifi_score = row['Remote connection: Average WiFi speed (Mbps per second)'] / 54.0 * 40  # Max WiFi speed dans le dataset est 54
-            coworking_score = row['Co-working spaces: Number of co-working spaces'] / 165.0 * 40  # Max coworking spaces est 165
-            coffee_cost = row['Caffeine: Average price of buying a coffee']
-            coffee_score = (2.0 - coffee_cost) / 2.0 * 20 if coffee_cost <= 2.0 else 0  # Max coffee price ~2.0
-
-            # Score de budget
-            budget_hierarchy = {'Budget': 1, 'Mid-range': 2, 'Luxury': 3}
-            user_budget_level = budget_hierarchy.get(target_budget, 2)
-            accommodation = row['Accommodation: Average price of 1 bedroom apartment per month']
-            if user_budget in ['comfort', 'luxury'] and accommodation <= 800:
-                budget_score = 30 if accommodation <= 400 else 15
-            elif user_budget in ['economic', 'medium'] and accommodation <= 400:
-                budget_score = 30
-            else:
-                budget_score = 0
+        nationality_name = country_name(nationality)
 
-            total_score = wifi_score + coworking_score + coffee_score + budget_score
-            return round(total_score, 1)
+        # Images workation (manifeste en mémoire, choix stable par ville)
+        image_manifest = get_image_manifest()
 
-        # Filtrer les destinations recommandées (pays futurs et nationalité)
-        recommended_df = workation_df[
-            workation_df['Country'].isin(future_country_names + [nationality_name])
-        ].copy()
-        recommended_df['work_score'] = recommended_df.apply(
-            lambda row: calculate_work_score(row, travel_budget), axis=1
-        )
-
-        for _, row in recommended_df.iterrows():
-            recommended_places.append({
-                'city': row['City'],
-                'country': row['Country'],
-                'wifi_speed': row['Remote connection: Average WiFi speed (Mbps per second)'],
-                'coworking_spaces': row['Co-working spaces: Number of co-working spaces'],
-                'coffee_price': row['Caffeine: Average price of buying a coffee'],
-                'accommodation_price': row['Accommodation: Average price of 1 bedroom apartment per month'],
-                'work_score': row['work_score'],
-                'image': get_random_work_image()
-            })
+        def build_work_card(position):
+            row = catalog.workation_rows[position]
+            return {
+                **row,
+                'work_score': scores[position],
+                'image': image_manifest.work_image(f"{row['city']}|{row['country']}")
+            }
 
-        # Autres destinations, triées par score
-        other_df = workation_df[
-            ~workation_df['Country'].isin(future_country_names + [nationality_name])
-        ].copy()
-        other_df['work_score'] = other_df.apply(
-            lambda row: calculate_work_score(row, travel_budget), axis=1
-        )
-        other_df = other_df.sort_values(by='work_score', ascending=False)
-
-        for _, row in other_df.iterrows():
-            other_places.append({
-                'city': row['City'],
-                'country': row['Country'],
-                'wifi_speed': row['Remote connection: Average WiFi speed (Mbps per second)'],
-                'coworking_spaces': row['Co-working spaces: Number of co-working spaces'],
-                'coffee_price': row['Caffeine: Average price of buying a coffee'],
-                'accommodation_price': row['Accommodation: Average price of 1 bedroom apartment per month'],
-                'work_score': row['work_score'],
-                'image': get_random_work_image()
-            })
+        # Séparer le classement (déjà trié par score) : pays futurs et nationalité / autres
+        recommended = catalog.workation_mask(future_country_names + [nationality_name])[order]
+        recommended_places = [build_work_card(position) for position in order[recommended]]
 
-        # Trier les recommandations par score
-        recommended_places.sort(key=lambda x: x['work_score'], reverse=True)
+        # Autres destinations : seule la page demandée est construite
+        paginator = Paginator(order[~recommended].tolist(), getattr(settings, 'WORK_OTHER_PAGE_SIZE', 12))
+        page_obj = paginator.get_page(request.GET.get('page'))
+        other_places = [build_work_card(position) for position in page_obj]
 
     # Contexte pour le template
     context = {
         'recommended_places': recommended_places,
         'other_places': other_places,
-        'user_nationality': nationality_name if user_profile else '',
-        'future_countries': future_country_names if user_profile else [],
+        'page_obj': page_obj,
+        'user_nationality': nationality_name,
+        'future_countries': future_country_names,
     }
 
     return render(request, 'work.html', context)
@@ -1589,72 +1206,32 @@ def pages(request):
             'may_like': []
         })
 
-    # Initialiser les listes
-    travel_duo = []
-    might_know = []
-    may_like = []
-    
-    # Récupérer tous les profils sauf celui de l'utilisateur actuel
-    profiles = list(db.profiles.find({'user_id': {'$ne': user.id}}))
-    
-    # Récupérer les données de l'utilisateur actuel
-    user_travel_types = set(user_profile.get('travel_type', []))
-    user_future_countries = set(user_profile.get('future_countries', []))
-    user_travel_budget = user_profile.get('travel_budget', '')
-    user_visited_countries = set(user_profile.get('visited_countries', []))
-    user_nationality = user_profile.get('nationality', '')
-    user_following = user_profile.get('following', [])
+    # Listes précalculées (user_recommendations), calculées à la demande si absentes
+    recommendations = get_recommendations(db, user_profile, PAGES_SECTIONS)
+    cards = load_profile_cards(db, {
+        entry['user_id'] for entries in recommendations.values() for entry in entries
+    })
     
-    for profile in profiles:
-        if profile['user_id'] not in user_following:  # Exclure les utilisateurs suivis
-            try:
-                user_profile_obj = UserProfile.objects.get(user_id=profile['user_id'])
-                slug = user_profile_obj.slug
-            except UserProfile.DoesNotExist:
-                slug = str(profile['user_id'])
-                
-            profile_data = {
-                'user_id': profile['user_id'],
-                'first_name': profile['first_name'],
-                'last_name': profile['last_name'],
-                'profile_image': profile.get('profile_image', '/static/images/avatars/avatar-default.webp'),
-                'follower_count': format_follower_count(profile.get('follower_count', 0)),
-                'is_following': False,  # Déjà filtré
-                'slug': slug
-            }
-            
-            # Section 1: Find Your Travel Duo
-            common_travel_types = user_travel_types.intersection(set(profile.get('travel_type', [])))
-            common_future_countries = user_future_countries.intersection(set(profile.get('future_countries', [])))
-            same_budget = user_travel_budget == profile.get('travel_budget', '')
-            
-            if common_travel_types and common_future_countries and same_budget:
-                profile_data['common_future_countries'] = [get_country_flag(code) for code in common_future_countries]
-                travel_duo.append(profile_data)
-            
-            # Section 2: People You Might Know
-            common_visited_countries = user_visited_countries.intersection(set(profile.get('visited_countries', [])))
-            same_nationality = user_nationality == profile.get('nationality', '')
-            
-            if common_visited_countries or same_nationality:
-                profile_data['common_visited_countries'] = [get_country_flag(code) for code in common_visited_countries]
-                profile_data['nationality_match'] = same_nationality
-                might_know.append(profile_data)
-            
-            # Section 3: People You May Like
-            score = calculate_similarity(user_profile, profile)
-            profile_data['score'] = score
-            may_like.append(profile_data)
+    # Section 1: Find Your Travel Duo
+    travel_duo = [
+        {**cards[entry['user_id']],
+         'common_future_countries': [get_country_flag(code) for code in entry['common_future_countries']]}
+        for entry in recommendations['travel_duo'] if entry['user_id'] in cards
+    ]
     
-    # Trier les listes
-    travel_duo.sort(key=lambda x: len(x['common_future_countries']), reverse=True)
-    might_know.sort(key=lambda x: (len(x['common_visited_countries']), x['nationality_match']), reverse=True)
-    may_like.sort(key=lambda x: x['score'], reverse=True)
+    # Section 2: People You Might Know
+    might_know = [
+        {**cards[entry['user_id']],
+         'common_visited_countries': [get_country_flag(code) for code in entry['common_visited_countries']],
+         'nationality_match': entry['nationality_match']}
+        for entry in recommendations['might_know'] if entry['user_id'] in cards
+    ]
     
-    # Limiter les résultats (par exemple, 100 par section)
-    travel_duo = travel_duo[:100]
-    might_know = might_know[:100]
-    may_like = may_like[:100]
+    # Section 3: People You May Like
+    may_like = [
+        {**cards[entry['user_id']], 'score': entry['score']}
+        for entry in recommendations['may_like'] if entry['user_id'] in cards
+    ]
     
     return render(request, 'pages.html', {
         'travel_duo': travel_duo,
@@ -1762,20 +1339,11 @@ def profile_view(request, slug=None):
     user_posts = Post.objects.filter(user=user).select_related(
         'user', 'user__profile'
     ).prefetch_related(
-        'comments', 'comments__user', 'comments__user__profile',
-        'comments__reactions', 'reactions', 'post_shares'
+        'comments', 'comments__user', 'comments__user__profile'
     ).order_by('-created_at')
     
     # Pour chaque post, ajouter les infos de réaction de l'utilisateur connecté
-    if request.user.is_authenticated:
-        for post in user_posts:
-            post.user_reaction = post.reactions.filter(user=request.user).first()
-            post.total_reactions = post.reactions.count()
-            post.total_comments = post.comments.filter(parent=None).count()
-            
-            # Pour chaque commentaire, vérifier si l'utilisateur a réagi
-            for comment in post.comments.all():
-                comment.user_reaction = comment.reactions.filter(user=request.user).first()
+    user_posts = attach_viewer_state(user_posts, request.user)
     
     # Avis stats for profile badge
     avis_qs = Avis.objects.filter(reviewee=user)
@@ -1809,7 +1377,7 @@ def profile_view(request, slug=None):
         'user': user,
         'profile': user.profile,
         'user_posts': user_posts,
-        'posts_count': user_posts.count(),
+        'posts_count': len(user_posts),
         'avg_review_note': round(stats['avg_note'] or 0, 2),
         'reviews_count': stats['reviews_count'] or 0,
         # 🔥 AJOUT: Données Follow/Unfollow
@@ -1831,68 +1399,46 @@ def followers_list(request, slug):
     followers = []
     if user_profile and 'followers' in user_profile:
         follower_ids = user_profile['followers']
+        following_ids = set(user_profile.get('following', []))
+        
+        # Comptes Django (une requête, annuaire en cache) et profils MongoDB (une requête)
+        directory = resolve_users(follower_ids, create_missing_profiles=True)
+        mongo_profiles = {
+            mongo_profile['user_id']: mongo_profile
+            for mongo_profile in db.profiles.find({'user_id': {'$in': follower_ids}})
+        }
         
         for follower_id in follower_ids:
-            try:
-                # Try to get user from Django first
-                follower_user = User.objects.get(id=follower_id)
-                follower_profile, created = UserProfile.objects.get_or_create(
-                    user=follower_user,
-                    defaults={
-                        'slug': f"user-{follower_user.id}",
-                        'bio': f"Profile of {follower_user.first_name} {follower_user.last_name}" if follower_user.first_name else f"Profile of {follower_user.username}"
-                    }
-                )
-                
-                # Clean the slug if it contains invalid characters
-                if created or not follower_profile.slug or any(char in follower_profile.slug for char in ['@', '.', '+']):
-                    follower_profile.slug = f"user-{follower_user.id}"
-                    follower_profile.save()
-                
-                # Get MongoDB data
-                follower_mongo = db.profiles.find_one({'user_id': follower_id})
-                
+            follower_mongo = mongo_profiles.get(follower_id)
+            entry = directory.get(follower_id)
+            if entry:
                 followers.append({
-                    'user': follower_user,
-                    'profile': follower_profile,
+                    'user': entry,
+                    'profile': entry,
                     'follower_count': follower_mongo.get('follower_count', 0) if follower_mongo else 0,
-                    'is_following': follower_id in user_profile.get('following', []) if user_profile else False,
+                    'is_following': follower_id in following_ids,
                     'from_django': True,
                     'user_id': follower_id,
                     'has_valid_slug': True
                 })
-                
-            except User.DoesNotExist:
+            else:
                 # User doesn't exist in Django, use MongoDB data only
-                follower_mongo = db.profiles.find_one({'user_id': follower_id})
-                if follower_mongo:
-                    followers.append({
-                        'user': None,  # No Django user
-                        'profile': None,
-                        'mongo_data': follower_mongo,
-                        'follower_count': follower_mongo.get('follower_count', 0),
-                        'is_following': follower_id in user_profile.get('following', []) if user_profile else False,
-                        'from_django': False,
-                        'user_id': follower_id,
-                        'has_valid_slug': False
-                    })
-                else:
-                    # Even MongoDB doesn't have this user, create basic info
-                    followers.append({
-                        'user': None,
-                        'profile': None,
-                        'mongo_data': {
-                            'user_id': follower_id,
-                            'first_name': 'Unknown',
-                            'last_name': 'User',
-                            'email': 'unknown@example.com'
-                        },
-                        'follower_count': 0,
-                        'is_following': follower_id in user_profile.get('following', []) if user_profile else False,
-                        'from_django': False,
+                followers.append({
+                    'user': None,  # No Django user
+                    'profile': None,
+                    # Even MongoDB doesn't have this user: basic info
+                    'mongo_data': follower_mongo or {
                         'user_id': follower_id,
-                        'has_valid_slug': False
-                    })
+                        'first_name': 'Unknown',
+                        'last_name': 'User',
+                        'email': 'unknown@example.com'
+                    },
+                    'follower_count': follower_mongo.get('follower_count', 0) if follower_mongo else 0,
+                    'is_following': follower_id in following_ids,
+                    'from_django': False,
+                    'user_id': follower_id,
+                    'has_valid_slug': False
+                })
     
     context = {
         'profile_user': user,
@@ -1917,67 +1463,44 @@ def following_list(request, slug):
     if user_profile and 'following' in user_profile:
         following_ids = user_profile['following']
         
+        # Comptes Django (une requête, annuaire en cache) et profils MongoDB (une requête)
+        directory = resolve_users(following_ids, create_missing_profiles=True)
+        mongo_profiles = {
+            mongo_profile['user_id']: mongo_profile
+            for mongo_profile in db.profiles.find({'user_id': {'$in': following_ids}})
+        }
+        
         for following_id in following_ids:
-            try:
-                # Try to get user from Django first
-                following_user = User.objects.get(id=following_id)
-                following_profile, created = UserProfile.objects.get_or_create(
-                    user=following_user,
-                    defaults={
-                        'slug': f"user-{following_user.id}",
-                        'bio': f"Profile of {following_user.first_name} {following_user.last_name}" if following_user.first_name else f"Profile of {following_user.username}"
-                    }
-                )
-                
-                # Clean the slug if it contains invalid characters
-                if created or not following_profile.slug or any(char in following_profile.slug for char in ['@', '.', '+']):
-                    following_profile.slug = f"user-{following_user.id}"
-                    following_profile.save()
-                
-                # Get MongoDB data
-                following_mongo = db.profiles.find_one({'user_id': following_id})
-                
+            following_mongo = mongo_profiles.get(following_id)
+            entry = directory.get(following_id)
+            if entry:
                 following.append({
-                    'user': following_user,
-                    'profile': following_profile,
+                    'user': entry,
+                    'profile': entry,
                     'follower_count': following_mongo.get('follower_count', 0) if following_mongo else 0,
                     'is_following': True,
                     'from_django': True,
                     'user_id': following_id,
                     'has_valid_slug': True
                 })
-                
-            except User.DoesNotExist:
+            else:
                 # User doesn't exist in Django, use MongoDB data only
-                following_mongo = db.profiles.find_one({'user_id': following_id})
-                if following_mongo:
-                    following.append({
-                        'user': None,  # No Django user
-                        'profile': None,
-                        'mongo_data': following_mongo,
-                        'follower_count': following_mongo.get('follower_count', 0),
-                        'is_following': True,
-                        'from_django': False,
-                        'user_id': following_id,
-                        'has_valid_slug': False
-                    })
-                else:
-                    # Even MongoDB doesn't have this user, create basic info
-                    following.append({
-                        'user': None,
-                        'profile': None,
-                        'mongo_data': {
-                            'user_id': following_id,
-                            'first_name': 'Unknown',
-                            'last_name': 'User',
-                            'email': 'unknown@example.com'
-                        },
-                        'follower_count': 0,
-                        'is_following': True,
-                        'from_django': False,
+                following.append({
+                    'user': None,  # No Django user
+                    'profile': None,
+                    # Even MongoDB doesn't have this user: basic info
+                    'mongo_data': following_mongo or {
                         'user_id': following_id,
-                        'has_valid_slug': False
-                    })
+                        'first_name': 'Unknown',
+                        'last_name': 'User',
+                        'email': 'unknown@example.com'
+                    },
+                    'follower_count': following_mongo.get('follower_count', 0) if following_mongo else 0,
+                    'is_following': True,
+                    'from_django': False,
+                    'user_id': following_id,
+                    'has_valid_slug': False
+                })
     
     context = {
         'profile_user': user,
@@ -2001,19 +1524,8 @@ def profile_albums(request, slug):
     # Attention: certains FileField peuvent être non nuls mais vides -> exclure image=""
     base_qs = Post.objects.filter(user=user, image__isnull=False).exclude(image="")
 
-    # Comptages par catégorie pour les badges
-    counts = base_qs.exclude(image_category__isnull=True).values('image_category').annotate(count=Count('id'))
-    counts_dict = {row['image_category']: row['count'] for row in counts}
-
-    categories = [
-        {'id': 'all', 'name': 'Tous', 'icon': '🌍', 'count': base_qs.count()},
-        {'id': 'sea', 'name': 'Mer', 'icon': '🌊', 'count': counts_dict.get('sea', 0)},
-        {'id': 'mountain', 'name': 'Montagne', 'icon': '⛰️', 'count': counts_dict.get('mountain', 0)},
-        {'id': 'forest', 'name': 'Forêt', 'icon': '🌲', 'count': counts_dict.get('forest', 0)},
-        {'id': 'buildings', 'name': 'Ville', 'icon': '🏢', 'count': counts_dict.get('buildings', 0)},
-        {'id': 'street', 'name': 'Rue', 'icon': '🛣️', 'count': counts_dict.get('street', 0)},
-        {'id': 'glacier', 'name': 'Glacier', 'icon': '❄️', 'count': counts_dict.get('glacier', 0)},
-    ]
+    # Comptages par catégorie pour les badges (compteurs maintenus à l'écriture)
+    categories = build_category_badges(get_album_category_counts(user))
 
     # Appliquer le filtre si choisi
     images_qs = base_qs
@@ -2094,8 +1606,7 @@ def profile_analytics(request, slug):
     return render(request, 'profile_analytics.html', context)
 def get_country_flag(country_code):
     """Convertir un code pays (ex: 'FR') en emoji drapeau (ex: '🇫🇷')"""
-    OFFSET = 127397
-    return ''.join(chr(ord(char) + OFFSET) for char in country_code)
+    return country_flag(country_code)
 
 @login_required
 def edit_profile(request):
@@ -2135,6 +1646,7 @@ def edit_profile(request):
                     'nationality': request.POST.get('nationality', ''),
                     'interests': request.POST.getlist('interests'),
                     'visited_countries': request.POST.getlist('visited_countries'),
+                    'updated_at': timezone.now(),  # Recommandations à rafraîchir
                 }
                 
                 # upsert=True : crée le document s'il n'existe pas, sinon le met à jour
@@ -2143,6 +1655,8 @@ def edit_profile(request):
                     {'$set': mongo_updates},
                     upsert=True
                 )
+                update_profile_similarity(db.profiles.find_one({'user_id': request.user.id}))
+                invalidate_recommendations(db, request.user.id)
                 
                 messages.success(request, '✅ Votre profil a été mis à jour avec succès ! Toutes vos modifications ont été enregistrées.')
                 return redirect('profile', slug=request.user.profile.slug)
@@ -2165,16 +1679,6 @@ def edit_profile(request):
         user_form = UserEditForm(instance=request.user)
         profile_form = ProfileEditForm(instance=request.user.profile)
     
-    # Transformer la liste de pays en liste de dictionnaires avec drapeaux
-    countries_with_flags = [
-        {
-            'code': code,
-            'name': name,
-            'flag': get_country_flag(code)
-        }
-        for code, name in COUNTRIES
-    ]
-    
     context = {
         'user_form': user_form,
         'profile_form': profile_form,
@@ -2182,7 +1686,7 @@ def edit_profile(request):
         'interests_list': INTERESTS,
         'travel_types': TRAVEL_TYPES,
         'languages_list': LANGUAGES,
-        'countries_list': countries_with_flags,
+        'countries_list': COUNTRIES_WITH_FLAGS,
     }
     return render(request, 'edit_profile.html', context)
 
@@ -2409,6 +1913,9 @@ def create_post(request):
         # ✅ INCRÉMENTER LE COMPTEUR DE QUOTAS
         increment_usage(request.user, 'post')
         
+        # 📬 Diffuser le post dans la timeline des followers
+        schedule_fan_out(post)
+        
         # Retourner une réponse JSON (succès)
         return JsonResponse({
             'success': True,
@@ -2661,24 +2168,17 @@ def list_posts(request):
     Vue pour afficher le fil d'actualité (feed).
     Affiche tous les posts publics + posts d'amis.
     """
-    # Récupérer tous les posts publics (on peut filtrer par amis plus tard)
-    posts = Post.objects.filter(
-        Q(visibility='public') | Q(user=request.user)
-    ).select_related('user', 'user__profile').prefetch_related(
-        'comments', 'reactions', 'post_shares'
-    ).order_by('-created_at')
+    # Récupérer la première page des posts publics (on peut filtrer par amis plus tard)
+    posts, next_cursor = get_feed_page(request.user)
     
     # Pour chaque post, vérifier si l'utilisateur a déjà réagi
-    for post in posts:
-        # Est-ce que l'utilisateur a liké ce post ?
-        post.user_reaction = post.reactions.filter(user=request.user).first()
-        
-        # Calculer les statistiques
-        post.total_reactions = post.reactions.count()
-        post.total_comments = post.comments.filter(parent=None).count()  # Seulement les commentaires principaux
+    attach_viewer_state(posts, request.user)
+    for post, card_html in zip(posts, render_post_cards(posts, request)):
+        post.card_html = card_html
     
     context = {
         'posts': posts,
+        'next_cursor': next_cursor,
     }
     return render(request, 'feed.html', context)
 
@@ -2805,10 +2305,8 @@ def create_story(request):
 @login_required(login_url='/login/')
 def list_stories(request):
     """Lister les stories actives (24h) pour affichage léger."""
-    from django.utils import timezone
-    from datetime import timedelta
-    cutoff = timezone.now() - timedelta(hours=24)
-    stories = Story.objects.filter(created_at__gte=cutoff).select_related('user', 'user__profile').order_by('-created_at')
+    stories = get_active_stories()
+    seen = seen_story_ids(request.user, [s.id for s in stories])
     data = []
     for s in stories:
         data.append({
@@ -2821,7 +2319,8 @@ def list_stories(request):
             'content_text': s.content_text,
             'image': s.image.url if s.image else None,
             'video': s.video.url if s.video else None,
-            'created_at': s.created_at.strftime('%d/%m/%Y %H:%M')
+            'created_at': s.created_at.strftime('%d/%m/%Y %H:%M'),
+            'seen': s.id in seen,
         })
     return JsonResponse({'success': True, 'stories': data})
 
@@ -2837,9 +2336,8 @@ def story_detail(request, story_id):
     except Story.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Story expirée ou introuvable'}, status=404)
 
-    # Enregistrer la vue (sauf pour l'auteur)
-    if request.user != story.user:
-        StoryView.objects.get_or_create(story=story, viewer=request.user)
+    # Enregistrer la vue (sauf pour l'auteur) et incrémenter le compteur
+    record_story_view(story, request.user)
 
     return JsonResponse({
         'success': True,
@@ -2855,7 +2353,7 @@ def story_detail(request, story_id):
             'video': story.video.url if story.video else None,
             'created_at': story.created_at.strftime('%d/%m/%Y %H:%M'),
             'expires_at': (story.created_at + timezone.timedelta(hours=24)).strftime('%d/%m/%Y %H:%M'),
-            'views_count': story.views.count()
+            'views_count': story.views_count
         }
     })
 # ============================================
@@ -2880,6 +2378,7 @@ def delete_post(request, post_id):
     
     # Supprimer le post
     post.delete()
+    invalidate_post_card(post_id)
     
     return JsonResponse({
         'success': True,
@@ -2893,7 +2392,7 @@ def delete_post(request, post_id):
 @require_http_methods(["POST"])
 def edit_post(request, post_id):
     """
-    Vue pour modifier le contenu d'un post.
+    Vue pour modifier le contenu (et éventuellement la visibilité) d'un post.
     Seul le créateur du post peut le modifier.
     """
     # Récupérer le post (ou 404 si n'existe pas)
@@ -2916,9 +2415,24 @@ def edit_post(request, post_id):
             'error': 'Le post ne peut pas être vide.'
         }, status=400)
     
-    # Mettre à jour le contenu du post
+    # Nouvelle visibilité (optionnelle, inchangée par défaut)
+    visibility = request.POST.get('visibility', post.visibility)
+    if visibility not in dict(Post.VISIBILITY_CHOICES):
+        return JsonResponse({
+            'success': False,
+            'error': 'Visibilité invalide.'
+        }, status=400)
+    
+    # Mettre à jour le contenu et la visibilité du post
+    previous_visibility = post.visibility
     post.content = new_content
+    post.visibility = visibility
     post.save()
+    invalidate_post_card(post.id)
+    
+    # 📬 Timelines des followers : post devenu public ou qui ne l'est plus
+    if visibility != previous_visibility:
+        schedule_visibility_update(post, previous_visibility)
     
     return JsonResponse({
         'success': True,
@@ -2926,6 +2440,7 @@ def edit_post(request, post_id):
         'post': {
             'id': post.id,
             'content': post.content,
+            'visibility': post.visibility,
             'updated_at': post.updated_at.strftime('%d/%m/%Y %H:%M')
         }
     })
@@ -2967,6 +2482,7 @@ def add_comment(request, post_id):
     # Incrémenter le compteur de commentaires du post
     post.comments_count += 1
     post.save()
+    invalidate_post_card(post.id)
     
     return JsonResponse({
         'success': True,
@@ -3008,6 +2524,7 @@ def add_reaction(request, post_id):
             # Décrémenter le compteur
             post.likes_count = max(0, post.likes_count - 1)
             post.save()
+            invalidate_post_card(post.id)
             
             return JsonResponse({
                 'success': True,
@@ -3019,6 +2536,7 @@ def add_reaction(request, post_id):
             # Si c'est une réaction différente → MODIFIER
             existing_reaction.reaction_type = reaction_type
             existing_reaction.save()
+            invalidate_post_card(post.id)
             
             return JsonResponse({
                 'success': True,
@@ -3038,6 +2556,7 @@ def add_reaction(request, post_id):
         # Incrémenter le compteur
         post.likes_count += 1
         post.save()
+        invalidate_post_card(post.id)
         
         return JsonResponse({
             'success': True,
@@ -3071,6 +2590,7 @@ def react_to_comment(request, comment_id):
             existing_reaction.delete()
             comment.likes_count = max(0, comment.likes_count - 1)
             comment.save()
+            invalidate_post_card(comment.post_id)
             
             return JsonResponse({
                 'success': True,
@@ -3081,6 +2601,7 @@ def react_to_comment(request, comment_id):
             # Modifier la réaction
             existing_reaction.reaction_type = reaction_type
             existing_reaction.save()
+            invalidate_post_card(comment.post_id)
             
             return JsonResponse({
                 'success': True,
@@ -3098,6 +2619,7 @@ def react_to_comment(request, comment_id):
         
         comment.likes_count += 1
         comment.save()
+        invalidate_post_card(comment.post_id)
         
         return JsonResponse({
             'success': True,
@@ -3144,6 +2666,9 @@ def share_post(request, post_id):
         visibility='public'  # Ou selon vos besoins
     )
     
+    # 📬 Diffuser le partage dans la timeline des followers
+    schedule_fan_out(shared_post)
+    
     # Incrémenter le compteur de partages
     original_post.shares_count += 1
     original_post.save()
@@ -3249,6 +2774,7 @@ def edit_comment(request, comment_id):
     # Mettre à jour le commentaire
     comment.content = new_content
     comment.save()
+    invalidate_post_card(comment.post_id)
     
     return JsonResponse({
         'success': True,
@@ -3290,6 +2816,7 @@ def delete_comment(request, comment_id):
     # Décrémenter le compteur
     post.comments_count = max(0, post.comments_count - 1)
     post.save()
+    invalidate_post_card(post.id)
     
     return JsonResponse({
         'success': True,
@@ -3305,123 +2832,29 @@ def delete_comment(request, comment_id):
 
 
 
-def get_travel_companions(user, db):
-  
-    user_profile = db.profiles.find_one({'user_id': user.id})
+def get_travel_companions(user, db, user_profile=None):
+    """
+    Compagnons de voyage suggérés (3-4 profils non suivis, meilleur score d'abord).
+
+    La liste est calculée par compute_travel_companions (modèle entraîné par
+    `manage.py train_companion_model`) et stockée dans user_recommendations.
+    """
+    # Le profil peut être fourni par l'appelant (déjà chargé par le feed)
+    if user_profile is None:
+        user_profile = db.profiles.find_one({'user_id': user.id})
     travel_companions = []
 
     if not user_profile:
         return travel_companions  # Retourne une liste vide si le profil est incomplet
 
-    # Récupérer tous les profils sauf celui de l'utilisateur actuel
-    profiles = list(db.profiles.find({'user_id': {'$ne': user.id}}))
-
-    if not profiles:
-        return travel_companions  # Retourne une liste vide s'il n'y a pas d'autres profils
-
-    # Définir les tranches de budget pour normalisation
-    def get_budget_value(budget):
-        try:
-            return float(budget) if budget else 0
-        except (ValueError, TypeError):
-            return 0
-
-    # Préparer les données pour Random Forest
-    X = []
-    user_ids = []
-    user_budget = get_budget_value(user_profile.get('travel_budget', 0))
-    user_travel_types = set(user_profile.get('travel_type', []))
-    user_languages = set(user_profile.get('languages', []))
-    user_interests = set(user_profile.get('interests', []))
-    user_nationality = user_profile.get('nationality', '')
-
-    for profile in profiles:
-        if profile:
-            budget = get_budget_value(profile.get('travel_budget', 0))
-            travel_types = set(profile.get('travel_type', []))
-            languages = set(profile.get('languages', []))
-            interests = set(profile.get('interests', []))
-            nationality = profile.get('nationality', '')
-
-            # Caractéristiques pour Random Forest
-            budget_match = 1 if user_budget and abs(user_budget - budget) <= user_budget * 0.2 else 0
-            travel_type_score = len(user_travel_types.intersection(travel_types))
-            language_score = len(user_languages.intersection(languages))
-            interest_score = len(user_interests.intersection(interests))
-            nationality_match = 1 if user_nationality and user_nationality == nationality else 0
-
-            features = [
-                budget_match,  # 0 ou 1 (budget dans ±20%)
-                travel_type_score,  # Nombre de styles de voyage communs
-                language_score,  # Nombre de langues communes
-                interest_score,  # Nombre d'intérêts communs
-                nationality_match  # 0 ou 1 (même nationalité)
-            ]
-
-            X.append(features)
-            user_ids.append(profile['user_id'])
-
-    if not X:
-        return travel_companions  # Retourne une liste vide si aucune donnée
-
-    # Calculer les scores cibles pour l'entraînement
-    y = []
-    for features in X:
-        score = (
-            features[0] * 40 +  # Budget match (+40 si dans ±20%)
-            features[1] * 30 +  # Travel type match (+30 par style commun)
-            features[2] * 20 +  # Language match (+20 par langue commune)
-            features[3] * 15 +  # Interest match (+15 par intérêt commun)
-            features[4] * 10    # Nationality match (+10 si même nationalité)
-        )
-        y.append(score)
-
-    # Entraîner le modèle Random Forest
-    model = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=5)
-    model.fit(X, y)
-
-    # Prédire les scores
-    scores = model.predict(X)
-
-    # Associer les scores aux utilisateurs
-    scored_users = [
-        {
-            'user_id': user_ids[i],
-            'score': scores[i],
-            'first_name': profile['first_name'],
-            'last_name': profile['last_name'],
-            'profile_image': profile.get('profile_image', '/static/images/avatars/avatar-default.webp'),
-            'follower_count': format_follower_count(profile.get('follower_count', 0)),
-            'is_following': profile['user_id'] in user_profile.get('following', [])
-        }
-        for i, profile in enumerate(profiles)
+    # Liste précalculée (user_recommendations), calculée à la demande si absente
+    entries = get_recommendations(db, user_profile, ['travel_companions'])['travel_companions']
+    cards = load_profile_cards(db, [entry['user_id'] for entry in entries])
+    travel_companions = [
+        {**cards[entry['user_id']], 'score': entry['score']}
+        for entry in entries if entry['user_id'] in cards
     ]
 
-    # Trier par score décroissant
-    scored_users.sort(key=lambda x: x['score'], reverse=True)
-
-    # Sélectionner les 3-4 meilleurs utilisateurs non suivis
-    travel_companions = [user for user in scored_users if not user['is_following']][:4]
-
-    # Compléter avec des utilisateurs non suivis si moins de 3
-    if len(travel_companions) < 3:
-        additional_users = [
-            {
-                'user_id': profile['user_id'],
-                'score': 0,
-                'first_name': profile['first_name'],
-                'last_name': profile['last_name'],
-                'profile_image': profile.get('profile_image', '/static/images/avatars/avatar-default.webp'),
-                'follower_count': format_follower_count(profile.get('follower_count', 0)),
-                'is_following': False
-            }
-            for profile in profiles
-            if profile['user_id'] not in [u['user_id'] for u in travel_companions]
-            and profile['user_id'] not in user_profile.get('following', [])
-        ]
-        # Ajouter des utilisateurs pour atteindre au moins 3
-        travel_companions.extend(additional_users[:max(0, 3 - len(travel_companions))])
-
     return travel_companions
 
 @login_required(login_url='/login/')
@@ -99,6 +99,26 @@ else:
         }
     }
 
+# Cache configuration
+# Les instantanés de classement du feed (curseurs "ranked"), les scores
+# d'engagement et les versions des post-cards vivent dans ce cache : avec
+# plusieurs workers, il doit être partagé (Redis), sinon la page 2 d'un
+# classement servie par un autre worker repart de la page 1.
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    # Local development (un seul processus)
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -201,6 +221,36 @@ SUBSCRIPTION_LIMITS = {
         'events_per_month': float('inf'),
     }
 }
+
+# ============================================
+# FEED
+# ============================================
+FEED_PAGE_SIZE = 10  # Posts par page (pagination par curseur)
+TIMELINE_MAX_SIZE = 500  # Ids conservés par timeline matérialisée (mode "home")
+TIMELINE_FANOUT_MAX_FOLLOWERS = 5000  # Au-delà : fan-out-on-read
+FEED_RANKED_WINDOW = 500  # Posts récents candidats au classement (mode "ranked")
+FEED_SCORE_TTL = 60  # Durée de cache (s) des scores d'engagement
+POST_CARD_CACHE_TTL = 300  # Durée de cache (s) du HTML partagé des post-cards
+PANEL_TIMEOUT = 2.0  # Délai max (s) d'un panneau latéral avant repli sur une liste vide
+PANEL_TIMEOUTS = {'travel_companions': 3.0}  # Délais spécifiques par panneau
+PANEL_MAX_WORKERS = 16  # Threads du pool partagé des panneaux latéraux (par processus)
+STORY_INDEX_TTL = 60  # Durée de cache max (s) de l'index des stories actives
+COMPANION_MODEL_PATH = BASE_DIR / 'models' / 'travel_companions.joblib'  # Entraîné par train_companion_model
+COMPANION_CANDIDATE_LIMIT = 200  # Profils candidats scorés par requête (compagnons de voyage)
+PROFILE_CANDIDATE_BUDGET = 2000  # Profils candidats (index inversé) scorés par recommandation
+PROFILE_INDEX_TTL = 300  # Durée max (s) de la matrice de similarité des profils avant reconstruction
+PROFILE_INDEX_COMPACT_SIZE = 256  # Profils modifiés en attente avant fusion dans la matrice
+USER_DIRECTORY_CACHE_SIZE = 4096  # Utilisateurs (slug, nom, avatar) gardés en cache par processus
+USER_DIRECTORY_TTL = 300  # Durée max (s) d'une entrée de l'annuaire des utilisateurs
+
+# ============================================
+# DESTINATIONS (Cities.csv, Flags.csv, workation.csv, assets/)
+# ============================================
+DESTINATIONS_DATA_DIR = BASE_DIR / 'public'
+# Artefact compilé par `manage.py build_destination_catalog` (prioritaire sur les CSV)
+DESTINATIONS_ARTIFACT_DIR = DESTINATIONS_DATA_DIR / 'destinations_catalog'
+WORK_OTHER_PAGE_SIZE = 12  # Cartes "Other Work-Friendly Destinations" par page
+
 # Static files configuration for production
 if not DEBUG:
     STATIC_ROOT = BASE_DIR / 'staticfiles'